@@ -0,0 +1,82 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .code_analyzer import ANALYZER_VERSION
+from .models import AnalysisCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Keep the IN lists below SQLite's bound-variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+# A hit refreshes an entry's last use at most this often, so repeat scans don't rewrite every row
+TOUCH_INTERVAL = timedelta(hours=1)
+
+
+class AnalysisCache:
+    """Database-backed cache of file analyses, keyed by (git blob id, language).
+
+    Holds at most ``CODE_ANALYSIS_CACHE_MAX_ENTRIES`` entries; the least
+    recently used go first, which also clears out entries left behind by
+    older analyzer versions.
+    """
+
+    def __init__(self, max_entries=None, version=ANALYZER_VERSION):
+        if max_entries is None:
+            max_entries = getattr(settings, 'CODE_ANALYSIS_CACHE_MAX_ENTRIES', 200000)
+        self.max_entries = max_entries
+        self.version = version
+
+    def get_many(self, keys):
+        """The cached analyses among ``keys``, as a {(blob_sha, language): analysis} dict."""
+        keys = set(keys)
+        blobs = sorted({blob_sha for blob_sha, _ in keys})
+
+        found = {}
+        stale = []
+        touch_before = timezone.now() - TOUCH_INTERVAL
+        for start in range(0, len(blobs), LOOKUP_CHUNK_SIZE):
+            for pk, blob_sha, language, analysis, last_used_at in AnalysisCacheEntry.objects.filter(
+                analyzer_version=self.version,
+                blob_sha__in=blobs[start:start + LOOKUP_CHUNK_SIZE]
+            ).values_list('id', 'blob_sha', 'language', 'analysis', 'last_used_at'):
+                if (blob_sha, language) in keys:
+                    found[(blob_sha, language)] = analysis
+                    if last_used_at < touch_before:
+                        stale.append(pk)
+
+        now = timezone.now()
+        for start in range(0, len(stale), LOOKUP_CHUNK_SIZE):
+            AnalysisCacheEntry.objects.filter(pk__in=stale[start:start + LOOKUP_CHUNK_SIZE]).update(last_used_at=now)
+
+        return found
+
+    def set_many(self, analyses):
+        """Store {(blob_sha, language): analysis} entries, then evict down to the size limit."""
+        if not analyses:
+            return
+
+        now = timezone.now()
+        AnalysisCacheEntry.objects.bulk_create([
+            AnalysisCacheEntry(
+                blob_sha=blob_sha,
+                language=language,
+                analyzer_version=self.version,
+                analysis=analysis,
+                last_used_at=now
+            )
+            for (blob_sha, language), analysis in analyses.items()
+        ], batch_size=500, ignore_conflicts=True)
+
+        self._evict()
+
+    def _evict(self):
+        excess = AnalysisCacheEntry.objects.count() - self.max_entries
+        if excess <= 0:
+            return
+
+        pks = list(AnalysisCacheEntry.objects.order_by('last_used_at', 'id').values_list('id', flat=True)[:excess])
+        for start in range(0, len(pks), LOOKUP_CHUNK_SIZE):
+            AnalysisCacheEntry.objects.filter(pk__in=pks[start:start + LOOKUP_CHUNK_SIZE]).delete()
+        logger.info(f"Evicted {len(pks)} code analysis cache entries")
@@ -1,16 +1,111 @@
+import hashlib
+import itertools
 import logging
+import multiprocessing
 import os
 import re
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from radon.complexity import cc_visit
 from radon.metrics import mi_visit
 from radon.raw import analyze
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change would analyze the same content differently, so cached results are recomputed
+ANALYZER_VERSION = 1
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 200
+# Files per task sent to a worker: large enough to amortise the round trip,
+# small enough to balance a few huge files across workers
+PARALLEL_CHUNK_SIZE = 32
+# Files walked, hashed and analyzed at a time by iter_scan, which bounds its memory;
+# several chunks per worker so the pool stays busy within a batch
+SCAN_BATCH_SIZE = 2048
+
+
+class AnalysisTimeout(BaseException):
+    """Raised when analyzing a single file takes longer than allowed.
+    
+    A BaseException so the analyzers' own ``except Exception`` fallbacks
+    don't turn it into a partial result.
+    """
+
+
+@contextmanager
+def _time_limit(seconds):
+    """Interrupt the block after ``seconds``.
+    
+    Uses SIGALRM, so it only applies in the main thread on Unix, which is
+    where pool workers run; elsewhere the block runs without a limit.
+    """
+    if not seconds or not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def timed_out(signum, frame):
+        raise AnalysisTimeout(f"analysis took longer than {seconds}s")
+    
+    previous = signal.signal(signal.SIGALRM, timed_out)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def empty_summary():
+    """The totals of a scan before any file, in the shape ``scan_repository`` returns."""
+    return {
+        'analyzed_files': 0,
+        'languages': {},
+        'complexity': {
+            'total_score': 0,
+            'average_score': 0
+        },
+        'lines': {
+            'code': 0,
+            'comment': 0,
+            'blank': 0,
+            'total': 0
+        }
+    }
+
+
+def blob_sha(data):
+    """The git blob id of ``data`` (bytes), i.e. what ``git hash-object`` prints."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def decode_source(data):
+    """A file's text from its bytes, with newlines translated as text-mode ``open`` does."""
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _read_source(file_path):
+    """A file's git blob id and its text."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return blob_sha(data), decode_source(data)
+
+
+def _analyze_chunk(files, file_timeout):
+    """Process pool task: (analysis, error) pairs for a chunk of (path, language) files."""
+    analyzer = CodeAnalyzer(file_timeout=file_timeout)
+    return [analyzer._analyze_file_safely(file_path, language) for file_path, language in files]
+
+
 class CodeAnalyzer:
     """Analyzes code repositories and individual files for quality, complexity, and patterns."""
     
-    def __init__(self):
+    def __init__(self, file_timeout=None):
+        # Seconds one file may take before it is skipped; None for no limit
+        self.file_timeout = file_timeout
+        
         # Define supported languages and their file extensions
         self.supported_languages = {
             'python': ['.py'],
@@ -22,93 +117,22 @@ class CodeAnalyzer:
             'markdown': ['.md']
         }
     
-    def scan_repository(self, repo_path):
-        """Scan an entire repository and analyze its code."""
+    def scan_repository(self, repo_path, workers=1, cache=None):
+        """Scan an entire repository and analyze its code.
+        
+        Collects ``iter_scan`` into one result; see there for ``workers``
+        and ``cache``.
+        """
         try:
             logger.info(f"Scanning repository at: {repo_path}")
             
             results = {
-                'summary': {
-                    'analyzed_files': 0,
-                    'languages': {},
-                    'complexity': {
-                        'total_score': 0,
-                        'average_score': 0
-                    },
-                    'lines': {
-                        'code': 0,
-                        'comment': 0,
-                        'blank': 0,
-                        'total': 0
-                    }
-                },
+                'summary': empty_summary(),
                 'files': []
             }
             
-            # Walk through repository
-            for root, _, files in os.walk(repo_path):
-                # Skip version control directories
-                if '.git' in root:
-                    continue
-                    
-                for file in files:
-                    # Get file extension
-                    _, ext = os.path.splitext(file)
-                    ext = ext.lower()
-                    
-                    # Determine language based on extension
-                    language = None
-                    for lang, extensions in self.supported_languages.items():
-                        if ext in extensions:
-                            language = lang
-                            break
-                    
-                    if not language:
-                        continue  # Skip unsupported file types
-                    
-                    # Update language statistics
-                    if language not in results['summary']['languages']:
-                        results['summary']['languages'][language] = 0
-                    results['summary']['languages'][language] += 1
-                    
-                    file_path = os.path.join(root, file)
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            
-                        # Skip empty files
-                        if not content.strip():
-                            continue
-                        
-                        # Analyze the file
-                        analysis = self.analyze_code(content, language)
-                        
-                        # Update summary statistics
-                        results['summary']['analyzed_files'] += 1
-                        results['summary']['complexity']['total_score'] += analysis.get('complexity', 0)
-                        
-                        results['summary']['lines']['code'] += analysis.get('lines', {}).get('code', 0)
-                        results['summary']['lines']['comment'] += analysis.get('lines', {}).get('comment', 0)
-                        results['summary']['lines']['blank'] += analysis.get('lines', {}).get('blank', 0)
-                        results['summary']['lines']['total'] += analysis.get('lines', {}).get('total', 0)
-                        
-                        # Add file analysis
-                        rel_path = os.path.relpath(file_path, repo_path)
-                        results['files'].append({
-                            'path': rel_path,
-                            'language': language,
-                            'analysis': analysis
-                        })
-                        
-                    except Exception as e:
-                        logger.warning(f"Could not analyze file {file_path}: {e}")
-            
-            # Calculate average complexity
-            if results['summary']['analyzed_files'] > 0:
-                results['summary']['complexity']['average_score'] = (
-                    results['summary']['complexity']['total_score'] / results['summary']['analyzed_files']
-                )
+            for entry in self.iter_scan(repo_path, workers=workers, cache=cache, summary=results['summary']):
+                results['files'].append(entry)
             
             return results
             
@@ -116,6 +140,174 @@ class CodeAnalyzer:
             logger.error(f"Error scanning repository: {e}")
             return {"error": str(e)}
     
+    def iter_scan(self, repo_path, workers=1, cache=None, summary=None):
+        """Scan a repository file by file, yielding each analyzed file as it is done.
+        
+        Files are walked, hashed and analyzed in batches of ``SCAN_BATCH_SIZE``,
+        so memory stays flat however large the repository. ``summary`` (from
+        ``empty_summary()``) is updated in place, giving running totals during
+        the scan and the final ones after it.
+        
+        With ``workers`` > 1 and enough files, files are analyzed in chunks
+        across a process pool; the result is the same as a serial scan. With
+        a ``cache`` (see ``analyzers.cache.AnalysisCache``) files are hashed
+        first and only content it hasn't seen is analyzed.
+        """
+        if summary is None:
+            summary = empty_summary()
+        
+        files = self._walk_files(repo_path)
+        pool = None
+        try:
+            while True:
+                batch = list(itertools.islice(files, SCAN_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                for _, language in batch:
+                    # Update language statistics
+                    if language not in summary['languages']:
+                        summary['languages'][language] = 0
+                    summary['languages'][language] += 1
+                
+                blobs, cached = self._cached_analyses(batch, cache) if cache is not None else ({}, {})
+                pending = [(file_path, language) for file_path, language in batch if file_path not in cached]
+                
+                if pool is None and workers > 1 and len(pending) >= PARALLEL_MIN_FILES:
+                    pool = self._process_pool(workers)
+                if pool is not None and len(pending) > PARALLEL_CHUNK_SIZE:
+                    analyses = self._analyze_files_parallel(pending, workers, pool=pool)
+                else:
+                    analyses = (self._analyze_file_safely(file_path, language) for file_path, language in pending)
+                
+                # Merged in walk order, so parallel, serial and cached scans produce the same result
+                fresh = {}
+                for file_path, language in batch:
+                    if file_path in cached:
+                        analysis, error = cached[file_path], None
+                    else:
+                        analysis, error = next(analyses)
+                        if analysis is not None and file_path in blobs:
+                            fresh[(blobs[file_path], language)] = analysis
+                    
+                    if error:
+                        logger.warning(f"Could not analyze file {file_path}: {error}")
+                        continue
+                    
+                    # Skip empty files
+                    if analysis is None:
+                        continue
+                    
+                    # Update summary statistics
+                    summary['analyzed_files'] += 1
+                    summary['complexity']['total_score'] += analysis.get('complexity', 0)
+                    summary['complexity']['average_score'] = summary['complexity']['total_score'] / summary['analyzed_files']
+                    
+                    summary['lines']['code'] += analysis.get('lines', {}).get('code', 0)
+                    summary['lines']['comment'] += analysis.get('lines', {}).get('comment', 0)
+                    summary['lines']['blank'] += analysis.get('lines', {}).get('blank', 0)
+                    summary['lines']['total'] += analysis.get('lines', {}).get('total', 0)
+                    
+                    yield {
+                        'path': os.path.relpath(file_path, repo_path),
+                        'language': language,
+                        'analysis': analysis
+                    }
+                
+                if fresh:
+                    cache.set_many(fresh)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    
+    def _walk_files(self, repo_path):
+        """The supported files of a repository as (path, language), lazily in walk order."""
+        for root, _, names in os.walk(repo_path):
+            # Skip version control directories
+            if '.git' in os.path.relpath(root, repo_path):
+                continue
+            
+            for name in names:
+                language = self.detect_language(name)
+                if language:
+                    yield os.path.join(root, name), language
+    
+    def _cached_analyses(self, files, cache):
+        """Hash every file; return their blob ids and the analyses ``cache`` already has, by path.
+        
+        Empty files come back as cached ``None`` since there is nothing to
+        analyze; unreadable ones are left for the analysis to report.
+        """
+        blobs = {}
+        empty = set()
+        for file_path, language in files:
+            try:
+                blobs[file_path], content = _read_source(file_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            if not content.strip():
+                empty.add(file_path)
+        
+        found = cache.get_many((blobs[file_path], language) for file_path, language in files if file_path in blobs)
+        
+        cached = {file_path: None for file_path in empty}
+        for file_path, language in files:
+            if (blobs.get(file_path), language) in found:
+                cached[file_path] = found[(blobs[file_path], language)]
+        return blobs, cached
+    
+    def scanned_language(self, path):
+        """The language ``scan_repository`` analyzes a repository-relative path as, or None if it skips the file."""
+        if '.git' in os.path.dirname(path):
+            return None
+        return self.detect_language(path)
+    
+    def detect_language(self, filename):
+        """The supported language of a file, from its extension, or None."""
+        _, ext = os.path.splitext(filename)
+        ext = ext.lower()
+        
+        for lang, extensions in self.supported_languages.items():
+            if ext in extensions:
+                return lang
+        return None
+    
+    def analyze_file(self, file_path, language):
+        """Analyze one file, or return None if it is empty."""
+        _, content = _read_source(file_path)
+        return self.analyze_text(content, language)
+    
+    def analyze_text(self, content, language):
+        """Analyze a file's text within ``file_timeout``, or return None if it is empty."""
+        if not content.strip():
+            return None
+        
+        with _time_limit(self.file_timeout):
+            return self.analyze_code(content, language)
+    
+    def _analyze_file_safely(self, file_path, language):
+        """``analyze_file`` as an (analysis, error) pair, so one bad file doesn't stop a scan."""
+        try:
+            return self.analyze_file(file_path, language), None
+        except (Exception, AnalysisTimeout) as e:
+            return None, str(e)
+    
+    def _analyze_files_parallel(self, files, workers, pool=None):
+        """(analysis, error) pairs for ``files``, in order, computed in a process pool."""
+        chunks = [files[start:start + PARALLEL_CHUNK_SIZE] for start in range(0, len(files), PARALLEL_CHUNK_SIZE)]
+        
+        if pool is None:
+            with self._process_pool(min(workers, len(chunks))) as pool:
+                yield from self._analyze_files_parallel(files, workers, pool=pool)
+            return
+        
+        for chunk_results in pool.map(_analyze_chunk, chunks, [self.file_timeout] * len(chunks)):
+            yield from chunk_results
+    
+    def _process_pool(self, workers):
+        # Spawned rather than forked: forking a threaded server process can deadlock the child
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    
     def analyze_code(self, code, language):
         """Analyze a piece of code in a specified language."""
         try:
@@ -0,0 +1,193 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from context_builder.analyzers.cache import AnalysisCache
+from context_builder.analyzers.code_analyzer import CodeAnalyzer
+from context_builder.analyzers.models import AnalysisCacheEntry
+
+# Share of generated files per extension, roughly a web monorepo
+FILE_MIX = [('.py', 50), ('.js', 15), ('.ts', 15), ('.java', 10), ('.html', 4), ('.css', 3), ('.md', 3)]
+
+
+def python_source(functions):
+    """A Python module with ``functions`` functions of varied branching."""
+    lines = ["import os", "from collections import defaultdict", ""]
+    for i in range(functions):
+        lines.append(f"def handler_{i}(items, limit={i}):")
+        lines.append(f'    """Handle batch {i}."""')
+        lines.append("    total = 0")
+        for j in range(random.randint(1, 8)):
+            lines.append(f"    for item in items[{j}:]:")
+            lines.append(f"        if item > limit + {j}:")
+            lines.append(f"            total += item  # TODO tune {j}")
+            lines.append("        elif item < 0 and limit:")
+            lines.append("            total -= 1")
+        lines.append("    return total")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def js_source(functions):
+    lines = ["const fs = require('fs');", ""]
+    for i in range(functions):
+        lines.append(f"function handler{i}(items) {{")
+        lines.append("  let total = 0;")
+        for j in range(random.randint(1, 6)):
+            lines.append(f"  for (const item of items) {{ if (item > {j}) {{ total += item; }} }}")
+        lines.append("  return total; // TODO")
+        lines.append("}")
+    return "\n".join(lines)
+
+
+def java_source(functions):
+    lines = ["import java.util.List;", "", "public class Handler {"]
+    for i in range(functions):
+        lines.append(f"    public int handle{i}(List<Integer> items) {{")
+        lines.append("        int total = 0;")
+        for j in range(random.randint(1, 6)):
+            lines.append(f"        for (int item : items) {{ if (item > {j}) {{ total += item; }} }}")
+        lines.append("        return total;")
+        lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+SOURCES = {
+    '.py': python_source,
+    '.js': js_source,
+    '.ts': js_source,
+    '.java': java_source,
+}
+
+
+class Command(BaseCommand):
+    help = ("Time serial, process-pool and cached repository scans, check they agree "
+            "and that slow files are capped")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Scan this checkout instead of a generated repository")
+        parser.add_argument('--files', type=int, default=2000, help="Files in the generated repository")
+        parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, os.cpu_count() or 1])
+        parser.add_argument('--runs', type=int, default=1, help="Timed runs per mode")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.stdout.write(f"{os.cpu_count()} CPUs available")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self._check_time_limit(temp_dir)
+
+            repo_path = options['path']
+            if not repo_path:
+                repo_path = os.path.join(temp_dir, 'repo')
+                self._generate(repo_path, options['files'])
+
+            analyzer = CodeAnalyzer(file_timeout=30)
+            modes = [('serial', 1)] + [(f"{workers} workers", workers) for workers in sorted(set(options['workers']))]
+
+            results = {}
+            medians = {}
+            self.stdout.write(f"{'mode':>12} {'median s':>9} {'speedup':>8}")
+            for label, workers in modes:
+                timings = []
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    results[label] = analyzer.scan_repository(repo_path, workers=workers)
+                    timings.append(time.perf_counter() - start)
+                medians[label] = statistics.median(timings)
+                self.stdout.write(f"{label:>12} {medians[label]:>9.2f} {medians['serial'] / medians[label]:>7.2f}x")
+
+            with transaction.atomic():
+                self._check_cache(analyzer, repo_path, results['serial'], medians['serial'])
+                transaction.set_rollback(True)
+
+        if 'error' in results['serial']:
+            raise CommandError(f"Scan failed: {results['serial']['error']}")
+        for label, result in results.items():
+            if result != results['serial']:
+                raise CommandError(f"The {label} scan differs from the serial scan")
+
+        summary = results['serial']['summary']
+        self.stdout.write(self.style.SUCCESS(
+            f"All scans agree: {summary['analyzed_files']} files, {summary['lines']['total']} lines"
+        ))
+
+    def _check_cache(self, analyzer, repo_path, expected, serial_seconds):
+        """Cold and warm cached scans match an uncached one; an edit costs one analysis."""
+        cache = AnalysisCache(max_entries=10 ** 9)
+        AnalysisCacheEntry.objects.all().delete()
+
+        for label in ('cold cache', 'warm cache'):
+            start = time.perf_counter()
+            result = analyzer.scan_repository(repo_path, cache=cache)
+            seconds = time.perf_counter() - start
+            self.stdout.write(f"{label:>12} {seconds:>9.2f} {serial_seconds / seconds:>7.2f}x")
+            if result != expected:
+                raise CommandError(f"The {label} scan differs from the uncached scan")
+
+        entries = AnalysisCacheEntry.objects.count()
+        edited = next(entry['path'] for entry in expected['files'] if entry['language'] == 'python')
+        with open(os.path.join(repo_path, edited), 'a') as f:
+            f.write("\n# edited\n")
+        analyzer.scan_repository(repo_path, cache=cache)
+        if AnalysisCacheEntry.objects.count() != entries + 1:
+            raise CommandError(f"Editing one file added {AnalysisCacheEntry.objects.count() - entries} cache entries, expected 1")
+
+        AnalysisCache(max_entries=entries // 2).set_many({('0' * 40, 'python'): {}})
+        if AnalysisCacheEntry.objects.count() != entries // 2:
+            raise CommandError(f"Eviction left {AnalysisCacheEntry.objects.count()} entries, expected {entries // 2}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached scans agree; an edited file is the only one re-analyzed; eviction keeps {entries // 2} entries"
+        ))
+
+    def _check_time_limit(self, temp_dir):
+        """A file over the time cap is skipped in a worker, the rest of its chunk still analyzed."""
+        slow_path = os.path.join(temp_dir, 'slow.py')
+        fast_path = os.path.join(temp_dir, 'fast.py')
+        with open(slow_path, 'w') as f:
+            f.write(python_source(20000))
+        with open(fast_path, 'w') as f:
+            f.write(python_source(5))
+
+        analyzer = CodeAnalyzer(file_timeout=0.2)
+        (slow, slow_error), (fast, fast_error) = analyzer._analyze_files_parallel(
+            [(slow_path, 'python'), (fast_path, 'python')], workers=2
+        )
+        if slow is not None or 'longer than' not in (slow_error or ''):
+            raise CommandError(f"The slow file wasn't cut off: {slow_error or 'analyzed'}")
+        if fast is None or fast_error:
+            raise CommandError(f"The file after a timed out one wasn't analyzed: {fast_error}")
+        self.stdout.write(self.style.SUCCESS(f"Files over the time cap are skipped ({slow_error})"))
+
+    def _generate(self, repo_path, count):
+        """Write ``count`` source files over nested packages, plus a .git directory the scan skips."""
+        start = time.perf_counter()
+        extensions = [ext for ext, _ in FILE_MIX]
+        weights = [weight for _, weight in FILE_MIX]
+
+        os.makedirs(os.path.join(repo_path, '.git', 'objects'))
+        with open(os.path.join(repo_path, '.git', 'objects', 'hook.py'), 'w') as f:
+            f.write(python_source(1))
+
+        for i in range(count):
+            ext = random.choices(extensions, weights)[0]
+            directory = os.path.join(repo_path, f"pkg{i % 20}", f"mod{i % 7}")
+            os.makedirs(directory, exist_ok=True)
+
+            if i % 50 == 0:
+                content = ""
+            elif ext in SOURCES:
+                content = SOURCES[ext](random.randint(2, 25))
+            else:
+                content = f"<!-- {i} -->\n" * random.randint(5, 50)
+
+            with open(os.path.join(directory, f"file_{i}{ext}"), 'w') as f:
+                f.write(content)
+
+        self.stdout.write(f"Generated {count} files in {time.perf_counter() - start:.1f}s")
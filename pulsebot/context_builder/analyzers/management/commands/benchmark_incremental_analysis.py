@@ -0,0 +1,98 @@
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from context_builder.analyzers.models import RepositoryAnalysis
+from context_builder.analyzers.services import CodeAnalysisService
+from .benchmark_code_scan import SOURCES
+from .benchmark_repository_mirror import commit_files, generate_repository
+
+
+class Command(BaseCommand):
+    help = ("Time a full repository scan against an incremental analysis of a small change, "
+            "and check the incremental baseline matches a full rescan")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=1000, help="Files in the generated repository")
+        parser.add_argument('--changes', type=int, default=20, help="Files modified by the new commit")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            start = time.perf_counter()
+            origin = generate_repository(os.path.join(temp_dir, 'origin'), options['files'], options['files'])
+            self.stdout.write(f"Generated {options['files']} files in {time.perf_counter() - start:.1f}s")
+            url = f"file://{origin.working_dir}"
+
+            # Measure analysis, not hits in the content cache
+            with override_settings(
+                CODE_ANALYSIS_CACHE_MAX_ENTRIES=0,
+                CODE_ANALYSIS_MIRROR_DIR=os.path.join(temp_dir, 'mirrors'),
+                CODE_ANALYSIS_WORKERS=1
+            ), transaction.atomic():
+                service = CodeAnalysisService()
+                self._run(service, origin, url, options['changes'])
+                transaction.set_rollback(True)
+
+    def _run(self, service, origin, url, change_count):
+        self.stdout.write(f"{'analysis':>12} {'seconds':>8} {'files':>6}")
+        full = self._timed('full', service.analyze_repository, url)
+
+        self._change(origin, change_count)
+        incremental = self._timed('incremental', service.analyze_repository, url, incremental=True)
+        changes = incremental['changes']
+        self.stdout.write(
+            f"{len(changes['added'])} added, {len(changes['modified'])} modified, "
+            f"{len(changes['removed'])} removed since {full['commit'][:12]}"
+        )
+
+        baseline = RepositoryAnalysis.objects.get(repo_url=url)
+        incremental_files = self._baseline_files(baseline)
+        if baseline.commit_sha != origin.head.commit.hexsha:
+            raise CommandError(f"Baseline is at {baseline.commit_sha}, origin at {origin.head.commit.hexsha}")
+
+        rescan = self._timed('full rescan', service.analyze_repository, url)
+        if incremental['summary'] != rescan['summary']:
+            raise CommandError(f"Incremental summary {incremental['summary']} differs from a full rescan {rescan['summary']}")
+        if incremental_files != self._baseline_files(baseline):
+            raise CommandError("The incremental baseline's files differ from a full rescan's")
+
+        unchanged = self._timed('no change', service.analyze_repository, url, incremental=True)
+        if unchanged['summary'] != rescan['summary'] or any(unchanged['changes'].values()):
+            raise CommandError("Analyzing an unchanged repository changed its baseline")
+
+        self.stdout.write(self.style.SUCCESS("Incremental analysis matches a full rescan"))
+
+    def _timed(self, label, analyze, *args, **kwargs):
+        start = time.perf_counter()
+        result = analyze(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        if 'error' in result:
+            raise CommandError(f"The {label} analysis failed: {result['error']}")
+        self.stdout.write(f"{label:>12} {seconds:>8.2f} {len(result['files']):>6}")
+        return result
+
+    def _change(self, origin, count):
+        """Commit a modification of ``count`` files plus additions, removals and skipped paths."""
+        tracked = sorted(entry.path for entry in origin.head.commit.tree.traverse() if entry.type == 'blob')
+        modified = random.sample(tracked, count)
+        removed = random.sample([path for path in tracked if path not in modified], max(count // 4, 1))
+
+        changes = {path: SOURCES[os.path.splitext(path)[1]](random.randint(2, 15)) for path in modified}
+        changes.update({
+            'pkg_new/added.py': SOURCES['.py'](4),
+            'pkg_new/empty.py': '',
+            'pkg_new/notes.txt': 'unsupported',
+            '.github/workflows/check.py': SOURCES['.py'](2),
+        })
+        commit_files(origin, "Incremental change", changes, removed=removed)
+
+    def _baseline_files(self, baseline):
+        return sorted(baseline.files.values_list(
+            'path', 'language', 'complexity', 'lines_code', 'lines_comment', 'lines_blank', 'lines_total'
+        ))
@@ -0,0 +1,146 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from git import Repo
+from context_builder.analyzers.code_analyzer import CodeAnalyzer
+from context_builder.analyzers.mirrors import RepositoryMirrors
+from .benchmark_code_scan import SOURCES
+
+
+def generate_repository(path, files, commits):
+    """A repository of ``files`` source files built up over ``commits`` commits."""
+    repo = Repo.init(path)
+    with repo.config_writer() as config:
+        config.set_value('user', 'name', 'Benchmark')
+        config.set_value('user', 'email', 'benchmark@example.com')
+
+    extensions = ['.py', '.js', '.ts', '.java']
+    per_commit = max(files // commits, 1)
+    for i in range(commits):
+        changes = {}
+        for j in range(per_commit):
+            ext = random.choice(extensions)
+            changes[f"pkg{j % 10}/file_{(i * per_commit + j) % files}{ext}"] = SOURCES[ext](random.randint(2, 15))
+        commit_files(repo, f"Change {i}", changes)
+    return repo
+
+
+def commit_files(repo, message, changes, removed=()):
+    """Commit ``changes`` ({path: content}) and the removal of ``removed`` paths."""
+    for relative_path, content in changes.items():
+        file_path = os.path.join(repo.working_dir, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(content)
+    if changes:
+        repo.index.add(list(changes))
+    if removed:
+        repo.index.remove(list(removed), working_tree=True)
+    repo.index.commit(message)
+
+
+class Command(BaseCommand):
+    help = ("Compare clone-per-request with fetching into a local mirror, and check that mirrors "
+            "give the same files, stand concurrent use and are evicted by disk budget")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=300, help="Files in the generated repository")
+        parser.add_argument('--commits', type=int, default=200, help="Commits of history to generate")
+        parser.add_argument('--runs', type=int, default=3, help="Timed runs per approach")
+        parser.add_argument('--threads', type=int, default=4, help="Concurrent checkouts of one repository")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            origin = self._generate(os.path.join(temp_dir, 'origin'), options['files'], options['commits'])
+            # A file:// URL makes git transfer packs as it would from a server
+            url = f"file://{origin.working_dir}"
+            mirrors = RepositoryMirrors(root=os.path.join(temp_dir, 'mirrors'), max_bytes=10 ** 12)
+            analyzer = CodeAnalyzer()
+
+            self.stdout.write(f"{'approach':>22} {'median ms':>10}")
+            clone_timings = []
+            for run in range(options['runs']):
+                start = time.perf_counter()
+                clone_dir = os.path.join(temp_dir, f"clone-{run}")
+                Repo.clone_from(url, clone_dir)
+                clone_timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(f"{'clone per request':>22} {statistics.median(clone_timings):>10.1f}")
+
+            start = time.perf_counter()
+            with mirrors.checkout(url) as (worktree, sha):
+                pass
+            self.stdout.write(f"{'first mirror':>22} {(time.perf_counter() - start) * 1000:>10.1f}")
+
+            fetch_timings = []
+            for run in range(options['runs']):
+                commit_files(origin, f"Follow-up {run}", {f"followup_{run}.py": SOURCES['.py'](3)})
+                start = time.perf_counter()
+                with mirrors.checkout(url) as (worktree, sha):
+                    pass
+                fetch_timings.append((time.perf_counter() - start) * 1000)
+                if sha != origin.head.commit.hexsha:
+                    raise CommandError(f"Mirror is at {sha}, origin at {origin.head.commit.hexsha}")
+            self.stdout.write(f"{'fetch into mirror':>22} {statistics.median(fetch_timings):>10.1f}")
+
+            self._check_same_files(analyzer, mirrors, url, temp_dir)
+            self._check_concurrency(analyzer, mirrors, url, options['threads'])
+            self._check_eviction(mirrors, url, temp_dir)
+
+    def _check_same_files(self, analyzer, mirrors, url, temp_dir):
+        clone_dir = os.path.join(temp_dir, 'clone-check')
+        Repo.clone_from(url, clone_dir)
+        expected = analyzer.scan_repository(clone_dir)
+
+        with mirrors.checkout(url) as (worktree, sha):
+            result = analyzer.scan_repository(worktree)
+        if result != expected:
+            raise CommandError("Scanning the mirror's worktree differs from scanning a fresh clone")
+        self.stdout.write(self.style.SUCCESS(f"A mirror worktree scans like a fresh clone ({sha[:12]})"))
+
+    def _check_concurrency(self, analyzer, mirrors, url, threads):
+        def scan(_):
+            with mirrors.checkout(url) as (worktree, sha):
+                return sha, analyzer.scan_repository(worktree)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(scan, range(threads)))
+        if any(result != results[0] for result in results):
+            raise CommandError("Concurrent checkouts of one repository disagree")
+
+        worktrees = Repo(mirrors.mirror_path(url)).git.worktree('list').splitlines()
+        if len(worktrees) != 1:
+            raise CommandError(f"Worktrees were left behind: {worktrees}")
+        self.stdout.write(self.style.SUCCESS(f"{threads} concurrent checkouts agree and clean up after themselves"))
+
+    def _check_eviction(self, mirrors, url, temp_dir):
+        other = self._generate(os.path.join(temp_dir, 'other'), 20, 3)
+        other_url = f"file://{other.working_dir}"
+        with mirrors.checkout(other_url):
+            pass
+
+        tight = RepositoryMirrors(root=mirrors.root, max_bytes=1)
+        with tight.checkout(url):
+            # The mirror in use survives even an explicit eviction
+            tight.evict()
+            if not os.path.isdir(mirrors.mirror_path(url)):
+                raise CommandError("A mirror in use was evicted")
+        if os.path.isdir(mirrors.mirror_path(other_url)):
+            raise CommandError("The idle mirror wasn't evicted over the disk budget")
+
+        tight.evict()
+        if os.path.isdir(mirrors.mirror_path(url)):
+            raise CommandError("The mirror wasn't evicted once no longer in use")
+        self.stdout.write(self.style.SUCCESS("Idle mirrors are evicted over the disk budget, mirrors in use are kept"))
+
+    def _generate(self, path, files, commits):
+        start = time.perf_counter()
+        repo = generate_repository(path, files, commits)
+        self.stdout.write(f"Generated {path} with {commits} commits in {time.perf_counter() - start:.1f}s")
+        return repo
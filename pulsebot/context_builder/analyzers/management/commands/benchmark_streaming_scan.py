@@ -0,0 +1,115 @@
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from git import Repo
+from rest_framework.test import APIRequestFactory, force_authenticate
+from context_builder.analyzers import views
+from context_builder.analyzers.code_analyzer import CodeAnalyzer, empty_summary
+from context_builder.analyzers.services import CodeAnalysisService
+from .benchmark_code_scan import SOURCES
+from .benchmark_repository_mirror import commit_files
+
+
+class Command(BaseCommand):
+    help = ("Compare peak memory of collected and streamed repository scans, and check that "
+            "streamed results and the NDJSON endpoint match a collected scan")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, nargs='+', default=[1000, 4000],
+                            help="Files in the generated repository, one run per size")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        analyzer = CodeAnalyzer()
+
+        self.stdout.write(f"{'files':>6} {'scan':>9} {'peak MB':>8} {'seconds':>8}")
+        for size in options['files']:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                repo_path = os.path.join(temp_dir, 'repo')
+                self._generate(repo_path, size)
+
+                collected = self._measure(size, 'collected', lambda: analyzer.scan_repository(repo_path))
+
+                def stream():
+                    summary = empty_summary()
+                    files = 0
+                    for _ in analyzer.iter_scan(repo_path, summary=summary):
+                        files += 1
+                    return {'summary': summary, 'files': files}
+                streamed = self._measure(size, 'streamed', stream)
+
+            if streamed['summary'] != collected['summary'] or streamed['files'] != len(collected['files']):
+                raise CommandError(f"The streamed scan of {size} files differs from the collected one")
+
+        self._check_endpoint()
+
+    def _measure(self, size, label, scan):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = scan()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(f"{size:>6} {label:>9} {peak / 2 ** 20:>8.1f} {seconds:>8.1f}")
+        return result
+
+    def _check_endpoint(self):
+        """The streamed events add up to a collected scan; the endpoint only takes https URLs."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            origin = Repo.init(os.path.join(temp_dir, 'origin'))
+            with origin.config_writer() as config:
+                config.set_value('user', 'name', 'Benchmark')
+                config.set_value('user', 'email', 'benchmark@example.com')
+            changes = {}
+            for i in range(250):
+                ext = random.choice(list(SOURCES))
+                changes[f"pkg/file_{i}{ext}"] = SOURCES[ext](random.randint(2, 10))
+            commit_files(origin, "Initial", changes)
+            url = f"file://{origin.working_dir}"
+
+            with override_settings(
+                CODE_ANALYSIS_CACHE_MAX_ENTRIES=0,
+                CODE_ANALYSIS_MIRROR_DIR=os.path.join(temp_dir, 'mirrors')
+            ), transaction.atomic():
+                service = CodeAnalysisService()
+                lines = [json.dumps(event) for event in service.stream_repository_analysis(url)]
+                events = [json.loads(line) for line in lines]
+                expected = service.analyze_repository(url)
+
+                user = User.objects.create(username=f"bench_stream_{random.randint(0, 10 ** 9)}")
+                request = APIRequestFactory().get('/api/analysis/scan/stream/', {'repo_url': url})
+                force_authenticate(request, user=user)
+                rejected = views.stream_repository_scan(request)
+                transaction.set_rollback(True)
+
+        final = events[-1]
+        files = [event for event in events if event['type'] == 'file']
+        running = [event for event in events if event['type'] == 'summary' and not event['done']]
+        if final['type'] != 'summary' or not final['done'] or final['summary'] != expected['summary']:
+            raise CommandError(f"The final streamed event doesn't match a collected scan: {final}")
+        if [{k: v for k, v in event.items() if k != 'type'} for event in files] != expected['files']:
+            raise CommandError("Streamed file events differ from a collected scan's files")
+        if len(running) != len(files) // 100:
+            raise CommandError(f"Expected {len(files) // 100} running summaries, got {len(running)}")
+        if rejected.status_code != 400:
+            raise CommandError(f"The endpoint accepted a file:// URL (status {rejected.status_code})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(lines)} NDJSON events match a collected scan; file:// URLs are rejected"
+        ))
+
+    def _generate(self, repo_path, count):
+        for i in range(count):
+            ext = random.choice(list(SOURCES))
+            directory = os.path.join(repo_path, f"pkg{i % 20}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"file_{i}{ext}"), 'w') as f:
+                f.write(SOURCES[ext](random.randint(2, 10)))
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blob_sha', models.CharField(max_length=40)),
+                ('language', models.CharField(max_length=20)),
+                ('analyzer_version', models.PositiveIntegerField()),
+                ('analysis', models.JSONField()),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'unique_together': {('blob_sha', 'language', 'analyzer_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repo_url', models.CharField(max_length=500, unique=True)),
+                ('commit_sha', models.CharField(max_length=40)),
+                ('summary', models.JSONField()),
+                ('analyzed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RepositoryFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=512)),
+                ('language', models.CharField(max_length=20)),
+                ('complexity', models.IntegerField(default=0)),
+                ('lines_code', models.IntegerField(default=0)),
+                ('lines_comment', models.IntegerField(default=0)),
+                ('lines_blank', models.IntegerField(default=0)),
+                ('lines_total', models.IntegerField(default=0)),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='analyzers.repositoryanalysis')),
+            ],
+            options={
+                'unique_together': {('repository', 'path')},
+            },
+        ),
+    ]
@@ -0,0 +1,285 @@
+"""Local bare mirrors of analyzed repositories.
+
+Each repository is cloned once with ``--mirror`` and then only fetched, so
+an analysis downloads the commits pushed since the last one rather than
+the whole history. Analyses read a detached worktree of the mirror, which
+shares its object database. Mirrors are evicted least recently used first
+once they exceed a disk budget.
+
+Two lock files next to each mirror coordinate threads and processes: an
+exclusive "write" lock serialises fetches and new worktrees of the same
+repository, and a shared "use" lock, held for as long as a worktree is
+read, keeps eviction away from mirrors in use without making analyses
+wait for one another. A clone in progress holds a lock on its own
+directory, so eviction can tell it from one a crashed process left behind.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from git import Repo
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_PREFIX = '.partial-'
+LOCK_NAMES = ('use', 'write')
+# An unlocked partial clone younger than this may not have taken its lock yet
+PARTIAL_GRACE_SECONDS = 60
+
+
+class RepositoryMirrors:
+    """Bare mirrors of remote repositories under ``root``, bounded by ``max_bytes`` on disk."""
+
+    def __init__(self, root=None, max_bytes=None):
+        if root is None:
+            root = getattr(settings, 'CODE_ANALYSIS_MIRROR_DIR', os.path.join(tempfile.gettempdir(), 'pulsebot-mirrors'))
+        if max_bytes is None:
+            max_bytes = getattr(settings, 'CODE_ANALYSIS_MIRROR_MAX_MB', 10240) * 1024 * 1024
+        self.root = str(root)
+        self.max_bytes = max_bytes
+
+    @contextmanager
+    def repository(self, repo_url):
+        """Fetch ``repo_url`` into its mirror and yield the mirror as a ``git.Repo``.
+
+        For reading objects directly, e.g. only the blobs changed between two
+        commits. The mirror can't be evicted until the block exits.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        mirror_path = self.mirror_path(repo_url)
+
+        with _MirrorLock(mirror_path, 'use', shared=True):
+            with _MirrorLock(mirror_path, 'write'):
+                repo = self._update(repo_url, mirror_path)
+            yield repo
+
+        self.evict(keep=mirror_path)
+
+    @contextmanager
+    def checkout(self, repo_url, ref='HEAD'):
+        """Fetch ``repo_url`` into its mirror and yield (worktree path, commit sha) for ``ref``.
+
+        The worktree is removed on exit.
+        """
+        with self.repository(repo_url) as repo:
+            sha = repo.git.rev_parse(f"{ref}^{{commit}}")
+            worktree = tempfile.mkdtemp(prefix='pulsebot-worktree-')
+            try:
+                with _MirrorLock(self.mirror_path(repo_url), 'write'):
+                    repo.git.worktree('add', '--detach', worktree, sha)
+            except Exception:
+                shutil.rmtree(worktree, ignore_errors=True)
+                raise
+
+            try:
+                yield worktree, sha
+            finally:
+                # Only this worktree's own admin directory changes, so no write lock is needed
+                try:
+                    repo.git.worktree('remove', '--force', worktree)
+                except Exception as e:
+                    logger.warning(f"Could not remove worktree {worktree}: {e}")
+                    shutil.rmtree(worktree, ignore_errors=True)
+
+    def mirror_path(self, repo_url):
+        """Where the mirror of ``repo_url`` lives: its name for humans, a hash for uniqueness."""
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '-', repo_url.rstrip('/').rsplit('/', 1)[-1])
+        if name.endswith('.git'):
+            name = name[:-len('.git')]
+        digest = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    def evict(self, keep=None):
+        """Delete the least recently used idle mirrors until the rest fit the disk budget.
+
+        Also removes what crashed processes leave behind: clones interrupted
+        before their rename, and the lock files of mirrors that no longer
+        exist. Clones still in progress count against the budget.
+        """
+        mirrors = []
+        cloning = 0
+        lockless = set()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if name.startswith(PARTIAL_PREFIX):
+                    if not self._remove_stale_partial(path):
+                        cloning += _disk_usage(path)
+                elif name.endswith('.git'):
+                    mirrors.append((os.path.getmtime(path), path, _disk_usage(path)))
+                elif name.endswith('.lock') and name.count('.') >= 3:
+                    # <mirror>.git.<use|write>.lock
+                    mirror_path = path.rsplit('.', 2)[0]
+                    if not os.path.isdir(mirror_path):
+                        lockless.add(mirror_path)
+            except OSError:
+                continue  # Evicted by another process meanwhile
+
+        for mirror_path in lockless:
+            self._remove_idle(mirror_path)
+
+        total = cloning + sum(size for _, _, size in mirrors)
+        for _, path, size in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+
+            if self._remove_idle(path):
+                total -= size
+                logger.info(f"Evicted repository mirror {path} ({size // (1024 * 1024)} MB)")
+
+    def _remove_idle(self, mirror_path):
+        """Delete a mirror and its lock files unless it is in use. Returns whether it was removed."""
+        locks = [_MirrorLock(mirror_path, name) for name in LOCK_NAMES]
+        try:
+            if not all(lock.acquire(blocking=False) for lock in locks):
+                return False  # In use
+            shutil.rmtree(mirror_path, ignore_errors=True)
+            # Removed while held; whoever opened them meanwhile retries on new files
+            for lock in locks:
+                lock.unlink()
+            return True
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _remove_stale_partial(self, path):
+        """Delete a partial clone no process is working on. Returns whether it was removed."""
+        if fcntl is None or time.time() - os.path.getmtime(path) < PARTIAL_GRACE_SECONDS:
+            return False
+
+        with _DirectoryLock(path) as lock:
+            if not lock.acquire(blocking=False):
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+
+        logger.info(f"Removed interrupted clone {path}")
+        return True
+
+    def _update(self, repo_url, mirror_path):
+        """Fetch into an existing mirror or create it; the caller holds the write lock."""
+        if os.path.isdir(mirror_path):
+            repo = Repo(mirror_path)
+            logger.info(f"Fetching {repo_url} into {mirror_path}")
+            repo.git.fetch('--prune', 'origin')
+        else:
+            logger.info(f"Mirroring {repo_url} to {mirror_path}")
+            # Cloned aside and renamed, so an interrupted clone never looks like a mirror
+            partial = tempfile.mkdtemp(prefix=PARTIAL_PREFIX, dir=self.root)
+            try:
+                # Held until the rename, so eviction leaves the clone alone
+                with _DirectoryLock(partial) as lock:
+                    lock.acquire()
+                    Repo.clone_from(repo_url, partial, mirror=True)
+                    os.rename(partial, mirror_path)
+            finally:
+                shutil.rmtree(partial, ignore_errors=True)
+            repo = Repo(mirror_path)
+
+        # Recency for eviction
+        os.utime(mirror_path)
+        return repo
+
+
+class _MirrorLock:
+    """An advisory flock() on one of a mirror's lock files.
+
+    flock() locks belong to open file descriptions, so two threads of one
+    process contend just like two processes do.
+    """
+
+    def __init__(self, mirror_path, name, shared=False):
+        self.path = f"{mirror_path}.{name}.lock"
+        self.shared = shared
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def acquire(self, blocking=True):
+        while True:
+            self._file = open(self.path, 'a')
+            if fcntl is None:
+                return True
+
+            flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(self._file, flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.release()
+                return False
+
+            # Eviction unlinks lock files while holding them, so a lock taken
+            # on a file that is no longer at self.path protects nothing
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino:
+                    return True
+            except FileNotFoundError:
+                pass
+            self.release()
+
+    def release(self):
+        if self._file is not None:
+            # Closing the descriptor drops the lock
+            self._file.close()
+            self._file = None
+
+    def unlink(self):
+        """Remove the lock file; only while holding the lock."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class _DirectoryLock:
+    """An exclusive flock() on a directory itself, released on exit."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def acquire(self, blocking=True):
+        if fcntl is None:
+            return True
+
+        self._fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+
+def _disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
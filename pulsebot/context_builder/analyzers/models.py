@@ -0,0 +1,51 @@
+from django.db import models
+
+class AnalysisCacheEntry(models.Model):
+    """A file analysis, stored under the git blob id of the content it was computed from.
+
+    Identical content always analyzes the same way, so an entry stays valid
+    for as long as the analyzer doesn't change; ``analyzer_version`` keys
+    out results of older analyzers.
+    """
+    blob_sha = models.CharField(max_length=40)
+    language = models.CharField(max_length=20)
+    analyzer_version = models.PositiveIntegerField()
+    analysis = models.JSONField()
+    last_used_at = models.DateTimeField(db_index=True)  # for least-recently-used eviction
+
+    class Meta:
+        unique_together = ('blob_sha', 'language', 'analyzer_version')
+
+    def __str__(self):
+        return f"{self.blob_sha[:12]} ({self.language}, v{self.analyzer_version})"
+
+class RepositoryAnalysis(models.Model):
+    """The latest analysis of a repository: the commit it covers and its summary.
+
+    Incremental analyses start from here and only look at what changed
+    since ``commit_sha``.
+    """
+    repo_url = models.CharField(max_length=500, unique=True)
+    commit_sha = models.CharField(max_length=40)
+    summary = models.JSONField()
+    analyzed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.repo_url}@{self.commit_sha[:12]}"
+
+class RepositoryFile(models.Model):
+    """An analyzed file of a repository at its baseline commit, with its share of the summary."""
+    repository = models.ForeignKey(RepositoryAnalysis, on_delete=models.CASCADE, related_name='files')
+    path = models.CharField(max_length=512)
+    language = models.CharField(max_length=20)
+    complexity = models.IntegerField(default=0)
+    lines_code = models.IntegerField(default=0)
+    lines_comment = models.IntegerField(default=0)
+    lines_blank = models.IntegerField(default=0)
+    lines_total = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('repository', 'path')
+
+    def __str__(self):
+        return f"{self.path} ({self.language})"
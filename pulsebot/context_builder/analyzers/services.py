@@ -1,53 +1,241 @@
 import logging
 import os
-from git import Repo
-import tempfile
 from django.conf import settings
-from .code_analyzer import CodeAnalyzer
+from django.db import transaction
+from django.db.models import Count, Sum
+from git import GitCommandError
+from .cache import AnalysisCache
+from .code_analyzer import AnalysisTimeout, CodeAnalyzer, blob_sha, decode_source, empty_summary
+from .mirrors import RepositoryMirrors
+from .models import RepositoryAnalysis, RepositoryFile
 from integrations.github.client import GitHubConnector
 from context_builder.trackers.models import ActivityEvent
 
 logger = logging.getLogger(__name__)
 
+# Keep the IN lists below SQLite's bound-variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+# Gitlinks (submodules) aren't files of this repository
+SUBMODULE_MODE = '160000'
+
+# A streamed scan reports its running totals after this many files
+STREAM_SUMMARY_EVERY = 100
+
+# Incremental analyses racing to move the same baseline retry this often before scanning fully
+BASELINE_ATTEMPTS = 3
+
 class CodeAnalysisService:
     """Service to analyze code repositories and integrate with activity tracking"""
     
     def __init__(self):
-        self.analyzer = CodeAnalyzer()
+        self.analyzer = CodeAnalyzer(file_timeout=getattr(settings, 'CODE_ANALYSIS_FILE_TIMEOUT', 30))
+        # Files whose content was analyzed before are read from the cache
+        self.cache = AnalysisCache() if getattr(settings, 'CODE_ANALYSIS_CACHE_MAX_ENTRIES', 200000) > 0 else None
+        # Repositories are fetched into long-lived local mirrors rather than cloned per analysis
+        self.mirrors = RepositoryMirrors()
     
-    def analyze_repository(self, repo_url, user_id=None, team_id=None):
-        """Clone and analyze a Git repository."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                # Clone the repository
-                logger.info(f"Cloning repository {repo_url} to {temp_dir}")
-                repo = Repo.clone_from(repo_url, temp_dir)
-                
-                # Analyze the repository
-                analysis_results = self.analyzer.scan_repository(temp_dir)
-                
-                # Track this analysis activity if user_id is provided
-                if user_id:
-                    from context_builder.trackers.models import ActivityTracker
-                    tracker = ActivityTracker()
-                    tracker.track_event(
-                        user_id=user_id,
-                        event_type='code_analysis',
-                        title=f"Code analysis for {repo_url}",
-                        description=f"Analyzed {analysis_results['summary']['analyzed_files']} files",
-                        metadata={
-                            'repository': repo_url,
-                            'summary': analysis_results['summary']
-                        },
-                        source_system='pulsebot',
-                        source_id=''
+    def analyze_repository(self, repo_url, user_id=None, team_id=None, incremental=False):
+        """Fetch a Git repository into its local mirror and analyze its default branch.
+        
+        Every analysis is kept as the repository's baseline. With
+        ``incremental``, only files changed since the baseline commit are
+        analyzed and the baseline summary is updated from them; without a
+        usable baseline this falls back to a full scan.
+        """
+        try:
+            analysis_results = None
+            if incremental:
+                baseline = RepositoryAnalysis.objects.filter(repo_url=repo_url).first()
+                if baseline:
+                    analysis_results = self._analyze_changes(repo_url, baseline)
+            
+            if analysis_results is None:
+                with self.mirrors.checkout(repo_url) as (worktree, commit_sha):
+                    # Analyze the repository
+                    analysis_results = self.analyzer.scan_repository(
+                        worktree,
+                        workers=getattr(settings, 'CODE_ANALYSIS_WORKERS', os.cpu_count() or 1),
+                        cache=self.cache
                     )
+                analysis_results['commit'] = commit_sha
+                self._save_baseline(repo_url, analysis_results)
+            
+            # Track this analysis activity if user_id is provided
+            if user_id:
+                self._track_repository_analysis(user_id, repo_url, analysis_results)
+            
+            return analysis_results
+            
+        except Exception as e:
+            logger.error(f"Error analyzing repository {repo_url}: {e}")
+            return {"error": f"Error analyzing repository: {str(e)}"}
+    
+    def stream_repository_analysis(self, repo_url, user_id=None):
+        """Scan a repository like ``analyze_repository``, yielding results as they are produced.
+        
+        Yields a ``file`` event per analyzed file, a ``summary`` event with
+        the running totals every ``STREAM_SUMMARY_EVERY`` files and a final
+        one with ``done`` set, or an ``error`` event if the scan fails. Files
+        aren't accumulated, so memory doesn't grow with the repository; for
+        the same reason the scan doesn't replace the stored baseline.
+        """
+        try:
+            summary = empty_summary()
+            with self.mirrors.checkout(repo_url) as (worktree, commit_sha):
+                for count, entry in enumerate(self.analyzer.iter_scan(
+                    worktree,
+                    workers=getattr(settings, 'CODE_ANALYSIS_WORKERS', os.cpu_count() or 1),
+                    cache=self.cache,
+                    summary=summary
+                ), 1):
+                    yield {'type': 'file', **entry}
+                    if count % STREAM_SUMMARY_EVERY == 0:
+                        yield {'type': 'summary', 'done': False, 'summary': summary}
+            
+            analysis_results = {'summary': summary, 'commit': commit_sha}
+            if user_id:
+                self._track_repository_analysis(user_id, repo_url, analysis_results)
+            yield {'type': 'summary', 'done': True, **analysis_results}
+            
+        except Exception as e:
+            logger.error(f"Error analyzing repository {repo_url}: {e}")
+            yield {'type': 'error', 'error': f"Error analyzing repository: {str(e)}"}
+    
+    def _track_repository_analysis(self, user_id, repo_url, analysis_results):
+        from context_builder.trackers.models import ActivityTracker
+        tracker = ActivityTracker()
+        tracker.track_event(
+            user_id=user_id,
+            event_type='code_analysis',
+            title=f"Code analysis for {repo_url}",
+            description=f"Analyzed {analysis_results['summary']['analyzed_files']} files",
+            metadata={
+                'repository': repo_url,
+                'commit': analysis_results['commit'],
+                'base_commit': analysis_results.get('base_commit'),
+                'summary': analysis_results['summary']
+            },
+            source_system='pulsebot',
+            source_id=''
+        )
+    
+    def _analyze_changes(self, repo_url, baseline):
+        """Bring ``baseline`` up to the repository's HEAD by analyzing only the files changed since.
+        
+        Returns None if the baseline commit can't be diffed against, e.g.
+        after a force push removed it.
+        """
+        for _ in range(BASELINE_ATTEMPTS):
+            base_commit = baseline.commit_sha
+            with self.mirrors.repository(repo_url) as repo:
+                commit_sha = repo.git.rev_parse('HEAD^{commit}')
+                try:
+                    changes = _changed_files(repo, base_commit, commit_sha)
+                except GitCommandError as e:
+                    logger.warning(f"Can't diff {repo_url} against baseline {base_commit}, scanning it fully: {e}")
+                    return None
                 
-                return analysis_results
+                analyses = self._analyze_blobs(repo, [
+                    (path, blob, language)
+                    for status, path, blob in changes
+                    if status != 'D' and (language := self.analyzer.scanned_language(path))
+                ])
+            
+            with transaction.atomic():
+                baseline = RepositoryAnalysis.objects.select_for_update().get(pk=baseline.pk)
+                # Another analysis moved the baseline meanwhile; start over from where it left it
+                if baseline.commit_sha != base_commit:
+                    continue
+                changed = self._apply_changes(baseline, commit_sha, changes, analyses)
+            
+            return {
+                'summary': baseline.summary,
+                'commit': commit_sha,
+                'base_commit': base_commit,
+                'changes': changed,
+                'files': analyses
+            }
+        
+        return None
+    
+    def _apply_changes(self, baseline, commit_sha, changes, analyses):
+        """Update the baseline's files and summary with a diff and the analyses of its files."""
+        changed = {'added': [], 'modified': [], 'removed': []}
+        languages = dict(baseline.summary.get('languages', {}))
+        for status, path, _ in changes:
+            language = self.analyzer.scanned_language(path)
+            if not language:
+                continue
+            
+            if status == 'A':
+                changed['added'].append(path)
+                languages[language] = languages.get(language, 0) + 1
+            elif status == 'D':
+                changed['removed'].append(path)
+                languages[language] -= 1
+                if not languages[language]:
+                    del languages[language]
+            else:
+                changed['modified'].append(path)
+        
+        stale = changed['modified'] + changed['removed']
+        for start in range(0, len(stale), LOOKUP_CHUNK_SIZE):
+            baseline.files.filter(path__in=stale[start:start + LOOKUP_CHUNK_SIZE]).delete()
+        RepositoryFile.objects.bulk_create([_repository_file(baseline, entry) for entry in analyses], batch_size=500)
+        
+        baseline.commit_sha = commit_sha
+        baseline.summary = _baseline_summary(baseline, languages)
+        baseline.save()
+        return changed
+    
+    def _analyze_blobs(self, repo, blobs):
+        """Analyses of (path, blob sha, language) files read straight from the object database."""
+        cached = self.cache.get_many((blob, language) for _, blob, language in blobs) if self.cache is not None else {}
+        fresh = {}
+        
+        analyses = []
+        for path, blob, language in blobs:
+            analysis = cached.get((blob, language))
+            if analysis is None:
+                try:
+                    analysis = self.analyzer.analyze_text(decode_source(repo.odb.stream(bytes.fromhex(blob)).read()), language)
+                except (Exception, AnalysisTimeout) as e:
+                    logger.warning(f"Could not analyze file {path}: {e}")
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Error analyzing repository {repo_url}: {e}")
-                return {"error": f"Error analyzing repository: {str(e)}"}
+                # Skip empty files
+                if analysis is None:
+                    continue
+                fresh[(blob, language)] = analysis
+            
+            analyses.append({
+                'path': path,
+                'language': language,
+                'analysis': analysis
+            })
+        
+        if self.cache is not None:
+            self.cache.set_many(fresh)
+        return analyses
+    
+    def _save_baseline(self, repo_url, analysis_results):
+        """Keep a full scan as the repository's baseline for incremental analyses."""
+        if 'summary' not in analysis_results:
+            return
+        
+        with transaction.atomic():
+            baseline, _ = RepositoryAnalysis.objects.update_or_create(
+                repo_url=repo_url,
+                defaults={
+                    'commit_sha': analysis_results['commit'],
+                    'summary': analysis_results['summary']
+                }
+            )
+            baseline.files.all().delete()
+            RepositoryFile.objects.bulk_create([
+                _repository_file(baseline, entry) for entry in analysis_results['files']
+            ], batch_size=500)
     
     def analyze_github_pr(self, owner, repo, pr_number, user_id=None, team_id=None):
         """Analyze a specific GitHub pull request."""
@@ -80,6 +268,23 @@ class CodeAnalysisService:
                 "file_analyses": []
             }
             
+            # Determine language based on extension
+            language_map = {
+                '.py': 'python',
+                '.js': 'javascript', 
+                '.ts': 'typescript',
+                '.java': 'java'
+            }
+            
+            # GitHub gives each file's blob id, so unchanged files need neither a download nor analysis
+            blob_keys = []
+            for file in files:
+                language = language_map.get(os.path.splitext(file.get('filename') or '')[1].lower())
+                if language and file.get('sha'):
+                    blob_keys.append((file['sha'], language))
+            cached = self.cache.get_many(blob_keys) if self.cache is not None else {}
+            fresh = {}
+            
             # Analyze each file in the PR
             for file in files:
                 filename = file.get('filename')
@@ -93,39 +298,34 @@ class CodeAnalysisService:
                 _, ext = os.path.splitext(filename)
                 ext = ext.lower()
                 
-                # Determine language based on extension
-                language_map = {
-                    '.py': 'python',
-                    '.js': 'javascript', 
-                    '.ts': 'typescript',
-                    '.java': 'java'
-                }
-                
                 language = language_map.get(ext)
                 if not language:
                     continue  # Skip unsupported file types
                 
-                # Get file content
-                if file.get('raw_url'):
-                    # Use the raw content URL if available
-                    import requests
-                    response = requests.get(file.get('raw_url'))
-                    if response.status_code == 200:
-                        content = response.text
+                analysis = cached.get((file.get('sha'), language))
+                if analysis is None:
+                    # Get file content
+                    if file.get('raw_url'):
+                        # Use the raw content URL if available
+                        import requests
+                        response = requests.get(file.get('raw_url'))
+                        if response.status_code == 200:
+                            content = response.text
+                        else:
+                            continue
                     else:
-                        continue
-                else:
-                    # Otherwise try to get content via API
-                    content_data = github._make_request('GET', f'/repos/{owner}/{repo}/contents/{filename}', 
-                                                       params={'ref': pr_details.get('head', {}).get('ref')})
-                    if not content_data or 'content' not in content_data:
-                        continue
+                        # Otherwise try to get content via API
+                        content_data = github._make_request('GET', f'/repos/{owner}/{repo}/contents/{filename}', 
+                                                           params={'ref': pr_details.get('head', {}).get('ref')})
+                        if not content_data or 'content' not in content_data:
+                            continue
+                        
+                        import base64
+                        content = base64.b64decode(content_data['content']).decode('utf-8')
                     
-                    import base64
-                    content = base64.b64decode(content_data['content']).decode('utf-8')
-                
-                # Analyze the file
-                analysis = self.analyzer.analyze_code(content, language)
+                    # Analyze the file
+                    analysis = self.analyzer.analyze_code(content, language)
+                    fresh[(file.get('sha') or blob_sha(content.encode('utf-8')), language)] = analysis
                 
                 # Update statistics
                 results["files_analyzed"] += 1
@@ -148,6 +348,9 @@ class CodeAnalysisService:
                     "analysis": analysis
                 })
             
+            if self.cache is not None:
+                self.cache.set_many(fresh)
+            
             # Track this analysis
             if user_id:
                 from context_builder.trackers.models import ActivityTracker
@@ -159,7 +362,9 @@ class CodeAnalysisService:
                     description=f"Analyzed {results['files_analyzed']} files with {len(results['suggestions'])} suggestions",
                     metadata=results,
                     source_system='github',
-                    source_id=str(pr_number)
+                    # Re-analyzing the same head commit is a duplicate, a new push is not
+                    source_id=f"{owner}/{repo}#{pr_number}@{pr_details.get('head', {}).get('sha', '')}",
+                    ignore_conflicts=True
                 )
             
             return results
@@ -198,4 +403,61 @@ class CodeAnalysisService:
             
         except Exception as e:
             logger.error(f"Error analyzing code snippet: {e}")
-            return {"error": f"Error analyzing code: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Error analyzing code: {str(e)}"}
+
+
+def _changed_files(repo, base, head):
+    """(status, path, new blob sha) of files added (A), modified (M) or deleted (D) between two commits."""
+    entries = []
+    if base == head:
+        return entries
+    
+    fields = repo.git.diff('--raw', '-z', '--no-renames', '--no-abbrev', base, head).split('\0')
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        old_mode, new_mode, _, new_blob, status = meta.lstrip(':').split()
+        if SUBMODULE_MODE in (old_mode, new_mode):
+            continue
+        # Type changes (e.g. file to symlink) count as modifications
+        entries.append((status if status in ('A', 'D') else 'M', path, new_blob))
+    return entries
+
+
+def _repository_file(baseline, entry):
+    analysis = entry['analysis']
+    lines = analysis.get('lines', {})
+    return RepositoryFile(
+        repository=baseline,
+        path=entry['path'],
+        language=entry['language'],
+        complexity=analysis.get('complexity', 0),
+        lines_code=lines.get('code', 0),
+        lines_comment=lines.get('comment', 0),
+        lines_blank=lines.get('blank', 0),
+        lines_total=lines.get('total', 0)
+    )
+
+
+def _baseline_summary(baseline, languages):
+    """A scan summary recomputed from the baseline's files, in ``scan_repository``'s shape."""
+    totals = baseline.files.aggregate(
+        files=Count('id'),
+        complexity=Sum('complexity'),
+        code=Sum('lines_code'),
+        comment=Sum('lines_comment'),
+        blank=Sum('lines_blank'),
+        total=Sum('lines_total')
+    )
+    return {
+        'analyzed_files': totals['files'],
+        'languages': languages,
+        'complexity': {
+            'total_score': totals['complexity'] or 0,
+            'average_score': totals['complexity'] / totals['files'] if totals['files'] else 0
+        },
+        'lines': {
+            'code': totals['code'] or 0,
+            'comment': totals['comment'] or 0,
+            'blank': totals['blank'] or 0,
+            'total': totals['total'] or 0
+        }
+    }
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('scan/stream/', views.stream_repository_scan, name='stream_repository_scan'),
+]
@@ -0,0 +1,29 @@
+import json
+from urllib.parse import urlparse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from .services import CodeAnalysisService
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stream_repository_scan(request):
+    """API endpoint streaming a repository scan as NDJSON: a line per file, running summaries, then the final summary."""
+    repo_url = request.query_params.get('repo_url', '')
+    
+    # Only remote repositories; file:// and bare paths would read the server's own disk
+    if urlparse(repo_url).scheme != 'https':
+        return JsonResponse({
+            'success': False,
+            'error': 'repo_url must be an https:// Git URL'
+        }, status=400)
+    
+    events = CodeAnalysisService().stream_repository_analysis(repo_url, user_id=request.user.id)
+    response = StreamingHttpResponse(
+        (json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in events),
+        content_type='application/x-ndjson'
+    )
+    # Let proxies pass lines on as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
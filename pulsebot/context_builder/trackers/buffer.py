@@ -0,0 +1,267 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWrites:
+    """Outcome of the items one caller offered inside ``WriteBehindBuffer.tracking()``."""
+
+    def __init__(self):
+        self.pending = 0
+        self.written = 0
+        self.failed = 0
+
+
+class WriteBehindBuffer:
+    """Collects items from request threads and hands them to ``flush_func`` in batches.
+
+    A background thread flushes as soon as ``max_batch`` items are pending, or
+    ``flush_interval`` seconds after the oldest pending item arrived, whichever
+    comes first. ``offer`` never blocks on the database: once ``max_pending``
+    items are waiting it refuses new ones so callers can shed load, and the
+    refusals show up in ``stats()`` alongside queue depth and flush timings.
+    Whatever is still pending when the process exits is flushed by an atexit
+    hook.
+
+    ``flush_func`` either raises, failing the whole batch, or returns the
+    items it couldn't write. Callers were already told their items were
+    accepted, so failed items go back to the front of the queue and are
+    retried after ``retry_delay`` seconds, doubling per attempt, up to
+    ``max_retries`` times before they are dropped and counted in ``stats()``.
+
+    Callers with a durable retry path of their own (the webhook queue worker)
+    offer inside ``tracking()`` instead, flush, and then check which of their
+    items were written: their failed items are handed back rather than
+    retried in memory.
+    """
+
+    BATCH_SIZE_BUCKETS = (1, 10, 100, 1000)
+
+    def __init__(self, flush_func, name, max_batch=500, flush_interval=0.2, max_pending=10000,
+                 max_retries=3, retry_delay=1.0):
+        self.flush_func = flush_func
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        # (arrived_at, failed_attempts, item, BufferedWrites or None), oldest first
+        self._items = deque()
+        self._retry_at = 0.0
+        # Batches taken off the queue whose flush hasn't finished yet
+        self._in_flight = 0
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stats = {
+            'accepted': 0,
+            'rejected': 0,
+            'flushed': 0,
+            'failed': 0,
+            'retried': 0,
+            'dropped': 0,
+            'returned': 0,
+            'flushes': 0,
+            'high_watermark': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'last_batch_size': 0,
+            'batch_sizes': {self._bucket(size): 0 for size in self.BATCH_SIZE_BUCKETS + (self.BATCH_SIZE_BUCKETS[-1] + 1,)},
+        }
+
+    def offer(self, item):
+        """Queue an item for the next flush. Returns False when the buffer is full."""
+        return self.offer_many([item])
+
+    def offer_many(self, items):
+        """Queue several items together; either all are accepted or none are."""
+        if not items:
+            return True
+
+        with self._cond:
+            if len(self._items) + len(items) > self.max_pending:
+                self._stats['rejected'] += len(items)
+                return False
+
+            was_empty = not self._items
+            now = time.monotonic()
+            writes = getattr(self._local, 'writes', None)
+            if writes is not None:
+                writes.pending += len(items)
+            self._items.extend((now, 0, item, writes) for item in items)
+            self._stats['accepted'] += len(items)
+            self._stats['high_watermark'] = max(self._stats['high_watermark'], len(self._items))
+
+            if len(self._items) >= self.max_batch or was_empty:
+                self._cond.notify()
+
+        self._ensure_thread()
+        return True
+
+    @contextmanager
+    def tracking(self):
+        """Record the outcome of the items this thread offers inside the block.
+
+        Yields a ``BufferedWrites`` whose counts are final once ``flush()``
+        returns. Its failed items are not retried by the buffer.
+        """
+        writes = self._local.writes = BufferedWrites()
+        try:
+            yield writes
+        finally:
+            self._local.writes = None
+
+    def flush(self):
+        """Synchronously write everything pending, in batches of ``max_batch``.
+
+        Failed items wait out their backoff here too rather than being
+        retried in a tight loop. Batches the background thread is still
+        writing are waited for, so every item offered before the call has
+        been written, handed back or dropped when it returns.
+        """
+        while True:
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+                continue
+
+            with self._cond:
+                while self._in_flight and not self._items:
+                    self._cond.wait()
+                if not self._items:
+                    return
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._items)
+        stats['batch_sizes'] = dict(stats['batch_sizes'])
+        stats['avg_batch_size'] = stats['flushed'] / stats['flushes'] if stats['flushes'] else 0
+        stats.update({
+            'name': self.name,
+            'max_batch': self.max_batch,
+            'flush_interval_ms': self.flush_interval * 1000,
+            'max_pending': self.max_pending,
+            'max_retries': self.max_retries,
+        })
+        return stats
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # The flusher is a daemon thread, so write out leftovers on interpreter exit
+                    atexit.register(self._flush_on_exit)
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+                self._thread.start()
+
+    def _flush_on_exit(self):
+        pending = self.stats()['pending']
+        if pending:
+            logger.info(f"{self.name}: flushing {pending} pending items on shutdown")
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._items:
+                    self._cond.wait()
+                while self._items:
+                    # A full batch goes out at once, unless a failed flush is backing off
+                    if len(self._items) >= self.max_batch:
+                        due = self._retry_at
+                    else:
+                        due = max(self._items[0][0] + self.flush_interval, self._retry_at)
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+
+    def _take_batch(self):
+        # Leftover items keep their arrival times, so the oldest still sets the deadline
+        with self._cond:
+            count = min(len(self._items), self.max_batch)
+            if count:
+                self._in_flight += 1
+            return [self._items.popleft() for _ in range(count)]
+
+    def _write(self, batch):
+        try:
+            self._write_batch(batch)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        close_old_connections()
+        items = [item for _, _, item, _ in batch]
+        start = time.perf_counter()
+        try:
+            failed_items = self.flush_func(items) or ()
+        except Exception as e:
+            logger.error(f"{self.name}: failed to flush {len(batch)} items: {e}")
+            failed_items = items
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        failed_ids = {id(item) for item in failed_items}
+        failed = [
+            (arrived_at, attempts + 1, item, writes)
+            for arrived_at, attempts, item, writes in batch if id(item) in failed_ids
+        ]
+        returned = [entry for entry in failed if entry[3] is not None]
+        retry = [entry for entry in failed if entry[3] is None and entry[1] <= self.max_retries]
+        dropped = len(failed) - len(retry) - len(returned)
+        if dropped:
+            logger.error(f"{self.name}: dropping {dropped} items that failed {self.max_retries + 1} flushes")
+
+        with self._cond:
+            for _, _, item, writes in batch:
+                if writes is not None:
+                    writes.pending -= 1
+                    if id(item) in failed_ids:
+                        writes.failed += 1
+                    else:
+                        writes.written += 1
+            if retry:
+                # Back to the front, in their original order
+                self._items.extendleft(reversed(retry))
+                attempts = max(entry[1] for entry in retry)
+                self._retry_at = time.monotonic() + self.retry_delay * 2 ** (attempts - 1)
+                self._stats['retried'] += len(retry)
+            self._stats['dropped'] += dropped
+            self._stats['returned'] += len(returned)
+            self._stats['flushes'] += 1
+            self._stats['flushed'] += len(batch) - len(failed)
+            self._stats['failed'] += len(failed)
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            self._stats['total_flush_ms'] += elapsed_ms
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['batch_sizes'][self._bucket(len(batch))] += 1
+
+    def _bucket(self, size):
+        """Histogram label for a batch size: '1', '2-10', '11-100', '101-1000', '>1000'."""
+        lower = 1
+        for upper in self.BATCH_SIZE_BUCKETS:
+            if size <= upper:
+                return str(upper) if lower == upper else f"{lower}-{upper}"
+            lower = upper + 1
+        return f">{self.BATCH_SIZE_BUCKETS[-1]}"
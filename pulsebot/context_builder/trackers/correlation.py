@@ -1,9 +1,17 @@
 import logging
-import re
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Q
-from .models import ActivityEvent
+from django.utils.functional import cached_property
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import ExtractHour
+from core.models import TeamMember
+from .models import ActivityEvent, ActivityLink, ActivityReference
+from .links import link_role, mentions_pull_request
+from .references import REFERENCE_PATTERN, find_references
+from .result_cache import correlation_cache
+from .issue_index import document_shingles, issue_documents, issues_in_buckets
+from .similarity import MinHashLSH, MinHasher, jaccard
 from integrations.github.client import GitHubConnector
 from integrations.jira.client import JiraConnector
 
@@ -15,154 +23,381 @@ class ActivityCorrelator:
     def __init__(self, user_id=None, team_id=None):
         self.user_id = user_id
         self.team_id = team_id
-        self.github = GitHubConnector(user_id=user_id, team_id=team_id)
-        self.jira = JiraConnector(user_id=user_id, team_id=team_id)
     
-    def correlate_activities(self, days=7):
-        """Find correlations between activities across different systems."""
+    # Correlation only reads tracked events; the API connectors (and their
+    # credential lookups) are built the first time something needs them
+    @cached_property
+    def github(self):
+        return GitHubConnector(user_id=self.user_id, team_id=self.team_id)
+    
+    @cached_property
+    def jira(self):
+        return JiraConnector(user_id=self.user_id, team_id=self.team_id)
+    
+    @correlation_cache.cached('correlations')
+    def correlate_activities(self, days=7, engine='links', fuzzy=False):
+        """Find correlations between activities across different systems.
+        
+        The default engine reads the ActivityLink edges maintained at ingest.
+        ``engine='memory'`` gives the same result from the events alone, for
+        data whose links haven't been built (or to check them). With
+        ``fuzzy``, commits and PRs that mention no issue key also get
+        similarity-based issue suggestions (see ``suggest_issue_links``).
+        """
         if not self.user_id:
             return {"error": "User ID required for correlation"}
         
         start_date = timezone.now() - timedelta(days=days)
         
-        # Get all activities for the user in the specified time period
-        activities = ActivityEvent.objects.filter(
+        if engine == 'memory':
+            correlations, counts = self._correlate_in_memory(start_date)
+        else:
+            correlations, counts = self._correlate_from_links(start_date)
+        
+        if fuzzy:
+            correlations = correlations + self.suggest_issue_links(days=days)
+        
+        # Get summary information
+        summary = {
+            "user_id": self.user_id,
+            "period_days": days,
+            "total_activities": sum(counts.values()),
+            "github_activities": counts.get('github', 0),
+            "jira_activities": counts.get('jira', 0),
+            "slack_activities": counts.get('slack', 0),
+            "correlation_count": len(correlations)
+        }
+        
+        return {
+            "summary": summary,
+            "correlations": correlations
+        }
+    
+    def _correlate_from_links(self, start_date):
+        """Correlations from a range query over the user's links whose two events are in the window."""
+        # Position of the key in the source's text, so keys keep their order of mention
+        mention_order = ActivityReference.objects.filter(
+            event_id=OuterRef('source_id'),
+            ref_type__in=['jira_issue', 'github_ref'],
+            ref_key=OuterRef('ref_key')
+        ).order_by('id').values('id')[:1]
+        
+        links = ActivityLink.objects.filter(
+            user_id=self.user_id,
+            created_at__gte=start_date,
+            source__created_at__gte=start_date,
+            target__created_at__gte=start_date
+        ).annotate(
+            mention_order=Subquery(mention_order)
+        ).order_by(
+            'source__created_at', 'source_id', 'mention_order', 'target__created_at', 'target_id'
+        ).values_list(
+            'link_type', 'ref_key', 'source_id', 'source__title', 'source__description', 'source__created_at',
+            'target_id', 'target__title', 'target__created_at'
+        )
+        
+        # Group edges into correlations: one per mentioned issue key, one per linked PR event
+        correlations_by_type = defaultdict(list)
+        current_key = None
+        for link_type, ref_key, source_id, source_title, source_text, source_at, target_id, target_title, target_at in links:
+            if link_type == 'slack_to_pr':
+                correlations_by_type['slack'].append({
+                    "type": "slack_to_pr",
+                    "slack_message": {
+                        "id": source_id,
+                        "text": source_text[:100],
+                        "created_at": source_at
+                    },
+                    "pr": {
+                        "id": target_id,
+                        "title": target_title,
+                        "number": int(ref_key),
+                        "created_at": target_at
+                    }
+                })
+                current_key = None
+                continue
+            
+            issue = {
+                "id": target_id,
+                "key": ref_key,
+                "title": target_title,
+                "created_at": target_at
+            }
+            if current_key == (source_id, link_type, ref_key):
+                correlation['issues'].append(issue)
+                continue
+            
+            current_key = (source_id, link_type, ref_key)
+            if link_type == 'slack_to_issue':
+                correlation = {
+                    "type": link_type,
+                    "slack_message": {
+                        "id": source_id,
+                        "text": source_text[:100],
+                        "created_at": source_at
+                    },
+                    "issues": [issue]
+                }
+                correlations_by_type['slack'].append(correlation)
+            else:
+                correlation = {
+                    "type": link_type,
+                    "commit" if link_type == 'commit_to_issue' else "pr": {
+                        "id": source_id,
+                        "title": source_title,
+                        "created_at": source_at
+                    },
+                    "issues": [issue]
+                }
+                correlations_by_type[link_type].append(correlation)
+        
+        # Commits first, then PRs, then Slack messages
+        correlations = (
+            correlations_by_type['commit_to_issue'] +
+            correlations_by_type['pr_to_issue'] +
+            correlations_by_type['slack']
+        )
+        
+        # Activity counts per source system for the summary
+        counts = dict(ActivityEvent.objects.filter(
             user_id=self.user_id,
             created_at__gte=start_date
-        ).order_by('created_at')
+        ).values_list('source_system').annotate(count=Count('id')).order_by())
         
-        # Group activities by source system
-        github_activities = activities.filter(source_system='github')
-        jira_activities = activities.filter(source_system='jira')
-        slack_activities = activities.filter(source_system='slack')
+        return correlations, counts
+    
+    def _correlate_in_memory(self, start_date):
+        """Correlations from one pass over the window's events, matching references in memory.
         
-        # Find correlations
-        correlations = []
+        Loads only the needed columns in a single query and indexes Jira events
+        by issue key and PR events by number, so each mention is a dict lookup.
+        """
+        events = ActivityEvent.objects.filter(
+            user_id=self.user_id,
+            created_at__gte=start_date
+        ).order_by('created_at', 'id').values_list(
+            'id', 'source_system', 'event_type', 'title', 'description', 'metadata', 'created_at'
+        )
         
-        # 1. Find commits related to Jira issues
-        github_commits = github_activities.filter(event_type='commit')
-        for commit in github_commits:
-            # Look for Jira issue keys in commit messages (e.g., PROJECT-123)
-            issue_keys = self._extract_jira_issues(commit.title) or self._extract_jira_issues(commit.description)
+        counts = defaultdict(int)
+        issues_by_key = defaultdict(list)
+        prs_by_number = defaultdict(list)
+        mentions = []
+        for event_id, source_system, event_type, title, description, metadata, created_at in events.iterator():
+            counts[source_system] += 1
             
-            for issue_key in issue_keys:
-                # Find related Jira activities
-                related_jira = jira_activities.filter(
-                    Q(title__icontains=issue_key) | 
-                    Q(description__icontains=issue_key) |
-                    Q(source_id=issue_key)
-                )
-                
-                if related_jira.exists():
-                    correlations.append({
-                        "type": "commit_to_issue",
-                        "commit": {
-                            "id": commit.id,
-                            "title": commit.title,
-                            "created_at": commit.created_at
-                        },
-                        "issues": [{
-                            "id": issue.id,
-                            "key": issue_key,
-                            "title": issue.title,
-                            "created_at": issue.created_at
-                        } for issue in related_jira]
+            for ref_type, ref_key in find_references(source_system, event_type, title, description, metadata):
+                role = link_role(ref_type, source_system, event_type)
+                if role == 'target' and ref_type == 'jira_issue':
+                    issues_by_key[ref_key].append({
+                        "id": event_id,
+                        "key": ref_key,
+                        "title": title,
+                        "created_at": created_at
                     })
-        
-        # 2. Find PRs related to Jira issues
-        github_prs = github_activities.filter(event_type__startswith='pr_')
-        for pr in github_prs:
-            # Look for Jira issue keys
-            issue_keys = self._extract_jira_issues(pr.title) or self._extract_jira_issues(pr.description)
-            
-            for issue_key in issue_keys:
-                # Find related Jira activities
-                related_jira = jira_activities.filter(
-                    Q(title__icontains=issue_key) | 
-                    Q(description__icontains=issue_key) |
-                    Q(source_id=issue_key)
-                )
-                
-                if related_jira.exists():
-                    correlations.append({
-                        "type": "pr_to_issue",
-                        "pr": {
-                            "id": pr.id,
-                            "title": pr.title,
-                            "created_at": pr.created_at
-                        },
-                        "issues": [{
-                            "id": issue.id,
-                            "key": issue_key,
-                            "title": issue.title,
-                            "created_at": issue.created_at
-                        } for issue in related_jira]
+                elif role == 'target':
+                    prs_by_number[ref_key].append({
+                        "id": event_id,
+                        "title": title,
+                        "number": int(ref_key),
+                        "created_at": created_at
                     })
+                elif role == 'source':
+                    mentions.append((ref_type, ref_key, event_id, source_system, event_type, title, description, created_at))
         
-        # 3. Correlate Slack messages with GitHub and Jira activities
-        for slack_msg in slack_activities:
-            # Find referenced GitHub PRs in Slack messages
-            if 'pull request' in slack_msg.description.lower() or 'pr' in slack_msg.description.lower():
-                for pr in github_prs:
-                    # Check if PR number or title is mentioned in Slack message
-                    pr_metadata = pr.metadata or {}
-                    pr_number = pr_metadata.get('pr_number')
-                    
-                    if pr_number and f"#{pr_number}" in slack_msg.description:
-                        correlations.append({
+        # Mentions are in event order and, within an event, in order of appearance
+        correlations_by_type = defaultdict(list)
+        for ref_type, ref_key, event_id, source_system, event_type, title, description, created_at in mentions:
+            if source_system == 'slack':
+                slack_message = {
+                    "id": event_id,
+                    "text": description[:100],
+                    "created_at": created_at
+                }
+                if ref_type == 'github_ref':
+                    if mentions_pull_request(description):
+                        correlations_by_type['slack'].extend({
                             "type": "slack_to_pr",
-                            "slack_message": {
-                                "id": slack_msg.id,
-                                "text": slack_msg.description[:100],
-                                "created_at": slack_msg.created_at
-                            },
-                            "pr": {
-                                "id": pr.id,
-                                "title": pr.title,
-                                "number": pr_number,
-                                "created_at": pr.created_at
-                            }
-                        })
-            
-            # Find referenced Jira issues in Slack messages
-            issue_keys = self._extract_jira_issues(slack_msg.description)
-            for issue_key in issue_keys:
-                related_jira = jira_activities.filter(
-                    Q(title__icontains=issue_key) | 
-                    Q(description__icontains=issue_key) |
-                    Q(source_id=issue_key)
-                )
-                
-                if related_jira.exists():
-                    correlations.append({
+                            "slack_message": slack_message,
+                            "pr": dict(pr)
+                        } for pr in prs_by_number.get(ref_key, []))
+                elif ref_key in issues_by_key:
+                    correlations_by_type['slack'].append({
                         "type": "slack_to_issue",
-                        "slack_message": {
-                            "id": slack_msg.id,
-                            "text": slack_msg.description[:100],
-                            "created_at": slack_msg.created_at
-                        },
-                        "issues": [{
-                            "id": issue.id,
-                            "key": issue_key,
-                            "title": issue.title,
-                            "created_at": issue.created_at
-                        } for issue in related_jira]
+                        "slack_message": slack_message,
+                        "issues": [dict(issue) for issue in issues_by_key[ref_key]]
                     })
+            elif ref_key in issues_by_key:
+                link_type = 'commit_to_issue' if event_type == 'commit' else 'pr_to_issue'
+                correlations_by_type[link_type].append({
+                    "type": link_type,
+                    "commit" if link_type == 'commit_to_issue' else "pr": {
+                        "id": event_id,
+                        "title": title,
+                        "created_at": created_at
+                    },
+                    "issues": [dict(issue) for issue in issues_by_key[ref_key]]
+                })
         
-        # Get summary information
-        summary = {
-            "user_id": self.user_id,
-            "period_days": days,
-            "total_activities": activities.count(),
-            "github_activities": github_activities.count(),
-            "jira_activities": jira_activities.count(),
-            "slack_activities": slack_activities.count(),
-            "correlation_count": len(correlations)
+        correlations = (
+            correlations_by_type['commit_to_issue'] +
+            correlations_by_type['pr_to_issue'] +
+            correlations_by_type['slack']
+        )
+        return correlations, counts
+    
+    def suggest_issue_links(self, days=7, history_days=365, min_confidence=0.35, max_issues=3):
+        """Suggest Jira issues for the user's commits and PRs that don't mention an issue key.
+        
+        Issues created by the user's teammates over ``history_days`` are
+        indexed by MinHash/LSH on their summary and description as they are
+        tracked (see ``issue_index``). Each key-less commit or PR from the
+        last ``days`` is compared only with the issues sharing an LSH bucket
+        with it, found through that index, and candidates are scored by the
+        Jaccard similarity of their shingles (the ``confidence``). The cost
+        follows the commits and PRs in the window, not the issue history.
+        """
+        if not self.user_id:
+            return []
+        
+        now = timezone.now()
+        hasher = MinHasher()
+        lsh = MinHashLSH()
+        
+        events = []
+        for event_id, event_type, title, description, metadata, created_at in ActivityEvent.objects.filter(
+            Q(event_type='commit') | Q(event_type__startswith='pr_'),
+            user_id=self.user_id,
+            source_system='github',
+            created_at__gte=now - timedelta(days=days)
+        ).order_by('created_at', 'id').values_list('id', 'event_type', 'title', 'description', 'metadata', 'created_at').iterator():
+            refs = find_references('github', event_type, title, description, metadata)
+            if any(ref_type == 'jira_issue' for ref_type, _ in refs):
+                # Already correlated exactly
+                continue
+            
+            event_shingles = document_shingles(title, description)
+            signature = hasher.signature(event_shingles)
+            if signature is None:
+                continue
+            events.append((event_id, event_type, title, created_at, event_shingles, lsh.buckets(signature)))
+        
+        if not events:
+            return []
+        
+        # Issues of everyone on the user's teams that share a bucket with any of the events
+        in_bucket = issues_in_buckets({bucket for event in events for bucket in event[5]})
+        issues = issue_documents(
+            set().union(*in_bucket.values()),
+            self._team_user_ids(),
+            now - timedelta(days=history_days)
+        )
+        if not issues:
+            return []
+        
+        suggestions = []
+        for event_id, event_type, title, created_at, event_shingles, buckets in events:
+            candidates = {
+                issues[issue_id][0]: issues[issue_id]
+                for bucket in buckets
+                for issue_id in in_bucket.get(bucket, ())
+                if issue_id in issues
+            }
+            scored = sorted((
+                (jaccard(event_shingles, issue_shingles), key)
+                for key, (_, _, issue_shingles) in candidates.items()
+            ), reverse=True)
+            matches = [
+                dict(candidates[key][1], confidence=round(confidence, 2))
+                for confidence, key in scored[:max_issues] if confidence >= min_confidence
+            ]
+            if not matches:
+                continue
+            
+            link_type = 'commit_to_issue' if event_type == 'commit' else 'pr_to_issue'
+            suggestions.append({
+                "type": link_type,
+                "commit" if link_type == 'commit_to_issue' else "pr": {
+                    "id": event_id,
+                    "title": title,
+                    "created_at": created_at
+                },
+                "issues": matches,
+                "match": "similarity"
+            })
+        
+        return suggestions
+    
+    def _team_user_ids(self):
+        """The user and everyone sharing a team with them (or with ``team_id`` when set)."""
+        if self.team_id:
+            teams = [self.team_id]
+        else:
+            teams = TeamMember.objects.filter(user_id=self.user_id).values('team_id')
+        
+        user_ids = set(TeamMember.objects.filter(team_id__in=teams).values_list('user_id', flat=True))
+        user_ids.add(self.user_id)
+        return user_ids
+    
+    def trace_links(self, event_id, max_hops=3, direction='outgoing'):
+        """Follow links from one of the user's events across several hops.
+        
+        Outgoing chains run from a mention to what it mentions (Slack message
+        -> PR -> issue); incoming chains run the other way (issue <- PR <-
+        Slack message). One query per hop, however much history there is.
+        """
+        if not self.user_id:
+            return {"error": "User ID required for link tracing"}
+        
+        if direction == 'outgoing':
+            near, far = 'source_id', 'target_id'
+        else:
+            near, far = 'target_id', 'source_id'
+        
+        chains = []
+        paths = [[(event_id, None, None)]]
+        for _ in range(max_hops):
+            edges = defaultdict(list)
+            for near_id, far_id, link_type, ref_key in ActivityLink.objects.filter(
+                user_id=self.user_id,
+                **{f"{near}__in": {path[-1][0] for path in paths}}
+            ).order_by(far).values_list(near, far, 'link_type', 'ref_key'):
+                edges[near_id].append((far_id, link_type, ref_key))
+            
+            next_paths = []
+            for path in paths:
+                visited = {node for node, _, _ in path}
+                extended = [path + [edge] for edge in edges[path[-1][0]] if edge[0] not in visited]
+                if extended:
+                    next_paths.extend(extended)
+                elif len(path) > 1:
+                    chains.append(path)
+            
+            paths = next_paths
+            if not paths:
+                break
+        chains.extend(paths)
+        
+        # Load the events on every chain in one go
+        event_ids = {node for chain in chains for node, _, _ in chain} | {event_id}
+        events = {
+            event['id']: event
+            for event in ActivityEvent.objects.filter(id__in=event_ids, user_id=self.user_id).values(
+                'id', 'event_type', 'source_system', 'title', 'created_at'
+            )
         }
+        if event_id not in events:
+            return {"error": "Event not found"}
         
         return {
-            "summary": summary,
-            "correlations": correlations
+            "event": events[event_id],
+            "direction": direction,
+            "chains": [[{
+                "link_type": link_type,
+                "ref_key": ref_key,
+                "event": events.get(node)
+            } for node, link_type, ref_key in chain[1:]] for chain in chains]
         }
     
     def _extract_jira_issues(self, text):
@@ -170,11 +405,9 @@ class ActivityCorrelator:
         if not text:
             return []
         
-        # Common Jira issue pattern
-        pattern = r'([A-Z]+-\d+)'
-        matches = re.findall(pattern, text)
-        return matches
+        return [match.group('jira') for match in REFERENCE_PATTERN.finditer(text) if match.group('jira')]
     
+    @correlation_cache.cached('workflow_pattern')
     def get_user_workflow_pattern(self, days=30):
         """Analyze user workflow patterns based on activity sequence."""
         if not self.user_id:
@@ -182,89 +415,93 @@ class ActivityCorrelator:
         
         start_date = timezone.now() - timedelta(days=days)
         
-        # Get all activities for the user in the specified time period
         activities = ActivityEvent.objects.filter(
             user_id=self.user_id,
             created_at__gte=start_date
-        ).order_by('created_at')
+        )
         
-        if not activities:
-            return {
-                "user_id": self.user_id,
-                "message": "No activities found for this user in the specified time period",
-                "patterns": []
-            }
-        
-        # Track activity transitions (e.g., issue_create -> commit -> pr_create)
-        transitions = []
-        previous_activity = None
+        # One streaming pass over three columns: transitions (e.g. issue_create -> commit
+        # -> pr_create) and 3-event sequences only ever need the last few activities
+        activities_count = 0
+        activity_types = set()
+        transition_counts = {}
+        sequences = {}
+        recent_types = deque(maxlen=3)
+        previous = None
         
-        for activity in activities:
-            if previous_activity:
-                time_diff = (activity.created_at - previous_activity.created_at).total_seconds() / 3600  # hours
+        for event_type, source_system, created_at in activities.order_by('created_at').values_list(
+            'event_type', 'source_system', 'created_at'
+        ).iterator():
+            activities_count += 1
+            activity_types.add(event_type)
+            
+            if previous:
+                time_diff = (created_at - previous[2]).total_seconds() / 3600  # hours
                 
                 # Only track transitions that happen within 24 hours
                 if time_diff <= 24:
-                    transitions.append({
-                        "from": previous_activity.event_type,
-                        "to": activity.event_type,
-                        "time_diff_hours": time_diff,
-                        "from_system": previous_activity.source_system,
-                        "to_system": activity.source_system
-                    })
+                    self._count_transition(transition_counts, previous, event_type, source_system, time_diff)
+            
+            recent_types.append(event_type)
+            if len(recent_types) == 3:
+                seq = " -> ".join(recent_types)
+                sequences[seq] = sequences.get(seq, 0) + 1
             
-            previous_activity = activity
+            previous = (event_type, source_system, created_at)
+        
+        if not activities_count:
+            return {
+                "user_id": self.user_id,
+                "message": "No activities found for this user in the specified time period",
+                "patterns": []
+            }
         
         # Analyze common patterns
-        patterns = self._analyze_workflow_patterns(transitions, activities)
+        patterns = self._analyze_workflow_patterns(transition_counts, sequences, activities)
         
         return {
             "user_id": self.user_id,
-            "activities_count": activities.count(),
-            "activity_types": list(set([a.event_type for a in activities])),
-            "transitions_count": len(transitions),
+            "activities_count": activities_count,
+            "activity_types": list(activity_types),
+            "transitions_count": sum(t["count"] for t in transition_counts.values()),
             "patterns": patterns
         }
     
-    def _analyze_workflow_patterns(self, transitions, activities):
+    def _count_transition(self, transition_counts, previous, to_type, to_system, time_diff):
+        """Add one transition to the per-type counts and running average time."""
+        from_type, from_system, _ = previous
+        key = f"{from_type}:{from_system} -> {to_type}:{to_system}"
+        if key not in transition_counts:
+            transition_counts[key] = {
+                "count": 0,
+                "avg_time": 0,
+                "from_type": from_type,
+                "to_type": to_type,
+                "from_system": from_system,
+                "to_system": to_system
+            }
+        
+        transition_counts[key]["count"] += 1
+        # Running average calculation
+        current_avg = transition_counts[key]["avg_time"]
+        n = transition_counts[key]["count"]
+        transition_counts[key]["avg_time"] = ((n-1) * current_avg + time_diff) / n
+    
+    def _analyze_workflow_patterns(self, transition_counts, sequences, activities):
         """Analyze workflow transitions to identify patterns."""
-        if not transitions:
+        if not transition_counts:
             return []
         
-        # Count frequency of each transition type
-        transition_counts = {}
-        for t in transitions:
-            key = f"{t['from']}:{t['from_system']} -> {t['to']}:{t['to_system']}"
-            if key not in transition_counts:
-                transition_counts[key] = {
-                    "count": 0,
-                    "avg_time": 0,
-                    "from_type": t['from'],
-                    "to_type": t['to'],
-                    "from_system": t['from_system'],
-                    "to_system": t['to_system']
-                }
-            
-            transition_counts[key]["count"] += 1
-            # Running average calculation
-            current_avg = transition_counts[key]["avg_time"]
-            n = transition_counts[key]["count"]
-            transition_counts[key]["avg_time"] = ((n-1) * current_avg + t["time_diff_hours"]) / n
-        
-        # Convert to list and sort by frequency
-        patterns = list(transition_counts.values())
-        patterns.sort(key=lambda x: x["count"], reverse=True)
-        
-        # Calculate most active hours
-        hour_counts = {}
-        for activity in activities:
-            hour = activity.created_at.hour
-            if hour not in hour_counts:
-                hour_counts[hour] = 0
-            hour_counts[hour] += 1
-        
-        # Find peak hours (top 3)
-        peak_hours = sorted(hour_counts.items(), key=lambda x: x[1], reverse=True)[:3]
+        # Sort by frequency
+        patterns = sorted(transition_counts.values(), key=lambda x: x["count"], reverse=True)
+        
+        # Most active hours, counted by the database. Ties go to the hour seen first
+        peak_hours = list(activities.annotate(
+            hour=ExtractHour('created_at', tzinfo=timezone.utc)
+        ).values('hour').annotate(
+            count=Count('id'),
+            first_seen=Min('created_at')
+        ).order_by('-count', 'first_seen').values_list('hour', 'count')[:3])
         
         # Add additional insights
         insights = [
@@ -279,34 +516,18 @@ class ActivityCorrelator:
         ]
         
         # Find common sequences (3+ transitions)
-        if len(activities) >= 3:
-            common_sequences = self._find_common_sequences(activities)
-            if common_sequences:
-                insights.append({
-                    "type": "common_sequences",
-                    "description": "Common activity sequences detected",
-                    "data": common_sequences[:3]  # Top 3 sequences
-                })
+        if sequences:
+            common_sequences = [
+                {"sequence": s, "count": c}
+                for s, c in sorted(sequences.items(), key=lambda x: x[1], reverse=True)
+            ]
+            insights.append({
+                "type": "common_sequences",
+                "description": "Common activity sequences detected",
+                "data": common_sequences[:3]  # Top 3 sequences
+            })
         
         return {
             "transitions": patterns[:5],  # Top 5 most common transitions
             "insights": insights
-        }
-    
-    def _find_common_sequences(self, activities):
-        """Find common sequences of 3+ activities."""
-        # Extract just the event types in temporal order
-        activity_sequence = [a.event_type for a in activities]
-        
-        # Find all 3-event sequences
-        sequences = {}
-        for i in range(len(activity_sequence) - 2):
-            seq = f"{activity_sequence[i]} -> {activity_sequence[i+1]} -> {activity_sequence[i+2]}"
-            if seq not in sequences:
-                sequences[seq] = 0
-            sequences[seq] += 1
-        
-        # Sort by frequency
-        sorted_sequences = sorted(sequences.items(), key=lambda x: x[1], reverse=True)
-        
-        return [{"sequence": s, "count": c} for s, c in sorted_sequences]
\ No newline at end of file
+        }
\ No newline at end of file
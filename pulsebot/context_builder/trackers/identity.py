@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from core.models import ExternalIdentity
+
+logger = logging.getLogger(__name__)
+
+# Stored for senders without a mapping so unknown accounts don't hit the DB on every webhook
+NO_USER = 0
+
+# IntegrationCredential.extra_data keys holding the (external id, login) of the connected account
+CREDENTIAL_IDENTITY_KEYS = {
+    'github': ('github_id', 'github_username'),
+    'jira': ('account_id', 'account_name'),
+}
+
+
+class IdentityResolver:
+    """Resolves external accounts (GitHub sender, Jira user, Slack user) to local user ids.
+
+    Lookups go through an in-process LRU, then the shared Django cache, then
+    indexed ExternalIdentity queries. Misses are cached too, for a shorter
+    time, so floods from unmapped senders stay off the database.
+    """
+
+    def __init__(self, maxsize=4096, local_ttl=300, shared_ttl=3600, miss_ttl=60):
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.shared_ttl = shared_ttl
+        self.miss_ttl = miss_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, provider, external_id=None, login=None, username_fallback=False):
+        """Return the local user id for an external account, or None if unmapped.
+        
+        The stable ``external_id`` is matched when given; ``login`` is only
+        looked up on its own when there is no id, and a login mapped to more
+        than one user resolves to nobody. With ``username_fallback`` an
+        unmapped account's login is also matched exactly against local
+        usernames, for accounts connected before the mapping existed, unless
+        the login is recorded for another account (renamed, then reused).
+        """
+        if external_id:
+            kind, value = 'id', str(external_id)
+        elif login:
+            kind, value = 'login', login
+        else:
+            return None
+
+        cache_key = self._cache_key(provider, kind, value)
+
+        user_id = self._local_get(cache_key)
+        if user_id is None:
+            user_id = cache.get(cache_key)
+            if user_id is not None:
+                self._local_set(cache_key, user_id)
+
+        if user_id is not None:
+            return user_id if user_id != NO_USER else None
+
+        user_id = self._lookup(provider, kind, value, login, username_fallback)
+        cache.set(cache_key, user_id or NO_USER, self.shared_ttl if user_id else self.miss_ttl)
+        self._local_set(cache_key, user_id or NO_USER)
+        return user_id or None
+
+    def register(self, user, provider, external_id, login=''):
+        """Create or update the mapping for an external account and refresh the caches."""
+        if not external_id:
+            return None
+
+        identity, _ = ExternalIdentity.objects.update_or_create(
+            provider=provider,
+            external_id=str(external_id),
+            defaults={'user': user, 'login': login or ''}
+        )
+
+        self.invalidate(provider, external_id=external_id, login=login)
+        return identity
+
+    def register_credential(self, credential):
+        """Register the account recorded in an IntegrationCredential's extra_data."""
+        keys = CREDENTIAL_IDENTITY_KEYS.get(credential.integration_type)
+        if not keys:
+            return None
+
+        id_key, login_key = keys
+        extra_data = credential.extra_data or {}
+        return self.register(
+            credential.user,
+            credential.integration_type,
+            extra_data.get(id_key),
+            extra_data.get(login_key)
+        )
+
+    def invalidate(self, provider, external_id=None, login=None):
+        """Drop cached resolutions for an external account in this process and the shared cache."""
+        cache_keys = []
+        if external_id:
+            cache_keys.append(self._cache_key(provider, 'id', str(external_id)))
+        if login:
+            cache_keys.append(self._cache_key(provider, 'login', login))
+
+        cache.delete_many(cache_keys)
+        with self._lock:
+            for cache_key in cache_keys:
+                self._local.pop(cache_key, None)
+
+    def _lookup(self, provider, kind, value, login=None, username_fallback=False):
+        identities = ExternalIdentity.objects.filter(provider=provider)
+
+        if kind == 'id':
+            # Unique per provider
+            user_id = identities.filter(external_id=value).values_list('user_id', flat=True).first()
+            if user_id is not None or not login:
+                return user_id
+            if identities.filter(login=login).exists():
+                logger.warning(f"{provider} login {login} is recorded for another account, not resolving account {value}")
+                return None
+        else:
+            user_ids = list(identities.filter(login=value).order_by().values_list('user_id', flat=True).distinct()[:2])
+            if len(user_ids) > 1:
+                logger.warning(f"{provider} login {value} is mapped to several users, not resolving it")
+                return None
+            if user_ids:
+                return user_ids[0]
+
+        if username_fallback:
+            # Usernames are unique
+            return User.objects.filter(username=login).values_list('id', flat=True).first()
+        return None
+
+    def _cache_key(self, provider, kind, value):
+        return f"pulsebot:identity:{provider}:{kind}:{quote(value, safe='')}"
+
+    def _local_get(self, cache_key):
+        with self._lock:
+            entry = self._local.get(cache_key)
+            if entry is None:
+                return None
+
+            user_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[cache_key]
+                return None
+
+            self._local.move_to_end(cache_key)
+            return user_id
+
+    def _local_set(self, cache_key, user_id):
+        ttl = self.local_ttl if user_id != NO_USER else self.miss_ttl
+        with self._lock:
+            self._local[cache_key] = (user_id, time.monotonic() + ttl)
+            self._local.move_to_end(cache_key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
+# Shared by every request in this process so the LRU survives across webhooks
+identity_resolver = IdentityResolver()
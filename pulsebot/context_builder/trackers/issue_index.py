@@ -0,0 +1,95 @@
+"""Persistent LSH index of Jira issues for similarity-based issue suggestions.
+
+Each Jira issue_create event gets a MinHash signature of its summary and
+description when it is tracked, stored as one IssueBucket row per LSH band.
+Finding the issues similar to a commit or PR is then an indexed lookup of
+its band buckets, whatever the size of the issue history.
+
+Issues tracked before the index existed are added, and the whole index is
+rebuilt after changing the ``MinHasher`` or ``MinHashLSH`` parameters, with
+``backfill_activity_references --issue-index``.
+"""
+from collections import defaultdict
+from .models import ActivityEvent, IssueBucket
+from .similarity import MinHashLSH, MinHasher, shingles
+
+# Keep the IN lists below SQLite's bound-variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def document_shingles(title, description):
+    """Shingles of an event's text, as issues are indexed and commits and PRs compared."""
+    return shingles(f"{title}\n{description}")
+
+
+def is_indexed_issue(event):
+    return event.source_system == 'jira' and event.event_type == 'issue_create'
+
+
+def record_issue_buckets(events):
+    """Store the LSH buckets of freshly written Jira issues that have a primary key; safe to repeat."""
+    hasher = MinHasher()
+    lsh = MinHashLSH()
+
+    rows = []
+    for event in events:
+        if not event.pk or not is_indexed_issue(event):
+            continue
+        signature = hasher.signature(document_shingles(event.title, event.description))
+        if signature is None:
+            continue
+        rows.extend(IssueBucket(event_id=event.pk, bucket=bucket) for bucket in lsh.buckets(signature))
+
+    IssueBucket.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+    return len(rows)
+
+
+def issues_in_buckets(buckets):
+    """Map each of ``buckets`` to the ids of the issues in it."""
+    buckets = list(buckets)
+
+    # No join on the events: with user filters here the planner starts from the
+    # users' whole history instead of the bucket index
+    issue_ids = defaultdict(set)
+    for start in range(0, len(buckets), LOOKUP_CHUNK_SIZE):
+        for bucket, event_id in IssueBucket.objects.filter(
+            bucket__in=buckets[start:start + LOOKUP_CHUNK_SIZE]
+        ).values_list('bucket', 'event_id'):
+            issue_ids[bucket].add(event_id)
+    return issue_ids
+
+
+def issue_documents(issue_ids, user_ids, since):
+    """Map the ids of issues tracked by ``user_ids`` since ``since`` to (issue key, details, shingles).
+
+    The earliest issue_create event of a key stands for the issue.
+    """
+    issue_ids = list(issue_ids)
+    user_ids = set(user_ids)
+
+    # Primary key lookups; with the user and time filters in SQL the planner
+    # prefers scanning the users' history
+    rows = []
+    for start in range(0, len(issue_ids), LOOKUP_CHUNK_SIZE):
+        rows.extend(ActivityEvent.objects.filter(
+            id__in=issue_ids[start:start + LOOKUP_CHUNK_SIZE]
+        ).values_list('id', 'user_id', 'title', 'description', 'metadata', 'source_id', 'created_at'))
+    rows.sort(key=lambda row: (row[6], row[0]))
+
+    documents = {}
+    by_key = {}
+    for event_id, user_id, title, description, metadata, source_id, created_at in rows:
+        if user_id not in user_ids or created_at < since:
+            continue
+        key = (metadata or {}).get('issue_key') or source_id
+        if not key:
+            continue
+        if key not in by_key:
+            by_key[key] = (key, {
+                "id": event_id,
+                "key": key,
+                "title": title,
+                "created_at": created_at
+            }, document_shingles(title, description))
+        documents[event_id] = by_key[key]
+    return documents
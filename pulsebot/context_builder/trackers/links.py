@@ -0,0 +1,119 @@
+import logging
+import re
+from collections import defaultdict
+from .models import ActivityLink, ActivityReference
+
+logger = logging.getLogger(__name__)
+
+# Reference types that can connect two events, and the key space they share
+LINKABLE_REF_TYPES = {
+    'jira_issue': 'issue',
+    'github_ref': 'pr',
+    'github_pr': 'pr',
+}
+
+# Whole words only: "approve", "print" and "project" don't mention a PR
+PULL_REQUEST_MENTION_PATTERN = re.compile(r'\bpr\b|pull request|#\d+', re.IGNORECASE)
+
+
+def link_role(ref_type, source_system, event_type):
+    """Whether an event's reference makes it the source or the target of a link, or neither."""
+    if ref_type == 'jira_issue':
+        if source_system == 'jira':
+            return 'target'
+        if source_system == 'slack' or event_type == 'commit' or event_type.startswith('pr_'):
+            return 'source'
+    elif ref_type == 'github_ref' and source_system == 'slack':
+        return 'source'
+    elif ref_type == 'github_pr' and source_system == 'github' and event_type.startswith('pr_'):
+        return 'target'
+    return None
+
+
+def link_type(space, source_system, event_type):
+    """Link type for a source event linked through ``space`` ('issue' or 'pr')."""
+    if source_system == 'slack':
+        return 'slack_to_issue' if space == 'issue' else 'slack_to_pr'
+    return 'commit_to_issue' if event_type == 'commit' else 'pr_to_issue'
+
+
+def mentions_pull_request(text):
+    """Whether a Slack message talks about a PR, so its #number means a PR."""
+    return bool(PULL_REQUEST_MENTION_PATTERN.search(text or ''))
+
+
+def record_links(event_ids):
+    """Create the ActivityLink edges between newly referenced events and their owner's existing ones.
+
+    Only events of the same user are linked, as in ActivityCorrelator. The
+    references sharing a key with the new events are fetched together, and
+    edges are only built for pairs that include a new event, so the work is
+    proportional to the new events' neighbourhoods, not to history. Existing
+    edges are skipped, so this can run again for the same events.
+    """
+    event_ids = set(event_ids)
+    if not event_ids:
+        return 0
+
+    new_refs = []
+    for chunk in _chunks(sorted(event_ids)):
+        new_refs.extend(ActivityReference.objects.filter(
+            event_id__in=chunk,
+            ref_type__in=LINKABLE_REF_TYPES
+        ).values_list('ref_type', 'ref_key', 'event__user_id'))
+    if not new_refs:
+        return 0
+
+    keys_by_space = defaultdict(set)
+    user_ids = set()
+    for ref_type, ref_key, user_id in new_refs:
+        keys_by_space[LINKABLE_REF_TYPES[ref_type]].add(ref_key)
+        user_ids.add(user_id)
+
+    # Both sides of every key the new events touch. Users are filtered here rather
+    # than in SQL so the planner drives the join from the ref_key index instead of
+    # scanning each user's whole history
+    neighbourhood = []
+    for space, keys in keys_by_space.items():
+        for chunk in _chunks(sorted(keys)):
+            neighbourhood.extend((space, row) for row in ActivityReference.objects.filter(
+                ref_type__in=[ref_type for ref_type, ref_space in LINKABLE_REF_TYPES.items() if ref_space == space],
+                ref_key__in=chunk
+            ).values_list(
+                'ref_type', 'ref_key', 'event_id', 'event__user_id', 'event__source_system',
+                'event__event_type', 'event__description', 'event__created_at'
+            ).iterator())
+
+    sides = defaultdict(lambda: {'source': [], 'target': []})
+    for space, (ref_type, ref_key, event_id, user_id, source_system, event_type, description, created_at) in neighbourhood:
+        if user_id not in user_ids:
+            continue
+        role = link_role(ref_type, source_system, event_type)
+        if role == 'source' and space == 'pr' and not mentions_pull_request(description):
+            continue
+        if role:
+            sides[(user_id, space, ref_key)][role].append((event_id, source_system, event_type, created_at))
+
+    links = []
+    for (user_id, space, ref_key), side in sides.items():
+        for source_id, source_system, event_type, source_at in side['source']:
+            for target_id, _, _, target_at in side['target']:
+                if source_id not in event_ids and target_id not in event_ids:
+                    continue
+                links.append(ActivityLink(
+                    user_id=user_id,
+                    source_id=source_id,
+                    target_id=target_id,
+                    link_type=link_type(space, source_system, event_type),
+                    ref_key=ref_key,
+                    created_at=max(source_at, target_at)
+                ))
+
+    ActivityLink.objects.bulk_create(links, ignore_conflicts=True, batch_size=1000)
+    return len(links)
+
+
+def _chunks(values, size=500):
+    # Keep IN lists below SQLite's bound-variable limit
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
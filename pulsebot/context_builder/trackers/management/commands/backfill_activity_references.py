@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from context_builder.trackers.issue_index import record_issue_buckets
+from context_builder.trackers.models import ActivityEvent, IssueBucket
+from context_builder.trackers.references import record_references
+
+
+class Command(BaseCommand):
+    help = ("Extract ActivityReference rows, ActivityLink edges and Jira issue LSH buckets for events "
+            "tracked before they were recorded at ingest")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=None, help="Only events from the last N days")
+        parser.add_argument('--issue-index', action='store_true',
+                            help="Only rebuild the Jira issue similarity index, replacing its buckets "
+                                 "(run after upgrading, or after changing the MinHash parameters)")
+
+    def handle(self, *args, **options):
+        events = ActivityEvent.objects.only(
+            'id', 'event_type', 'title', 'description', 'metadata', 'source_system', 'source_id'
+        ).order_by('id')
+        if options['days']:
+            events = events.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+        if options['issue_index']:
+            events = events.filter(source_system='jira', event_type='issue_create')
+            # Buckets computed with other parameters would never match again
+            IssueBucket.objects.filter(event__in=events).delete()
+        record = record_issue_buckets if options['issue_index'] else record_references
+        label = 'buckets' if options['issue_index'] else 'references'
+
+        start = time.perf_counter()
+        scanned = recorded = 0
+        last_id = 0
+        while True:
+            # Keyset pagination keeps each batch an index range scan
+            batch = list(events.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+
+            # Existing rows are skipped, so the command can be re-run or interrupted
+            with transaction.atomic():
+                recorded += record(batch)
+
+            scanned += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Scanned {scanned} events, {recorded} {label}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {label} for {scanned} events in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,161 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from context_builder.trackers.models import ActivityEvent, PullRequestState
+
+EVENT_MIX = [
+    ('commit', 'github', 40),
+    ('pr_create', 'github', 6),
+    ('pr_review', 'github', 8),
+    ('pr_merge', 'github', 5),
+    ('issue_create', 'jira', 5),
+    ('issue_update', 'jira', 15),
+    ('issue_comment', 'jira', 8),
+    ('issue_close', 'jira', 3),
+    ('slack_message', 'slack', 8),
+    ('blocker', 'pulsebot', 2),
+]
+
+
+class Command(BaseCommand):
+    help = "Seed ActivityEvent rows and print EXPLAIN plans and timings for the generator queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--events', type=int, default=200000)
+        parser.add_argument('--days', type=int, default=90, help="Spread seeded events over this many days")
+        parser.add_argument('--runs', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows instead of rolling back")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with transaction.atomic():
+            users = self._seed(options['users'], options['events'], options['days'])
+            self._run_queries(users, options['runs'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+                self.stdout.write("Seeded rows rolled back (use --keep to retain them)")
+
+    def _seed(self, user_count, event_count, days):
+        """Create benchmark users and a realistic mix of activity events."""
+        start = time.perf_counter()
+        users = [
+            User.objects.create(username=f"bench_user_{i}_{random.randint(0, 10 ** 9)}")
+            for i in range(user_count)
+        ]
+
+        types = [(event_type, source) for event_type, source, _ in EVENT_MIX]
+        weights = [weight for _, _, weight in EVENT_MIX]
+        now = timezone.now()
+        window = days * 24 * 3600
+
+        batch = []
+        pull_requests = []
+        for i in range(event_count):
+            event_type, source = random.choices(types, weights)[0]
+            batch.append(ActivityEvent(
+                user=random.choice(users),
+                event_type=event_type,
+                title=f"{event_type} PROJ-{random.randint(1, 500)}",
+                description="",
+                metadata={'pr_number': random.randint(1, 2000)} if event_type.startswith('pr_') else {},
+                source_system=source,
+                source_id=str(i),
+                created_at=now - timedelta(seconds=random.randint(0, window)),
+            ))
+            if event_type == 'pr_create':
+                pull_requests.append(self._pull_request_state(batch[-1], len(pull_requests) + 1))
+            if len(batch) >= 5000:
+                ActivityEvent.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            ActivityEvent.objects.bulk_create(batch)
+        PullRequestState.objects.bulk_create(pull_requests, batch_size=5000)
+
+        # Give the planner fresh statistics so plans reflect the seeded distribution
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {ActivityEvent._meta.db_table}")
+            cursor.execute(f"ANALYZE {PullRequestState._meta.db_table}")
+
+        self.stdout.write(
+            f"Seeded {event_count} events for {user_count} users in {time.perf_counter() - start:.1f}s "
+            f"({connection.vendor})"
+        )
+        return users
+
+    def _pull_request_state(self, event, number):
+        """Lifecycle for a seeded PR: most merged, some closed or under review, a few waiting."""
+        state = PullRequestState(
+            repository='bench/pulsebot',
+            number=number,
+            author=event.user,
+            title=event.title,
+            opened_at=event.created_at
+        )
+        outcome = random.random()
+        if outcome < 0.9:
+            state.first_review_at = event.created_at + timedelta(hours=random.randint(1, 48))
+        if outcome < 0.8:
+            state.closed_at = state.first_review_at + timedelta(hours=random.randint(1, 72))
+            state.merged_at = state.closed_at if outcome < 0.7 else None
+        return state
+
+    def _generator_queries(self, users):
+        """The ActivityEvent querysets issued by the generators, keyed by caller."""
+        user = users[0]
+        team = users[:min(len(users), 40)]
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+
+        return [
+            ("StandupGenerator yesterday", ActivityEvent.objects.filter(
+                user=user, created_at__gte=yesterday - timedelta(days=1), created_at__lte=yesterday
+            ).order_by('created_at')),
+            ("ActivityTracker.detect_blockers explicit", ActivityEvent.objects.filter(
+                user_id=user.id, event_type='blocker', created_at__gte=now - timedelta(days=3)
+            )),
+            ("ActivityTracker.detect_blockers stale PRs", PullRequestState.objects.filter(
+                author_id=user.id, closed_at__isnull=True, first_review_at__isnull=True,
+                opened_at__lte=now - timedelta(days=2)
+            ).order_by('opened_at')),
+            ("DigestGenerator member window", ActivityEvent.objects.filter(
+                user=user, created_at__gte=yesterday, created_at__lte=now
+            )),
+            ("DigestGenerator team PRs", ActivityEvent.objects.filter(
+                user__in=team, event_type__startswith='pr_', created_at__gte=yesterday, created_at__lte=now
+            ).order_by('-created_at')[:10]),
+            ("FollowUpGenerator commitments", ActivityEvent.objects.filter(
+                user_id=user.id, event_type='issue_comment', created_at__gte=now - timedelta(days=30)
+            )),
+            ("ActivityCorrelator github window", ActivityEvent.objects.filter(
+                user_id=user.id, created_at__gte=now - timedelta(days=7), source_system='github'
+            ).order_by('created_at')),
+            ("ActivityCorrelator github PRs", ActivityEvent.objects.filter(
+                user_id=user.id, created_at__gte=now - timedelta(days=7), source_system='github',
+                event_type__startswith='pr_'
+            ).order_by('created_at')),
+        ]
+
+    def _run_queries(self, users, runs):
+        for label, queryset in self._generator_queries(users):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain())
+
+            timings = []
+            rows = 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                rows = len(list(queryset.all()))
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(
+                f"rows={rows} median={statistics.median(timings):.2f}ms min={min(timings):.2f}ms\n"
+            )
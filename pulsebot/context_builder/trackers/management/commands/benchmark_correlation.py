@@ -0,0 +1,149 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from context_builder.trackers.correlation import ActivityCorrelator
+from context_builder.trackers.models import ActivityEvent
+from context_builder.trackers.references import record_references
+from context_builder.trackers.result_cache import correlation_cache
+
+ENGINES = ('links', 'memory')
+
+
+class Command(BaseCommand):
+    help = ("Check that correlations are cached until the next event, and time both engines "
+            "on a seeded activity window")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, nargs='+', default=[10000, 100000],
+                            help="Events in the correlated window, one run per size")
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--runs', type=int, default=3, help="Timed runs per engine")
+        parser.add_argument('--seed', type=int, default=42)
+
+    # Time the computations themselves, not cache hits on repeated runs
+    @override_settings(CORRELATION_CACHE_TTL=0)
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        self.stdout.write(f"{'events':>8} {'engine':>8} {'queries':>8} {'median ms':>10} {'correlations':>13}")
+        for size in options['events']:
+            with transaction.atomic():
+                user = self._seed(size, options['days'])
+                self._check_result_cache(user, options['days'])
+                correlator = ActivityCorrelator(user_id=user.id)
+
+                results = {}
+                for engine in ENGINES:
+                    timings = []
+                    for _ in range(options['runs']):
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            results[engine] = correlator.correlate_activities(days=options['days'], engine=engine)
+                            timings.append((time.perf_counter() - start) * 1000)
+
+                    self.stdout.write(
+                        f"{size:>8} {engine:>8} {len(ctx.captured_queries):>8} {statistics.median(timings):>10.1f} "
+                        f"{results[engine]['summary']['correlation_count']:>13}"
+                    )
+
+                transaction.set_rollback(True)
+
+    @override_settings(CORRELATION_CACHE_TTL=300)
+    def _check_result_cache(self, user, days):
+        """A repeated call is served from the cache until the user tracks a new event."""
+        correlator = ActivityCorrelator(user_id=user.id)
+
+        before = correlation_cache.stats().get('correlations', {'hits': 0, 'misses': 0, 'too_large': 0})
+        cold = correlator.correlate_activities(days=days)
+        start = time.perf_counter()
+        warm = correlator.correlate_activities(days=days)
+        warm_ms = (time.perf_counter() - start) * 1000
+        if warm != cold:
+            raise CommandError("Cached correlations differ from the computed ones")
+
+        event = ActivityEvent.objects.create(
+            user=user,
+            event_type='commit',
+            source_system='github',
+            title="PROJ-1 Follow-up",
+            source_id=f"bench-cache-{uuid.uuid4().hex[:12]}"
+        )
+        record_references([event])
+        correlator.correlate_activities(days=days)
+
+        after = correlation_cache.stats()['correlations']
+        counts = tuple(after[name] - before[name] for name in ('hits', 'misses', 'too_large'))
+        # Results over CORRELATION_CACHE_MAX_ITEMS are recomputed rather than stored
+        oversized = len(cold['correlations']) > settings.CORRELATION_CACHE_MAX_ITEMS
+        expected = (0, 3, 3) if oversized else (1, 2, 0)
+        if counts != expected:
+            raise CommandError(f"Expected {expected} cache hits, misses and oversized results, got {counts}")
+
+        outcome = "too large to cache" if oversized else f"cached until the next event ({warm_ms:.1f} ms warm)"
+        self.stdout.write(self.style.SUCCESS(f"Correlations are {outcome}; counters: {after}"))
+
+    def _seed(self, size, days):
+        """Create one user's window: commits, PRs, Jira updates and Slack messages sharing keys."""
+        start = time.perf_counter()
+        user = User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}")
+        now = timezone.now()
+        window = days * 24 * 3600 - 60
+
+        # Realistic cardinality: a key is touched by a handful of events, not thousands
+        keys = [f"PROJ-{i}" for i in range(1, max(size // 10, 2))]
+        pr_numbers = range(1, max(size // 50, 2))
+
+        events = []
+        for i in range(size):
+            key = random.choice(keys)
+            roll = random.random()
+            if roll < 0.35:
+                fields = {'event_type': 'commit', 'source_system': 'github', 'title': f"{key} Fix thing {i}"}
+            elif roll < 0.5:
+                fields = {
+                    'event_type': random.choice(['pr_create', 'pr_review', 'pr_merge']),
+                    'source_system': 'github',
+                    'title': f"{key} Feature {i}",
+                    'metadata': {'pr_number': random.choice(pr_numbers)},
+                }
+            elif roll < 0.75:
+                fields = {
+                    'event_type': 'issue_update',
+                    'source_system': 'jira',
+                    'title': f"Updated issue: {key}",
+                    'metadata': {'issue_key': key},
+                }
+            else:
+                fields = {
+                    'event_type': 'slack_message',
+                    'source_system': 'slack',
+                    'title': "Message in C123",
+                    'description': random.choice([
+                        f"Looking at {key} today",
+                        f"PR #{random.choice(pr_numbers)} is ready for review",
+                        "Lunch?",
+                    ]),
+                }
+            events.append(ActivityEvent(
+                user=user,
+                source_id=f"bench-{i}",
+                created_at=now - timedelta(seconds=random.randint(0, window)),
+                **fields
+            ))
+
+        ActivityEvent.objects.bulk_create(events, batch_size=5000)
+
+        # Same path as ingest and backfill: references, then the links they imply
+        for offset in range(0, size, 2000):
+            record_references(events[offset:offset + 2000])
+
+        self.stdout.write(f"Seeded {size} events with references and links in {time.perf_counter() - start:.1f}s")
+        return user
@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from core.models import Team, TeamMember
+from context_builder.trackers import team_analytics
+from context_builder.trackers.correlation import ActivityCorrelator
+from context_builder.trackers.models import ActivityEvent
+from .benchmark_activity_queries import EVENT_MIX
+
+
+class Command(BaseCommand):
+    help = "Time team workflow analytics (NumPy and pure Python) against a per-user workflow loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200)
+        parser.add_argument('--events-per-member', type=int, default=500)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--runs', type=int, default=3, help="Timed runs per implementation")
+        parser.add_argument('--seed', type=int, default=42)
+
+    # Time the computations themselves, not cache hits on repeated runs
+    @override_settings(CORRELATION_CACHE_TTL=0)
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        days = options['days']
+
+        with transaction.atomic():
+            team = self._seed(options['members'], options['events_per_member'], days)
+            member_ids = list(TeamMember.objects.filter(team=team).values_list('user_id', flat=True))
+
+            def per_user_loop():
+                return [
+                    ActivityCorrelator(user_id=user_id).get_user_workflow_pattern(days=days)
+                    for user_id in member_ids
+                ]
+
+            implementations = [
+                ('per-user loop', per_user_loop),
+                ('load only', lambda: team_analytics.load_event_columns(member_ids, days)),
+                ('team python', lambda: team_analytics.team_workflow_analytics(team.id, days, use_numpy=False)),
+            ]
+            if team_analytics.np is not None:
+                implementations.append(
+                    ('team numpy', lambda: team_analytics.team_workflow_analytics(team.id, days, use_numpy=True))
+                )
+            else:
+                self.stdout.write(self.style.WARNING("NumPy is not installed; only the pure-Python path is timed"))
+
+            results = {}
+            self.stdout.write(f"{'implementation':>14} {'median ms':>10}")
+            for name, run in implementations:
+                timings = []
+                for _ in range(options['runs']):
+                    start = time.perf_counter()
+                    results[name] = run()
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(f"{name:>14} {statistics.median(timings):>10.1f}")
+
+            transaction.set_rollback(True)
+
+        if 'team numpy' in results and results['team numpy'] != results['team python']:
+            raise CommandError("NumPy and pure-Python team analytics disagree")
+
+        per_user_transitions = sum(pattern.get('transitions_count', 0) for pattern in results['per-user loop'])
+        if results['team python']['transitions']['total'] != per_user_transitions:
+            raise CommandError(
+                f"Team transitions ({results['team python']['transitions']['total']}) don't add up to "
+                f"the per-user transitions ({per_user_transitions})"
+            )
+        self.stdout.write(self.style.SUCCESS("Team analytics agree with each other and with the per-user loop"))
+
+    def _seed(self, member_count, events_per_member, days):
+        """Create a team of members with a realistic mix of events over the window."""
+        start = time.perf_counter()
+        team = Team.objects.create(name=f"bench_team_{random.randint(0, 10 ** 9)}")
+        types = [(event_type, source) for event_type, source, _ in EVENT_MIX]
+        weights = [weight for _, _, weight in EVENT_MIX]
+        now = timezone.now()
+        # Microsecond offsets keep the per-user ordering free of ties; an hour of
+        # margin keeps every event inside the window for the whole run
+        window = (days * 24 * 3600 - 3600) * 10 ** 6
+
+        events = []
+        for i in range(member_count):
+            user = User.objects.create(username=f"bench_team_{team.id}_{i}")
+            TeamMember.objects.create(user=user, team=team)
+            for j in range(events_per_member):
+                event_type, source = random.choices(types, weights)[0]
+                events.append(ActivityEvent(
+                    user=user,
+                    event_type=event_type,
+                    title=f"{event_type} PROJ-{random.randint(1, 500)}",
+                    source_system=source,
+                    source_id=f"team-{team.id}-{i}-{j}",
+                    created_at=now - timedelta(microseconds=random.randint(0, window)),
+                ))
+        ActivityEvent.objects.bulk_create(events, batch_size=5000)
+
+        self.stdout.write(f"Seeded {member_count} members with {len(events)} events in {time.perf_counter() - start:.1f}s")
+        return team
@@ -0,0 +1,73 @@
+import statistics
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from context_builder.trackers.models import ActivityTracker
+from context_builder.trackers.services import ActivityTrackingService
+
+
+def build_push_payload(login, commit_count):
+    """Build a GitHub push payload with ``commit_count`` commits."""
+    return {
+        'event_type': 'push',
+        'sender': {'login': login},
+        'repository': {'name': 'pulsebot'},
+        'commits': [{
+            'id': uuid.uuid4().hex,
+            'message': f"PROJ-{i} Fix thing {i}\n\nLonger description of the change",
+        } for i in range(commit_count)],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency per GitHub push webhook for per-event and bulk ingest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100], help="Commits per push")
+        parser.add_argument('--runs', type=int, default=5, help="Timed runs per push size")
+
+    def handle(self, *args, **options):
+        # Measure inline writes; write-behind would defer the INSERTs past the capture
+        with override_settings(ACTIVITY_WRITE_BEHIND=False), transaction.atomic():
+            user = User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}")
+
+            self.stdout.write(f"{'commits':>8} {'path':>10} {'queries':>8} {'median ms':>10}")
+            for size in options['sizes']:
+                for label, ingest in (('per-event', self._ingest_per_event), ('bulk', self._ingest_bulk)):
+                    queries, timings = self._measure(ingest, user, size, options['runs'])
+                    self.stdout.write(f"{size:>8} {label:>10} {queries:>8} {statistics.median(timings):>10.2f}")
+
+            transaction.set_rollback(True)
+
+    def _measure(self, ingest, user, size, runs):
+        timings = []
+        queries = 0
+        for _ in range(runs):
+            payload = build_push_payload(user.username, size)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                ingest(payload)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(ctx.captured_queries)
+        return queries, timings
+
+    def _ingest_per_event(self, payload):
+        """The previous path: one user lookup and one INSERT per commit."""
+        tracker = ActivityTracker()
+        user = User.objects.get(username=payload['sender']['login'])
+        for commit in payload['commits']:
+            tracker.track_event(
+                user_id=user.id,
+                event_type='commit',
+                title=commit['message'].split('\n')[0],
+                description=commit['message'],
+                metadata={'commit_id': commit['id'], 'repository': payload['repository']['name']},
+                source_system='github',
+                source_id=commit['id']
+            )
+
+    def _ingest_bulk(self, payload):
+        ActivityTrackingService().track_github_event(payload)
@@ -0,0 +1,202 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from context_builder.trackers.correlation import ActivityCorrelator
+from context_builder.trackers.models import ActivityEvent
+from context_builder.trackers.workflow import get_workflow_model, record_workflow
+from .benchmark_activity_queries import EVENT_MIX
+
+
+class Command(BaseCommand):
+    help = ("Compare get_user_workflow_pattern with the model-instance implementation on heavy users, "
+            "and with the incrementally maintained workflow model")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--events', type=int, nargs='+', default=[5000, 20000, 50000],
+                            help="Events per heavy user in the window, one run per size")
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--runs', type=int, default=3, help="Timed runs per implementation")
+        parser.add_argument('--seed', type=int, default=42)
+
+    # Time the computations themselves, not cache hits on repeated runs
+    @override_settings(CORRELATION_CACHE_TTL=0)
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        days = options['days']
+
+        self.stdout.write(f"{'events':>8} {'impl':>10} {'queries':>8} {'median ms':>10}")
+        for size in options['events']:
+            with transaction.atomic():
+                users = self._seed(options['users'], size, days)
+
+                for user in users:
+                    correlator = ActivityCorrelator(user_id=user.id)
+                    timings = {'instances': [], 'streaming': []}
+                    queries = {}
+                    for _ in range(options['runs']):
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            expected = self._instance_pattern(user.id, days)
+                            timings['instances'].append((time.perf_counter() - start) * 1000)
+                        queries['instances'] = len(ctx.captured_queries)
+
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            result = correlator.get_user_workflow_pattern(days=days)
+                            timings['streaming'].append((time.perf_counter() - start) * 1000)
+                        queries['streaming'] = len(ctx.captured_queries)
+
+                    # Set iteration order isn't meaningful
+                    for payload in (expected, result):
+                        payload['activity_types'] = sorted(payload['activity_types'])
+                    if result != expected:
+                        raise CommandError(f"Workflow patterns differ for a user with {size} events")
+
+                    timings['model'] = []
+                    for _ in range(options['runs']):
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            model = get_workflow_model(user.id)
+                            timings['model'].append((time.perf_counter() - start) * 1000)
+                        queries['model'] = len(ctx.captured_queries)
+                    self._check_model(model, result, size)
+
+                    for impl, values in timings.items():
+                        self.stdout.write(f"{size:>8} {impl:>10} {queries[impl]:>8} {statistics.median(values):>10.1f}")
+
+                transaction.set_rollback(True)
+            self.stdout.write(self.style.SUCCESS(f"{size:>8} payloads and workflow model match"))
+
+    def _seed(self, user_count, size, days):
+        """Create heavy users with ``size`` events each spread over the window."""
+        users = [
+            User.objects.create(username=f"bench_flow_{i}_{random.randint(0, 10 ** 9)}")
+            for i in range(user_count)
+        ]
+        types = [(event_type, source) for event_type, source, _ in EVENT_MIX]
+        weights = [weight for _, _, weight in EVENT_MIX]
+        now = timezone.now()
+        # Microsecond offsets keep the ordering by created_at free of ties. The hour
+        # of margin keeps every event inside the window while the model is fed
+        window = (days * 24 * 3600 - 3600) * 10 ** 6
+
+        events = []
+        for user in users:
+            for i in range(size):
+                event_type, source = random.choices(types, weights)[0]
+                events.append(ActivityEvent(
+                    user=user,
+                    event_type=event_type,
+                    title=f"{event_type} PROJ-{random.randint(1, 500)}",
+                    description="x" * random.randint(0, 2000),
+                    metadata={'pr_number': random.randint(1, 2000)} if event_type.startswith('pr_') else {},
+                    source_system=source,
+                    source_id=f"flow-{user.id}-{i}",
+                    created_at=now - timedelta(microseconds=random.randint(0, window)),
+                ))
+        ActivityEvent.objects.bulk_create(events, batch_size=5000)
+
+        # Feed the workflow model as ingest would: small batches in arrival order
+        start = time.perf_counter()
+        events.sort(key=lambda event: event.created_at)
+        for offset in range(0, len(events), 50):
+            record_workflow(events[offset:offset + 50])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Workflow model updated for {len(events)} events in {elapsed:.1f}s "
+                          f"({elapsed * 10 ** 6 / len(events):.0f}us per event)")
+
+        # Seeding overflows the debug query log, which would break the query counts
+        connection.queries_log.clear()
+        return users
+
+    def _check_model(self, model, expected, size):
+        """The model covers all history, which here is exactly the benchmark window."""
+        for key in ('activities_count', 'activity_types', 'transitions_count'):
+            model_value = sorted(model[key]) if key == 'activity_types' else model[key]
+            if model_value != expected[key]:
+                raise CommandError(f"Workflow model {key} differs for a user with {size} events")
+
+        # Running averages and sums differ in the last float digits
+        rounded = [
+            [dict(t, avg_time=round(t['avg_time'], 6)) for t in patterns['transitions']]
+            for patterns in (model['patterns'], expected['patterns'])
+        ]
+        insights = [
+            {insight['type']: insight['data'] for insight in patterns['insights']}
+            for patterns in (model['patterns'], expected['patterns'])
+        ]
+        if rounded[0] != rounded[1] or insights[0]['common_sequences'] != insights[1]['common_sequences'] \
+                or insights[0]['peak_hours']['counts'] != insights[1]['peak_hours']['counts']:
+            raise CommandError(f"Workflow model patterns differ for a user with {size} events")
+
+    def _instance_pattern(self, user_id, days):
+        """The previous implementation: full model instances, histograms and sequences in Python."""
+        activities = ActivityEvent.objects.filter(
+            user_id=user_id,
+            created_at__gte=timezone.now() - timedelta(days=days)
+        ).order_by('created_at')
+
+        if not activities:
+            return None
+
+        transitions = {}
+        transitions_count = 0
+        for previous, activity in zip(activities, list(activities)[1:]):
+            time_diff = (activity.created_at - previous.created_at).total_seconds() / 3600
+            if time_diff <= 24:
+                transitions_count += 1
+                key = f"{previous.event_type}:{previous.source_system} -> {activity.event_type}:{activity.source_system}"
+                entry = transitions.setdefault(key, {
+                    "count": 0,
+                    "avg_time": 0,
+                    "from_type": previous.event_type,
+                    "to_type": activity.event_type,
+                    "from_system": previous.source_system,
+                    "to_system": activity.source_system
+                })
+                entry["count"] += 1
+                entry["avg_time"] = ((entry["count"] - 1) * entry["avg_time"] + time_diff) / entry["count"]
+
+        hour_counts = {}
+        for activity in activities:
+            hour_counts[activity.created_at.hour] = hour_counts.get(activity.created_at.hour, 0) + 1
+        peak_hours = sorted(hour_counts.items(), key=lambda x: x[1], reverse=True)[:3]
+
+        sequence_types = [a.event_type for a in activities]
+        sequences = {}
+        for i in range(len(sequence_types) - 2):
+            seq = " -> ".join(sequence_types[i:i + 3])
+            sequences[seq] = sequences.get(seq, 0) + 1
+
+        insights = [{
+            "type": "peak_hours",
+            "description": f"Most active hours: {', '.join([f'{h}:00' for h, _ in peak_hours])}",
+            "data": {"peak_hours": [h for h, _ in peak_hours], "counts": [c for _, c in peak_hours]}
+        }]
+        if sequences:
+            insights.append({
+                "type": "common_sequences",
+                "description": "Common activity sequences detected",
+                "data": [
+                    {"sequence": s, "count": c}
+                    for s, c in sorted(sequences.items(), key=lambda x: x[1], reverse=True)
+                ][:3]
+            })
+
+        return {
+            "user_id": user_id,
+            "activities_count": activities.count(),
+            "activity_types": list(set(a.event_type for a in activities)),
+            "transitions_count": transitions_count,
+            "patterns": {
+                "transitions": sorted(transitions.values(), key=lambda x: x["count"], reverse=True)[:5],
+                "insights": insights
+            } if transitions else []
+        }
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from context_builder.trackers.models import ActivityEvent
+from context_builder.trackers.workflow import rebuild_workflow
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user workflow transitions and sequence counts from the full activity history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', help="User ids (default: every user with activity)")
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or list(
+            ActivityEvent.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+
+        start = time.perf_counter()
+        events = 0
+        for user_id in user_ids:
+            # One transaction per user, so the command can be interrupted and re-run
+            events += rebuild_workflow(user_id)
+            self.stdout.write(f"Rebuilt workflow of user {user_id}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(user_ids)} workflow models from {events} events in {time.perf_counter() - start:.1f}s"
+        ))
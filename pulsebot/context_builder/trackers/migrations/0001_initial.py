@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('commit', 'Code Commit'), ('pr_create', 'PR Created'), ('pr_review', 'PR Reviewed'), ('pr_merge', 'PR Merged'), ('issue_create', 'Issue Created'), ('issue_comment', 'Issue Comment'), ('issue_close', 'Issue Closed'), ('standup', 'Standup Update'), ('meeting', 'Meeting'), ('blocker', 'Blocker Reported')], max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('source_system', models.CharField(max_length=50)),
+                ('source_id', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
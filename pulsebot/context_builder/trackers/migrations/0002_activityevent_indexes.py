@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from context_builder.trackers.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trackers', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='activityevent',
+            index=models.Index(fields=['user', 'created_at'], name='activity_user_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='activityevent',
+            index=models.Index(fields=['user', 'event_type', 'created_at'], name='activity_user_type_idx'),
+        ),
+        AddIndexOnline(
+            model_name='activityevent',
+            index=models.Index(fields=['user', 'source_system', 'created_at'], name='activity_user_source_idx'),
+        ),
+        AddIndexOnline(
+            model_name='activityevent',
+            index=models.Index(condition=models.Q(('event_type__startswith', 'pr_')), fields=['user', 'created_at'], name='activity_pr_user_created_idx'),
+        ),
+        # activity_user_created_idx serves user_id lookups, so the foreign key's own index is redundant
+        migrations.AlterField(
+            model_name='activityevent',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
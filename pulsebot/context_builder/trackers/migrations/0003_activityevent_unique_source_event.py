@@ -0,0 +1,59 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:17
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from context_builder.trackers.operations import AddConstraintOnline
+
+
+def dedupe_source_events(apps, schema_editor):
+    """Drop redelivered duplicates and disambiguate the remaining collisions.
+
+    Identical rows for the same source key are webhook retries and are removed.
+    Rows that share a key but differ in content (e.g. Jira issue updates,
+    which used to reuse the issue key) get their primary key appended so the
+    unique constraint can be built without losing history.
+    """
+    ActivityEvent = apps.get_model('trackers', 'ActivityEvent')
+    key = ('source_system', 'event_type', 'source_id')
+    events = ActivityEvent.objects.exclude(source_id='')
+
+    retries = (
+        events.values(*key, 'user_id', 'title', 'description')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for group in retries.iterator():
+        keep_id = group.pop('keep_id')
+        group.pop('copies')
+        ActivityEvent.objects.filter(**group).exclude(id=keep_id).delete()
+
+    collisions = (
+        events.values(*key)
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for group in collisions.iterator():
+        keep_id = group.pop('keep_id')
+        group.pop('copies')
+        for event in ActivityEvent.objects.filter(**group).exclude(id=keep_id).only('id', 'source_id'):
+            event.source_id = f"{event.source_id}:{event.id}"[:255]
+            event.save(update_fields=['source_id'])
+
+
+class Migration(migrations.Migration):
+
+    # The unique index is built with CREATE UNIQUE INDEX CONCURRENTLY on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('trackers', '0002_activityevent_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_source_events, migrations.RunPython.noop, atomic=True),
+        AddConstraintOnline(
+            model_name='activityevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('source_id', ''), _negated=True), fields=('source_system', 'event_type', 'source_id'), name='activity_unique_source_event'),
+        ),
+    ]
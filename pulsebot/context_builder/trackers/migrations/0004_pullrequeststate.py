@@ -0,0 +1,97 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_pull_requests(apps, schema_editor):
+    """Build PullRequestState rows from the PR events tracked so far.
+
+    Rows are keyed on the repository's full name (``org/repo``) like live
+    webhooks key them. Older events only recorded the short name; they are
+    mapped to the one full name seen for it in newer events, and skipped
+    when there is none or several, since a row under any other key would
+    never be closed by a webhook. Closed-without-merge wasn't tracked, so
+    those PRs stay open until GitHub sends another action for them.
+    """
+    ActivityEvent = apps.get_model('trackers', 'ActivityEvent')
+    PullRequestState = apps.get_model('trackers', 'PullRequestState')
+
+    events = (
+        ActivityEvent.objects
+        .filter(source_system='github', event_type__in=['pr_create', 'pr_review', 'pr_merge'])
+        .order_by('created_at')
+        .only('user_id', 'event_type', 'title', 'metadata', 'source_id', 'created_at')
+    )
+
+    full_names = {}
+    for source_id in events.filter(source_id__contains='#').values_list('source_id', flat=True).iterator():
+        full_name = source_id.split('#', 1)[0]
+        full_names.setdefault(full_name.rsplit('/', 1)[-1], set()).add(full_name)
+
+    states = {}
+    for event in events.iterator():
+        metadata = event.metadata or {}
+        number = metadata.get('pr_number')
+        if '#' in event.source_id:
+            repository = event.source_id.split('#', 1)[0]
+        else:
+            candidates = full_names.get(metadata.get('repository'), ())
+            repository = next(iter(candidates)) if len(candidates) == 1 else None
+        if not number or not repository:
+            continue
+
+        state = states.get((repository, number))
+        if state is None:
+            state = states[(repository, number)] = PullRequestState(
+                repository=repository,
+                number=number,
+                title=(event.title or '')[:255],
+                opened_at=event.created_at
+            )
+
+        if event.event_type == 'pr_create':
+            state.author_id = event.user_id
+            state.opened_at = min(state.opened_at, event.created_at)
+        elif event.event_type == 'pr_review':
+            state.first_review_at = state.first_review_at or event.created_at
+        else:
+            state.merged_at = state.closed_at = event.created_at
+
+    PullRequestState.objects.bulk_create(states.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trackers', '0003_activityevent_unique_source_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PullRequestState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repository', models.CharField(max_length=255)),
+                ('number', models.IntegerField()),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('opened_at', models.DateTimeField()),
+                ('first_review_at', models.DateTimeField(blank=True, null=True)),
+                ('merged_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pull_requests', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pullrequeststate',
+            index=models.Index(condition=models.Q(('closed_at__isnull', True), ('first_review_at__isnull', True)), fields=['author', 'opened_at'], name='pr_state_waiting_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pullrequeststate',
+            unique_together={('repository', 'number')},
+        ),
+        migrations.RunPython(backfill_pull_requests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0004_pullrequeststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ref_type', models.CharField(choices=[('jira_issue', 'Jira Issue Key'), ('github_ref', 'GitHub #Number Mention'), ('github_pr', 'GitHub Pull Request Number')], max_length=20)),
+                ('ref_key', models.CharField(max_length=100)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='trackers.activityevent')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activityreference',
+            index=models.Index(fields=['ref_key', 'ref_type'], name='activity_ref_key_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activityreference',
+            unique_together={('event', 'ref_type', 'ref_key')},
+        ),
+    ]
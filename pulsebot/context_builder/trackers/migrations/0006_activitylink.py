@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trackers', '0005_activityreference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_type', models.CharField(choices=[('commit_to_issue', 'Commit to Issue'), ('pr_to_issue', 'PR to Issue'), ('slack_to_pr', 'Slack Message to PR'), ('slack_to_issue', 'Slack Message to Issue')], max_length=20)),
+                ('ref_key', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_links', to='trackers.activityevent')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_links', to='trackers.activityevent')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activitylink',
+            index=models.Index(fields=['user', 'created_at'], name='activity_link_user_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activitylink',
+            unique_together={('source', 'target', 'link_type', 'ref_key')},
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trackers', '0006_activitylink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recent', models.JSONField(blank=True, default=list)),
+                ('last_event_at', models.DateTimeField(blank=True, null=True)),
+                ('event_count', models.IntegerField(default=0)),
+                ('event_types', models.JSONField(blank=True, default=list)),
+                ('hour_counts', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='workflow_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkflowSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('context', models.CharField(max_length=255)),
+                ('next_type', models.CharField(max_length=50)),
+                ('length', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workflow_sequences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkflowTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_type', models.CharField(max_length=50)),
+                ('from_system', models.CharField(max_length=50)),
+                ('to_type', models.CharField(max_length=50)),
+                ('to_system', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('total_hours', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workflow_transitions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'from_type', 'from_system', 'to_type', 'to_system')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='workflowsequence',
+            index=models.Index(fields=['user', 'length', '-count'], name='workflow_seq_length_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='workflowsequence',
+            unique_together={('user', 'context', 'next_type')},
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+def rekey_short_names(apps, schema_editor):
+    """Move backfilled PullRequestState rows keyed on a short repository name to its full name.
+
+    Webhooks key rows on ``org/repo``, so a row under the short name is never
+    closed and stays a stale-PR blocker. Rows whose full name is ambiguous or
+    unknown, or whose full-name row already exists, are deleted.
+    """
+    ActivityEvent = apps.get_model('trackers', 'ActivityEvent')
+    PullRequestState = apps.get_model('trackers', 'PullRequestState')
+
+    orphans = PullRequestState.objects.exclude(repository__contains='/')
+    if not orphans.exists():
+        return
+
+    full_names = {}
+    known = (
+        ActivityEvent.objects
+        .filter(source_system='github', source_id__contains='#')
+        .values_list('source_id', flat=True)
+    )
+    for source_id in known.iterator():
+        full_name = source_id.split('#', 1)[0]
+        full_names.setdefault(full_name.rsplit('/', 1)[-1], set()).add(full_name)
+    for full_name in PullRequestState.objects.filter(repository__contains='/').values_list('repository', flat=True):
+        full_names.setdefault(full_name.rsplit('/', 1)[-1], set()).add(full_name)
+
+    for state in orphans.iterator():
+        candidates = full_names.get(state.repository, ())
+        if len(candidates) == 1:
+            repository = next(iter(candidates))
+            if not PullRequestState.objects.filter(repository=repository, number=state.number).exists():
+                state.repository = repository
+                state.save(update_fields=['repository'])
+                continue
+        state.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0007_workflow_model'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_short_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Existing Jira issues are indexed by `manage.py backfill_activity_references --issue-index`,
+# with the same code as ingest, rather than by a data migration pinned to today's hashing
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0008_pullrequeststate_full_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issue_buckets', to='trackers.activityevent')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='issuebucket',
+            index=models.Index(fields=['bucket'], name='issue_bucket_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuebucket',
+            unique_together={('event', 'bucket')},
+        ),
+    ]
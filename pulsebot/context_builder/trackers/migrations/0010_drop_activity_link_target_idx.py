@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def drop_target_index(apps, schema_editor):
+    """Drop the index 0006 used to create on ActivityLink.target.
+
+    It duplicated the index Django creates for the target foreign key and is
+    no longer part of 0006, so only databases migrated before that still
+    have it.
+    """
+    ActivityLink = apps.get_model('trackers', 'ActivityLink')
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, ActivityLink._meta.db_table)
+
+    if 'activity_link_target_idx' in constraints:
+        schema_editor.remove_index(ActivityLink, models.Index(fields=['target'], name='activity_link_target_idx'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0009_issuebucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_target_index, migrations.RunPython.noop),
+    ]
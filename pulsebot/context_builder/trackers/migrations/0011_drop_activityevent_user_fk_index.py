@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def drop_user_index(apps, schema_editor):
+    """Drop the foreign key index on ActivityEvent.user_id left by an earlier 0002.
+
+    0002 now turns it off with db_index=False, since activity_user_created_idx
+    serves the same lookups, but databases that applied 0002 before that still
+    maintain both on every insert.
+    """
+    ActivityEvent = apps.get_model('trackers', 'ActivityEvent')
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, ActivityEvent._meta.db_table)
+
+    for name, info in constraints.items():
+        if info['index'] and info['columns'] == ['user_id'] and not info['unique'] and not info['primary_key']:
+            schema_editor.remove_index(ActivityEvent, models.Index(fields=['user'], name=name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0010_drop_activity_link_target_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_user_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-17 05:08
+
+from datetime import timezone as dt_timezone
+from django.db import migrations, models
+from django.db.models import Min
+from django.db.models.functions import ExtractHour
+
+
+def fill_hour_first_seen(apps, schema_editor):
+    """Record the earliest activity of each UTC hour for the workflow models built so far."""
+    ActivityEvent = apps.get_model('trackers', 'ActivityEvent')
+    WorkflowState = apps.get_model('trackers', 'WorkflowState')
+
+    states = {state.user_id: state for state in WorkflowState.objects.all()}
+    if not states:
+        return
+
+    for state in states.values():
+        state.hour_first_seen = [None] * 24
+
+    first_seen = ActivityEvent.objects.annotate(
+        hour=ExtractHour('created_at', tzinfo=dt_timezone.utc)
+    ).values('user_id', 'hour').annotate(first=Min('created_at')).order_by()
+    for row in first_seen.iterator():
+        state = states.get(row['user_id'])
+        if state is not None:
+            state.hour_first_seen[row['hour']] = row['first'].astimezone(dt_timezone.utc).isoformat(timespec='microseconds')
+
+    WorkflowState.objects.bulk_update(list(states.values()), ['hour_first_seen'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackers', '0011_drop_activityevent_user_fk_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowstate',
+            name='hour_first_seen',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_hour_first_seen, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
 import logging
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth.models import User
+from .buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +23,8 @@ class ActivityEvent(models.Model):
         ('blocker', 'Blocker Reported'),
     )
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed through activity_user_created_idx, which starts with user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -29,19 +33,279 @@ class ActivityEvent(models.Model):
     source_id = models.CharField(max_length=255, blank=True)  # ID in source system
     created_at = models.DateTimeField(default=timezone.now)
     
+    class Meta:
+        indexes = [
+            # Standup/digest/correlation windows: user + time range, ordered by time
+            models.Index(fields=['user', 'created_at'], name='activity_user_created_idx'),
+            # Blocker detection and commitment scans: user + exact event type + time
+            models.Index(fields=['user', 'event_type', 'created_at'], name='activity_user_type_idx'),
+            # Correlation splits a user's window by source system
+            models.Index(fields=['user', 'source_system', 'created_at'], name='activity_user_source_idx'),
+            # event_type__startswith='pr_' compiles to LIKE, which a plain btree
+            # on event_type can't serve; a partial index on the prefix can
+            models.Index(
+                fields=['user', 'created_at'],
+                name='activity_pr_user_created_idx',
+                condition=Q(event_type__startswith='pr_'),
+            ),
+        ]
+        constraints = [
+            # Webhook redeliveries carry the same source id; internal events have none
+            models.UniqueConstraint(
+                fields=['source_system', 'event_type', 'source_id'],
+                condition=~Q(source_id=''),
+                name='activity_unique_source_event',
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.event_type}: {self.title}"
 
+class ActivityReference(models.Model):
+    """An issue key or number an activity event refers to, extracted once at ingest.
+    
+    Correlation joins events on ``ref_key`` instead of pattern-matching
+    every event's text against every other event's.
+    """
+    REF_TYPES = (
+        ('jira_issue', 'Jira Issue Key'),
+        ('github_ref', 'GitHub #Number Mention'),
+        ('github_pr', 'GitHub Pull Request Number'),
+    )
+    
+    event = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='references')
+    ref_type = models.CharField(max_length=20, choices=REF_TYPES)
+    ref_key = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ('event', 'ref_type', 'ref_key')
+        indexes = [
+            models.Index(fields=['ref_key', 'ref_type'], name='activity_ref_key_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} -> {self.ref_type}:{self.ref_key}"
+
+class ActivityLink(models.Model):
+    """A correlation between two of a user's events, kept up to date as events arrive.
+    
+    Edges point from the mentioning event to what it mentions (commit or PR
+    to Jira issue, Slack message to PR or issue). ``created_at`` is when the
+    link came to exist: the later of the two events.
+    """
+    LINK_TYPES = (
+        ('commit_to_issue', 'Commit to Issue'),
+        ('pr_to_issue', 'PR to Issue'),
+        ('slack_to_pr', 'Slack Message to PR'),
+        ('slack_to_issue', 'Slack Message to Issue'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    source = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='outgoing_links')
+    target = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='incoming_links')
+    link_type = models.CharField(max_length=20, choices=LINK_TYPES)
+    ref_key = models.CharField(max_length=100)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('source', 'target', 'link_type', 'ref_key')
+        indexes = [
+            # Correlation windows
+            models.Index(fields=['user', 'created_at'], name='activity_link_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.source_id} -[{self.link_type}]-> {self.target_id}"
+
+class IssueBucket(models.Model):
+    """One LSH band bucket of a Jira issue's MinHash signature, stored at ingest.
+    
+    Similarity-based issue suggestions look up the buckets of a commit or
+    PR here instead of re-hashing every issue of the team on each call.
+    """
+    event = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='issue_buckets')
+    bucket = models.BigIntegerField()
+    
+    class Meta:
+        unique_together = ('event', 'bucket')
+        indexes = [
+            models.Index(fields=['bucket'], name='issue_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} in {self.bucket}"
+
+class PullRequestState(models.Model):
+    """Current lifecycle of a GitHub pull request, kept up to date from webhooks.
+    
+    One row per PR, so stale-PR detection reads the PRs that are still open
+    instead of every pr_create event ever tracked.
+    """
+    repository = models.CharField(max_length=255)  # full name, e.g. org/repo
+    number = models.IntegerField()
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='pull_requests')
+    title = models.CharField(max_length=255, blank=True)
+    opened_at = models.DateTimeField()
+    first_review_at = models.DateTimeField(null=True, blank=True)
+    merged_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('repository', 'number')
+        indexes = [
+            # Stale-PR blockers: only open PRs nobody has reviewed yet
+            models.Index(
+                fields=['author', 'opened_at'],
+                name='pr_state_waiting_idx',
+                condition=Q(closed_at__isnull=True, first_review_at__isnull=True),
+            ),
+        ]
+    
+    @property
+    def is_open(self):
+        return self.closed_at is None
+    
+    def __str__(self):
+        return f"{self.repository}#{self.number}"
+
+class WorkflowState(models.Model):
+    """Where a user's workflow model stands: the last few activities and running totals.
+    
+    Together with WorkflowTransition and WorkflowSequence this is updated as
+    each event is tracked, so workflow patterns are read, not recomputed.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='workflow_state')
+    recent = models.JSONField(default=list, blank=True)  # [event_type, source_system] pairs, oldest first
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    event_count = models.IntegerField(default=0)
+    event_types = models.JSONField(default=list, blank=True)
+    hour_counts = models.JSONField(default=list, blank=True)  # 24 activity counts by UTC hour
+    hour_first_seen = models.JSONField(default=list, blank=True)  # Earliest activity in each UTC hour, ISO 8601
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Workflow of user {self.user_id} ({self.event_count} events)"
+
+class WorkflowTransition(models.Model):
+    """How often one of a user's activities followed another within a day, and how quickly."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workflow_transitions')
+    from_type = models.CharField(max_length=50)
+    from_system = models.CharField(max_length=50)
+    to_type = models.CharField(max_length=50)
+    to_system = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+    total_hours = models.FloatField(default=0)
+    
+    class Meta:
+        unique_together = ('user', 'from_type', 'from_system', 'to_type', 'to_system')
+    
+    @property
+    def avg_time(self):
+        return self.total_hours / self.count if self.count else 0
+    
+    def __str__(self):
+        return f"{self.from_type}:{self.from_system} -> {self.to_type}:{self.to_system} ({self.count})"
+
+class WorkflowSequence(models.Model):
+    """How often a run of 1-4 event types (``context``) was followed by ``next_type``.
+    
+    Each row is an n-gram of ``length`` event types (2 to 5); keying on the
+    context makes "what usually comes after this?" a single index lookup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workflow_sequences')
+    context = models.CharField(max_length=255)  # event types joined with " -> "
+    next_type = models.CharField(max_length=50)
+    length = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('user', 'context', 'next_type')
+        indexes = [
+            # Most common sequences of a given length
+            models.Index(fields=['user', 'length', '-count'], name='workflow_seq_length_idx'),
+        ]
+    
+    @property
+    def sequence(self):
+        return f"{self.context} -> {self.next_type}"
+    
+    def __str__(self):
+        return f"{self.sequence} ({self.count})"
+
+
+def _write_activity_events(rows):
+    """Flush buffered ActivityEvent rows, retrying one by one if the batch INSERT fails.
+    
+    Returns the rows that still failed, which the buffer queues for another try.
+    """
+    from .references import record_references
+    from .workflow import record_workflow
+    
+    try:
+        with transaction.atomic():
+            ActivityEvent.objects.bulk_create(rows, ignore_conflicts=True)
+            record_references(rows)
+            record_workflow(rows)
+        return
+    except Exception as e:
+        logger.warning(f"Batch insert of {len(rows)} activity events failed ({e}), retrying individually")
+    
+    # One bad row (e.g. a user deleted since it was queued) shouldn't hold back the rest
+    failed = []
+    for row in rows:
+        try:
+            with transaction.atomic():
+                ActivityEvent.objects.bulk_create([row], ignore_conflicts=True)
+                record_references([row])
+                record_workflow([row])
+        except Exception as e:
+            logger.error(f"Failed to write buffered activity event {row.event_type} for user {row.user_id}: {e}")
+            failed.append(row)
+    return failed
+
+
+# Shared by every request thread in this process; see ActivityTracker
+activity_event_buffer = WriteBehindBuffer(
+    _write_activity_events,
+    name='activity-events',
+    max_batch=getattr(settings, 'ACTIVITY_WRITE_BEHIND_MAX_BATCH', 1000),
+    flush_interval=getattr(settings, 'ACTIVITY_WRITE_BEHIND_MAX_LATENCY_MS', 100) / 1000,
+    max_pending=getattr(settings, 'ACTIVITY_WRITE_BEHIND_MAX_PENDING', 50000)
+)
+
+
 class ActivityTracker:
-    def __init__(self):
-        pass
+    """Records and queries activity events.
+    
+    With write-behind enabled (``ACTIVITY_WRITE_BEHIND`` or the ``write_behind``
+    argument) tracked events are handed to ``activity_event_buffer`` instead of
+    being inserted inline, so events from concurrent requests are coalesced
+    into one bulk INSERT at most ``ACTIVITY_WRITE_BEHIND_MAX_LATENCY_MS`` later.
+    Conflicting source ids are always skipped on that path, and an event is
+    not visible to queries until its batch is flushed. When the buffer is
+    full, events are written inline as usual.
+    """
     
-    def track_event(self, user_id, event_type, title, description="", metadata=None, source_system="pulsebot", source_id=""):
-        """Track a new activity event."""
+    def __init__(self, write_behind=None):
+        if write_behind is None:
+            write_behind = getattr(settings, 'ACTIVITY_WRITE_BEHIND', False)
+        self.write_behind = write_behind
+    
+    def track_event(self, user_id, event_type, title, description="", metadata=None, source_system="pulsebot", source_id="", ignore_conflicts=False):
+        """Track a new activity event.
+        
+        With ``ignore_conflicts`` an event whose (source_system, event_type,
+        source_id) was already tracked is silently skipped, which makes
+        webhook redeliveries idempotent.
+        """
+        from .references import record_references
+        from .workflow import record_workflow
+        
         try:
             user = User.objects.get(id=user_id)
             
-            ActivityEvent.objects.create(
+            event = ActivityEvent(
                 user=user,
                 event_type=event_type,
                 title=title,
@@ -51,6 +315,17 @@ class ActivityTracker:
                 source_id=source_id
             )
             
+            if self.write_behind and activity_event_buffer.offer(event):
+                return True
+            
+            with transaction.atomic():
+                if ignore_conflicts:
+                    ActivityEvent.objects.bulk_create([event], ignore_conflicts=True)
+                else:
+                    event.save()
+                record_references([event])
+                record_workflow([event])
+            
             return True
         except User.DoesNotExist:
             logger.error(f"Cannot track event: User {user_id} not found")
@@ -59,6 +334,101 @@ class ActivityTracker:
             logger.error(f"Error tracking activity event: {e}")
             return False
     
+    def track_events_bulk(self, user_id, events, user=None, ignore_conflicts=False):
+        """Track several activity events for one user with a single INSERT.
+        
+        Each item in ``events`` is a dict with the same keys as the
+        ``track_event`` arguments (``event_type`` and ``title`` required).
+        Pass ``user`` when the caller has already loaded it to skip the lookup,
+        and ``ignore_conflicts`` to skip events that were already tracked.
+        """
+        if not events:
+            return True
+        
+        from .references import record_references
+        from .workflow import record_workflow
+        
+        try:
+            if user is None:
+                user = User.objects.get(id=user_id)
+            
+            rows = [
+                ActivityEvent(
+                    user=user,
+                    event_type=event['event_type'],
+                    title=event['title'] or '',
+                    description=event.get('description') or '',
+                    metadata=event.get('metadata') or {},
+                    source_system=event.get('source_system', 'pulsebot'),
+                    source_id=event.get('source_id') or ''
+                )
+                for event in events
+            ]
+            
+            if self.write_behind and activity_event_buffer.offer_many(rows):
+                return True
+            
+            with transaction.atomic():
+                ActivityEvent.objects.bulk_create(rows, ignore_conflicts=ignore_conflicts)
+                record_references(rows)
+                record_workflow(rows)
+            
+            return True
+        except User.DoesNotExist:
+            logger.error(f"Cannot track events: User {user_id} not found")
+            return False
+        except Exception as e:
+            logger.error(f"Error bulk tracking {len(events)} activity events: {e}")
+            return False
+    
+    def record_pull_request(self, repository, number, action, author_id=None, title='', opened_at=None, acted_at=None, merged=False):
+        """Apply a pull request action (opened, reopened, submitted, closed) to its PullRequestState.
+        
+        ``opened_at`` and ``acted_at`` should come from the payload so that
+        redeliveries leave the row unchanged; both default to now. A PR first
+        seen through a later action (opened before tracking started) gets a
+        row created on the spot.
+        """
+        if not repository or not number:
+            return None
+        
+        now = timezone.now()
+        acted_at = acted_at or now
+        
+        try:
+            with transaction.atomic():
+                state, created = PullRequestState.objects.select_for_update().get_or_create(
+                    repository=repository,
+                    number=number,
+                    defaults={
+                        'author_id': author_id,
+                        'title': (title or '')[:255],
+                        'opened_at': opened_at or acted_at,
+                    }
+                )
+                
+                if not created:
+                    if author_id and not state.author_id:
+                        state.author_id = author_id
+                    if title:
+                        state.title = title[:255]
+                
+                if action == 'reopened':
+                    state.closed_at = None
+                    state.merged_at = None
+                elif action == 'submitted':
+                    if state.first_review_at is None or acted_at < state.first_review_at:
+                        state.first_review_at = acted_at
+                elif action == 'closed':
+                    state.closed_at = acted_at
+                    state.merged_at = acted_at if merged else None
+                
+                state.save()
+            return state
+        except Exception as e:
+            logger.error(f"Error recording pull request state for {repository}#{number}: {e}")
+            return None
+    
     def get_user_activity(self, user_id, days=7, event_types=None):
         """Get recent activity for a user."""
         try:
@@ -79,37 +449,50 @@ class ActivityTracker:
     
     def detect_blockers(self, user_id):
         """Detect potential blockers based on activity patterns."""
-        blockers = []
+        return self.detect_blockers_for_users([user_id])[user_id]
+    
+    def detect_blockers_for_users(self, user_ids):
+        """Detect blockers for several users at once, keyed by user id.
+        
+        Two queries regardless of how many users are passed, for team-wide
+        digests and batches of standups or follow-ups.
+        """
+        now = timezone.now()
+        blockers = {user_id: [] for user_id in user_ids}
+        if not blockers:
+            return blockers
         
         # Look for explicit blocker events
         explicit_blockers = ActivityEvent.objects.filter(
-            user_id=user_id,
+            user_id__in=blockers,
             event_type='blocker',
-            created_at__gte=timezone.now() - timedelta(days=3)
-        )
+            created_at__gte=now - timedelta(days=3)
+        ).order_by('created_at').values_list('user_id', 'title', 'description', 'created_at')
         
-        for blocker in explicit_blockers:
-            blockers.append({
+        for user_id, title, description, created_at in explicit_blockers:
+            blockers[user_id].append({
                 'type': 'reported',
-                'title': blocker.title,
-                'description': blocker.description,
-                'created_at': blocker.created_at
+                'title': title,
+                'description': description,
+                'created_at': created_at
             })
         
-        # Look for PRs waiting for review for > 2 days
-        stale_prs = ActivityEvent.objects.filter(
-            user_id=user_id,
-            event_type='pr_create',
-            created_at__lte=timezone.now() - timedelta(days=2)
-        )
+        # Look for PRs still open and unreviewed after 2 days
+        stale_prs = PullRequestState.objects.filter(
+            author_id__in=blockers,
+            closed_at__isnull=True,
+            first_review_at__isnull=True,
+            opened_at__lte=now - timedelta(days=2)
+        ).order_by('opened_at').values_list('author_id', 'title', 'opened_at', 'repository', 'number')
         
-        # In a real system, you'd check if these PRs have been reviewed/merged
-        for pr in stale_prs:
-            blockers.append({
+        for user_id, title, opened_at, repository, number in stale_prs:
+            blockers[user_id].append({
                 'type': 'stale_pr',
-                'title': f"PR waiting: {pr.title}",
+                'title': f"PR waiting: {title}",
                 'description': "This PR has been waiting for review for more than 2 days",
-                'created_at': pr.created_at
+                'created_at': opened_at,
+                'repository': repository,
+                'pr_number': number
             })
         
         return blockers
\ No newline at end of file
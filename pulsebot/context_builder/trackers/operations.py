@@ -0,0 +1,68 @@
+from django.db.migrations.operations import AddConstraint, AddIndex
+
+
+class AddIndexOnline(AddIndex):
+    """Add an index without blocking writes to the table.
+
+    On PostgreSQL this issues CREATE INDEX CONCURRENTLY, which can't run
+    inside a transaction, so migrations using it must set ``atomic = False``.
+    Other backends fall back to a regular CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return 'Create index %s online on field(s) %s of model %s' % (
+            self.index.name,
+            ', '.join(self.index.fields),
+            self.model_name,
+        )
+
+
+class AddConstraintOnline(AddConstraint):
+    """Add a conditional UniqueConstraint without blocking writes.
+
+    Conditional unique constraints are backed by a unique partial index, so on
+    PostgreSQL the index is built with CREATE UNIQUE INDEX CONCURRENTLY. Like
+    AddIndexOnline, migrations using it must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql' and getattr(self.constraint, 'condition', None) is not None:
+            sql = str(self.constraint.create_sql(model, schema_editor))
+            schema_editor.execute(sql.replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY', 1))
+        else:
+            schema_editor.add_constraint(model, self.constraint)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor == 'postgresql' and getattr(self.constraint, 'condition', None) is not None:
+            schema_editor.execute(
+                'DROP INDEX CONCURRENTLY IF EXISTS %s' % schema_editor.quote_name(self.constraint.name)
+            )
+        else:
+            schema_editor.remove_constraint(model, self.constraint)
+
+    def describe(self):
+        return 'Create constraint %s online on model %s' % (self.constraint.name, self.model_name)
@@ -0,0 +1,97 @@
+import logging
+import re
+from collections import defaultdict
+from .issue_index import is_indexed_issue, record_issue_buckets
+from .links import record_links
+from .models import ActivityEvent, ActivityReference
+
+logger = logging.getLogger(__name__)
+
+# One pass over an event's text finds both Jira issue keys (PROJ-123) and GitHub
+# #123 references; the lookbehind keeps URLs fragments and "org/repo#1" ids out
+REFERENCE_PATTERN = re.compile(r'\b(?P<jira>[A-Z][A-Z0-9_]*-\d+)\b|(?<![\w/&])#(?P<github>\d+)\b')
+
+# Keep the IN lists below SQLite's bound-variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def extract_references(event):
+    """Return the (ref_type, ref_key) pairs an event refers to, in order of appearance.
+
+    Text mentions give ``jira_issue`` and ``github_ref`` pairs; the issue key
+    a Jira event belongs to and the PR number a GitHub PR event belongs to
+    are added from its metadata as ``jira_issue`` and ``github_pr``.
+    """
+    return find_references(event.source_system, event.event_type, event.title, event.description, event.metadata)
+
+
+def find_references(source_system, event_type, title, description, metadata):
+    """``extract_references`` for an event given as its column values."""
+    refs = []
+
+    for match in REFERENCE_PATTERN.finditer(f"{title or ''}\n{description or ''}"):
+        if match.group('jira'):
+            refs.append(('jira_issue', match.group('jira')))
+        else:
+            refs.append(('github_ref', match.group('github')))
+
+    metadata = metadata or {}
+    if source_system == 'jira' and metadata.get('issue_key'):
+        refs.append(('jira_issue', str(metadata['issue_key'])))
+    if source_system == 'github' and event_type.startswith('pr_') and metadata.get('pr_number'):
+        refs.append(('github_pr', str(metadata['pr_number'])))
+
+    # Drop repeats, keeping the first occurrence
+    return list(dict.fromkeys((ref_type, ref_key[:100]) for ref_type, ref_key in refs))
+
+
+def record_references(events):
+    """Store the references of freshly written events, and the links they create; safe to repeat.
+
+    Jira issues are also added to the similarity index (see ``issue_index``).
+    Rows from ``bulk_create`` may come back without a primary key (always on
+    SQLite, and on PostgreSQL with ``ignore_conflicts``); those are looked up
+    by their source id. Events without a key or a source id are skipped and
+    left to ``backfill_activity_references``.
+    """
+    events = list(events)
+    pending = [(event, refs) for event, refs in ((event, extract_references(event)) for event in events) if refs]
+    issues = [event for event in events if is_indexed_issue(event)]
+    if not pending and not issues:
+        return 0
+
+    unresolved = {id(event): event for event, _ in pending if event.pk is None}
+    unresolved.update((id(event), event) for event in issues if event.pk is None)
+    _resolve_ids(list(unresolved.values()))
+    record_issue_buckets(issues)
+
+    rows = [
+        ActivityReference(event_id=event.pk, ref_type=ref_type, ref_key=ref_key)
+        for event, refs in pending if event.pk
+        for ref_type, ref_key in refs
+    ]
+    ActivityReference.objects.bulk_create(rows, ignore_conflicts=True)
+    record_links({row.event_id for row in rows})
+    return len(rows)
+
+
+def _resolve_ids(events):
+    """Fill in primary keys of events written without one, matching on the source key."""
+    by_source = defaultdict(list)
+    for event in events:
+        if event.source_id:
+            by_source[(event.source_system, event.event_type)].append(event)
+        else:
+            logger.debug(f"Skipping references for {event.event_type} event without an id")
+
+    for (source_system, event_type), source_events in by_source.items():
+        for start in range(0, len(source_events), LOOKUP_CHUNK_SIZE):
+            chunk = source_events[start:start + LOOKUP_CHUNK_SIZE]
+            # Matches activity_unique_source_event, partial condition included, so it's an index search
+            ids = dict(ActivityEvent.objects.filter(
+                source_system=source_system,
+                event_type=event_type,
+                source_id__in={event.source_id for event in chunk}
+            ).exclude(source_id='').values_list('source_id', 'id'))
+            for event in chunk:
+                event.pk = ids.get(event.source_id)
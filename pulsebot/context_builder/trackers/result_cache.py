@@ -0,0 +1,101 @@
+import functools
+import inspect
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from .models import ActivityEvent
+
+logger = logging.getLogger(__name__)
+
+
+class CorrelationCache:
+    """Caches ActivityCorrelator results per user, arguments and event watermark.
+
+    The watermark is the user's newest event id, so tracking an event moves
+    the user to a new key and the old entry is never read again (it expires
+    after ``CORRELATION_CACHE_TTL`` or is evicted by the cache's
+    ``MAX_ENTRIES``). Fuzzy correlation also looks at teammates' issues, so
+    it is keyed by the newest event overall. Windows are relative to now,
+    which the TTL bounds: an event can count for that long after leaving
+    the window. A TTL of 0 turns caching off.
+    """
+
+    def __init__(self, alias='correlation'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def cached(self, kind):
+        """Decorate an ActivityCorrelator method so its results are cached under ``kind``."""
+        def decorator(method):
+            signature = inspect.signature(method)
+
+            @functools.wraps(method)
+            def wrapper(correlator, *args, **kwargs):
+                ttl = getattr(settings, 'CORRELATION_CACHE_TTL', 300)
+                if ttl <= 0 or not correlator.user_id:
+                    return method(correlator, *args, **kwargs)
+
+                bound = signature.bind(correlator, *args, **kwargs)
+                bound.apply_defaults()
+                params = {name: value for name, value in bound.arguments.items() if name != 'self'}
+
+                return self._get_or_compute(kind, correlator, params, ttl, lambda: method(correlator, *args, **kwargs))
+
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Hit/miss counters per kind of result since the process started."""
+        with self._lock:
+            counters = {kind: dict(values) for kind, values in self._counters.items()}
+
+        for values in counters.values():
+            lookups = values['hits'] + values['misses']
+            values['hit_rate'] = round(values['hits'] / lookups, 3) if lookups else 0
+        return counters
+
+    def _get_or_compute(self, kind, correlator, params, ttl, compute):
+        cache = self._cache()
+        key = self._cache_key(kind, correlator, params)
+
+        result = cache.get(key)
+        if result is not None:
+            self._count(kind, 'hits')
+            return result
+
+        self._count(kind, 'misses')
+        result = compute()
+
+        if isinstance(result, dict) and 'error' not in result:
+            if len(result.get('correlations', ())) > getattr(settings, 'CORRELATION_CACHE_MAX_ITEMS', 5000):
+                self._count(kind, 'too_large')
+            else:
+                cache.set(key, result, ttl)
+        return result
+
+    def _cache_key(self, kind, correlator, params):
+        latest = ActivityEvent.objects.filter(user_id=correlator.user_id)
+        if params.get('fuzzy'):
+            latest = ActivityEvent.objects.all()
+        watermark = latest.order_by('-id').values_list('id', flat=True).first() or 0
+
+        arguments = ':'.join(f"{name}={value}" for name, value in sorted(params.items()))
+        return f"pulsebot:{kind}:{correlator.user_id}:{correlator.team_id}:{watermark}:{arguments}"
+
+    def _cache(self):
+        try:
+            return caches[self.alias]
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def _count(self, kind, counter):
+        with self._lock:
+            counters = self._counters.setdefault(kind, {'hits': 0, 'misses': 0, 'too_large': 0})
+            counters[counter] += 1
+
+
+# Shared by every request in this process so the counters cover all of them
+correlation_cache = CorrelationCache()
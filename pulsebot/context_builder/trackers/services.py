@@ -1,218 +1,377 @@
 import logging
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth.models import User
 from .models import ActivityEvent, ActivityTracker
 from .correlation import ActivityCorrelator
+from .identity import identity_resolver
+from .references import record_references
+from .workflow import get_workflow_model, record_workflow
 
 logger = logging.getLogger(__name__)
 
+def github_repository(payload):
+    """Full name of the payload's repository, falling back to the short name."""
+    repository = payload.get('repository', {})
+    return repository.get('full_name') or repository.get('name') or ''
+
+def github_source_id(payload, number, *parts):
+    """Build a delivery-stable source id like ``org/repo#12`` or ``org/repo#12:review:99``.
+    
+    PR and issue numbers are only unique within a repository, and several
+    events (reviews, comments) can share one number, so the extra parts
+    disambiguate them for the ActivityEvent uniqueness key.
+    """
+    source_id = f"{github_repository(payload)}#{number}"
+    if parts:
+        source_id += ':' + ':'.join(str(part) for part in parts)
+    return source_id
+
+# pull_request actions that change a PR's PullRequestState; reviews arrive
+# separately as pull_request_review events with action 'submitted'
+PULL_REQUEST_STATE_ACTIONS = {'opened', 'reopened', 'closed'}
+
+# Message subtypes that are edits, deletions or membership notices rather than new messages
+SKIPPED_SLACK_SUBTYPES = {'bot_message', 'message_changed', 'message_deleted', 'channel_join', 'channel_leave'}
+
+def is_trackable_slack_message(event):
+    """Whether a Slack event is a human message we record."""
+    return (
+        bool(event)
+        and event.get('type') == 'message'
+        and not event.get('bot_id')
+        and event.get('subtype') not in SKIPPED_SLACK_SUBTYPES
+    )
+
+def _is_noop_change(item):
+    """Whether a Jira changelog item leaves the field as it was."""
+    return item.get('fromString') == item.get('toString') and item.get('from') == item.get('to')
+
+def _jira_text(value):
+    """Flatten a Jira text field, which is a string on Server and an ADF document on Cloud."""
+    if not value:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        if value.get('type') == 'text':
+            return value.get('text', '')
+        return ' '.join(filter(None, (_jira_text(node) for node in value.get('content', []))))
+    if isinstance(value, list):
+        return ' '.join(filter(None, (_jira_text(node) for node in value)))
+    return str(value)
+
 class ActivityTrackingService:
     def __init__(self):
         self.tracker = ActivityTracker()
         self.correlator = None  # Will be initialized when needed with user_id
     
     def track_github_event(self, payload, user_id=None):
-        """Track an event from GitHub webhook."""
+        """Track an event from GitHub webhook.
+        
+        Returns False only when something that should be recorded couldn't
+        be written, so that a queued delivery is retried. Events of untracked
+        types or from senders without a user have nothing to record and
+        return True.
+        """
         try:
             # Extract GitHub event type from headers
             event_type = payload.get('event_type')  # This would be from headers in a real webhook
             
-            if not user_id and payload.get('sender', {}).get('login'):
-                # Try to find user by GitHub username
-                try:
-                    # This assumes GitHub username is stored in user.username
-                    user = User.objects.get(username=payload['sender']['login'])
-                    user_id = user.id
-                except User.DoesNotExist:
-                    logger.warning(f"No user found for GitHub username: {payload['sender']['login']}")
-                    return False
+            sender = payload.get('sender', {})
+            if not user_id and (sender.get('id') or sender.get('login')):
+                user_id = identity_resolver.resolve(
+                    'github',
+                    external_id=sender.get('id'),
+                    login=sender.get('login'),
+                    username_fallback=True
+                )
+                if not user_id:
+                    logger.warning(f"No user found for GitHub username: {sender.get('login')}")
             
-            if not user_id:
-                logger.error("No user ID provided for GitHub event")
+            # PR state follows every lifecycle action, including ones by unmapped senders (bots)
+            state_action = None
+            if event_type == 'pull_request' and payload.get('action') in PULL_REQUEST_STATE_ACTIONS:
+                state_action = payload.get('action')
+            elif event_type == 'pull_request_review' and payload.get('action') == 'submitted':
+                state_action = 'submitted'
+            if state_action and not self._record_pull_request(payload, state_action, user_id):
+                # The retried delivery applies the action again, which is idempotent
                 return False
             
+            if not user_id:
+                logger.warning("No user ID provided for GitHub event, not tracking it")
+                return True
+            
             # Process based on event type
             if event_type == 'push':
-                # Track commits
-                for commit in payload.get('commits', []):
-                    self.tracker.track_event(
-                        user_id=user_id,
-                        event_type='commit',
-                        title=commit.get('message', '').split('\n')[0],
-                        description=commit.get('message'),
-                        metadata={
-                            'commit_id': commit.get('id'),
-                            'repository': payload.get('repository', {}).get('name')
-                        },
-                        source_system='github',
-                        source_id=commit.get('id')
-                    )
-                return True
+                # Track all commits of the push in one write
+                repository = payload.get('repository', {}).get('name')
+                events = [{
+                    'event_type': 'commit',
+                    'title': (commit.get('message') or '').split('\n')[0],
+                    'description': commit.get('message'),
+                    'metadata': {
+                        'commit_id': commit.get('id'),
+                        'repository': repository
+                    },
+                    'source_system': 'github',
+                    'source_id': commit.get('id')
+                } for commit in payload.get('commits', [])]
+                
+                # Redelivered pushes hit the (source_system, event_type, source_id) key
+                return self.tracker.track_events_bulk(user_id, events, ignore_conflicts=True)
                 
             elif event_type == 'pull_request':
                 # Track PR events
                 pr = payload.get('pull_request', {})
                 action = payload.get('action')
                 
+                source_id = github_source_id(payload, pr.get('number'))
+                
                 if action == 'opened':
                     event_subtype = 'pr_create'
                 elif action == 'closed' and pr.get('merged'):
                     event_subtype = 'pr_merge'
                 elif action in ['review_requested', 'review_request_removed']:
                     event_subtype = 'pr_review_request'
-                elif action == 'submitted':
-                    event_subtype = 'pr_review'
+                    reviewer = payload.get('requested_reviewer', {}).get('login')
+                    source_id = github_source_id(payload, pr.get('number'), action, reviewer)
                 else:
                     # Other PR actions we don't track specifically
                     return True
                 
-                self.tracker.track_event(
+                return self.tracker.track_event(
                     user_id=user_id,
                     event_type=event_subtype,
                     title=pr.get('title'),
-                    description=pr.get('body'),
+                    description=pr.get('body') or '',
                     metadata={
                         'pr_number': pr.get('number'),
                         'repository': payload.get('repository', {}).get('name')
                     },
                     source_system='github',
-                    source_id=str(pr.get('number'))
+                    source_id=source_id,
+                    ignore_conflicts=True
+                )
+                
+            elif event_type == 'pull_request_review':
+                # Track submitted reviews; edits and dismissals aren't new reviews
+                if payload.get('action') != 'submitted':
+                    return True
+                
+                pr = payload.get('pull_request', {})
+                review = payload.get('review', {})
+                
+                return self.tracker.track_event(
+                    user_id=user_id,
+                    event_type='pr_review',
+                    title=pr.get('title'),
+                    description=review.get('body') or '',
+                    metadata={
+                        'pr_number': pr.get('number'),
+                        'repository': payload.get('repository', {}).get('name'),
+                        'review_state': review.get('state')
+                    },
+                    source_system='github',
+                    source_id=github_source_id(payload, pr.get('number'), 'review', review.get('id')),
+                    ignore_conflicts=True
                 )
-                return True
                 
             elif event_type == 'issues':
                 # Track issue events
                 issue = payload.get('issue', {})
                 action = payload.get('action')
                 
+                source_id = github_source_id(payload, issue.get('number'))
+                
                 if action == 'opened':
                     event_subtype = 'issue_create'
                 elif action == 'closed':
                     event_subtype = 'issue_close'
                 elif action == 'commented':
                     event_subtype = 'issue_comment'
+                    source_id = github_source_id(payload, issue.get('number'), 'comment', payload.get('comment', {}).get('id'))
                 else:
                     # Other issue actions we don't track specifically
                     return True
                 
-                self.tracker.track_event(
+                return self.tracker.track_event(
                     user_id=user_id,
                     event_type=event_subtype,
                     title=issue.get('title'),
-                    description=issue.get('body'),
+                    description=issue.get('body') or '',
                     metadata={
                         'issue_number': issue.get('number'),
                         'repository': payload.get('repository', {}).get('name')
                     },
                     source_system='github',
-                    source_id=str(issue.get('number'))
+                    source_id=source_id,
+                    ignore_conflicts=True
                 )
-                return True
                 
-            return False
+            # Other event types we don't track
+            return True
             
         except Exception as e:
             logger.error(f"Error tracking GitHub event: {e}")
             return False
     
+    def _record_pull_request(self, payload, action, sender_id):
+        """Update the PullRequestState row for a pull_request or pull_request_review webhook.
+        
+        Returns False if the row couldn't be written.
+        """
+        pr = payload.get('pull_request', {})
+        if not github_repository(payload) or not pr.get('number'):
+            return True  # Nothing to key a row on
+        
+        author = pr.get('user', {})
+        if action == 'submitted' and author.get('id') and payload.get('review', {}).get('user', {}).get('id') == author.get('id'):
+            return True  # The author replying in a review thread isn't a review
+        
+        if action == 'opened' and sender_id:
+            author_id = sender_id
+        elif author:
+            # Otherwise the sender is the reviewer or whoever closed it
+            author_id = identity_resolver.resolve(
+                'github',
+                external_id=author.get('id'),
+                login=author.get('login'),
+                username_fallback=True
+            )
+        else:
+            author_id = None
+        
+        if action == 'submitted':
+            acted_at = payload.get('review', {}).get('submitted_at')
+        elif action == 'closed':
+            acted_at = pr.get('closed_at')
+        else:
+            acted_at = None
+        
+        state = self.tracker.record_pull_request(
+            github_repository(payload),
+            pr.get('number'),
+            action,
+            author_id=author_id,
+            title=pr.get('title'),
+            opened_at=parse_datetime(pr['created_at']) if pr.get('created_at') else None,
+            acted_at=parse_datetime(acted_at) if acted_at else None,
+            merged=bool(pr.get('merged'))
+        )
+        return state is not None
+    
     def track_jira_event(self, payload, user_id=None):
-        """Track an event from Jira webhook."""
+        """Track an event from Jira webhook.
+        
+        Like ``track_github_event``, returns False only when an event that
+        should be recorded couldn't be written.
+        """
         try:
             event_type = payload.get('webhookEvent')
             
-            # Extract username from Jira event if user_id not provided
-            if not user_id and payload.get('user', {}).get('name'):
-                try:
-                    # This assumes Jira username is stored somewhere in user profile
-                    # In a real system, you'd need a mapping between Jira and local users
-                    user = User.objects.filter(
-                        username__icontains=payload['user']['name']
-                    ).first()
-                    
-                    if user:
-                        user_id = user.id
-                except Exception as e:
-                    logger.warning(f"Error finding user for Jira username: {e}")
+            # Resolve the Jira account (accountId on Cloud, name on Server) if user_id not provided
+            jira_user = payload.get('user', {})
+            if not user_id and (jira_user.get('accountId') or jira_user.get('name')):
+                user_id = identity_resolver.resolve(
+                    'jira',
+                    external_id=jira_user.get('accountId'),
+                    login=jira_user.get('name'),
+                    username_fallback=True
+                )
+                if not user_id:
+                    logger.warning(f"No user found for Jira account: {jira_user.get('accountId') or jira_user.get('name')}")
             
             if not user_id:
-                logger.error("No user ID provided for Jira event")
-                return False
+                logger.warning("No user ID provided for Jira event, not tracking it")
+                return True
             
             # Process based on event type
             if 'issue_created' in event_type:
                 issue = payload.get('issue', {})
                 
-                self.tracker.track_event(
+                return self.tracker.track_event(
                     user_id=user_id,
                     event_type='issue_create',
                     title=issue.get('fields', {}).get('summary', ''),
-                    description=issue.get('fields', {}).get('description', ''),
+                    description=_jira_text(issue.get('fields', {}).get('description')),
                     metadata={
                         'issue_key': issue.get('key'),
                         'project': issue.get('fields', {}).get('project', {}).get('key')
                     },
                     source_system='jira',
-                    source_id=issue.get('key', '')
+                    source_id=issue.get('key', ''),
+                    ignore_conflicts=True
                 )
-                return True
                 
             elif 'issue_updated' in event_type:
                 issue = payload.get('issue', {})
                 changelog = payload.get('changelog', {})
                 
-                # Track status changes separately
-                status_changes = [item for item in changelog.get('items', []) if item.get('field') == 'status']
-                if status_changes:
-                    for change in status_changes:
-                        self.tracker.track_event(
-                            user_id=user_id,
-                            event_type='issue_update',
-                            title=f"Status changed: {issue.get('key')}",
-                            description=f"Status changed from {change.get('fromString')} to {change.get('toString')}",
-                            metadata={
-                                'issue_key': issue.get('key'),
-                                'field_changed': 'status',
-                                'from': change.get('fromString'),
-                                'to': change.get('toString')
-                            },
-                            source_system='jira',
-                            source_id=issue.get('key', '')
-                        )
+                # Jira sends issue_updated for comments and for edits that leave a field
+                # unchanged; those carry nothing to track
+                items = [item for item in changelog.get('items', []) if not _is_noop_change(item)]
+                if not items:
+                    return True
+                
+                # Every issue_updated delivery shares the issue key, so the changelog id
+                # (or the delivery timestamp) makes each update its own source id
+                change_id = changelog.get('id') or payload.get('timestamp')
+                update_source_id = f"{issue.get('key', '')}:{change_id}" if change_id else ''
+                
+                # Track status changes separately, together with the update itself
+                status_changes = [item for item in items if item.get('field') == 'status']
+                events = [{
+                    'event_type': 'issue_update',
+                    'title': f"Status changed: {issue.get('key')}",
+                    'description': f"Status changed from {change.get('fromString')} to {change.get('toString')}",
+                    'metadata': {
+                        'issue_key': issue.get('key'),
+                        'field_changed': 'status',
+                        'from': change.get('fromString'),
+                        'to': change.get('toString')
+                    },
+                    'source_system': 'jira',
+                    'source_id': f"{update_source_id}:status:{i}" if update_source_id else ''
+                } for i, change in enumerate(status_changes)]
                 
                 # Track other significant updates
-                self.tracker.track_event(
-                    user_id=user_id,
-                    event_type='issue_update',
-                    title=f"Updated issue: {issue.get('key')}",
-                    description=f"Updated fields: {', '.join([item.get('field') for item in changelog.get('items', [])])}",
-                    metadata={
+                events.append({
+                    'event_type': 'issue_update',
+                    'title': f"Updated issue: {issue.get('key')}",
+                    'description': f"Updated fields: {', '.join([item.get('field') for item in items])}",
+                    'metadata': {
                         'issue_key': issue.get('key'),
-                        'fields_changed': [item.get('field') for item in changelog.get('items', [])]
+                        'fields_changed': [item.get('field') for item in items]
                     },
-                    source_system='jira',
-                    source_id=issue.get('key', '')
-                )
-                return True
+                    'source_system': 'jira',
+                    'source_id': update_source_id
+                })
+                
+                return self.tracker.track_events_bulk(user_id, events, ignore_conflicts=True)
                 
             elif 'comment_created' in event_type:
                 issue = payload.get('issue', {})
                 comment = payload.get('comment', {})
                 
-                self.tracker.track_event(
+                return self.tracker.track_event(
                     user_id=user_id,
                     event_type='issue_comment',
                     title=f"Comment on {issue.get('key')}",
-                    description=comment.get('body', '')[:200],
+                    description=_jira_text(comment.get('body'))[:200],
                     metadata={
                         'issue_key': issue.get('key'),
                         'comment_id': comment.get('id')
                     },
                     source_system='jira',
-                    source_id=comment.get('id', '')
+                    source_id=comment.get('id', ''),
+                    ignore_conflicts=True
                 )
-                return True
             
-            return False
+            # Other event types we don't track
+            return True
             
         except Exception as e:
             logger.error(f"Error tracking Jira event: {e}")
@@ -223,39 +382,23 @@ class ActivityTrackingService:
         try:
             event = payload.get('event', {})
             
-            if not event or event.get('type') != 'message' or event.get('bot_id'):
+            if not is_trackable_slack_message(event):
                 # Skip non-message events or bot messages
                 return False
             
-            # Extract username from Slack event if user_id not provided
+            # Resolve the Slack user if user_id not provided
             if not user_id and event.get('user'):
-                # In a real implementation, you'd have a mapping between Slack and local users
-                # For now, we'll just log a warning
-                logger.warning(f"No user mapping for Slack user ID: {event.get('user')}")
-                return False
+                user_id = identity_resolver.resolve('slack', external_id=event.get('user'))
+                if not user_id:
+                    logger.warning(f"No user mapping for Slack user ID: {event.get('user')}")
+                    return False
             
             if not user_id:
                 logger.error("No user ID provided for Slack event")
                 return False
             
-            # Get message text
-            text = event.get('text', '')
-            channel = event.get('channel', '')
-            
             # Track the message
-            self.tracker.track_event(
-                user_id=user_id,
-                event_type='slack_message',
-                title=f"Message in {channel}",
-                description=text[:200],
-                metadata={
-                    'channel': channel,
-                    'ts': event.get('ts'),
-                    'thread_ts': event.get('thread_ts')
-                },
-                source_system='slack',
-                source_id=event.get('ts', '')
-            )
+            self.tracker.track_event(user_id=user_id, ignore_conflicts=True, **self._slack_message_event(event))
             
             return True
             
@@ -263,24 +406,107 @@ class ActivityTrackingService:
             logger.error(f"Error tracking Slack message: {e}")
             return False
     
-    def get_correlated_activities(self, user_id, days=7):
-        """Get correlated activities for a user."""
+    def track_slack_messages_bulk(self, payloads):
+        """Track a batch of Slack message payloads, possibly from many users, in one INSERT.
+        
+        If the batch INSERT fails the messages are retried one by one, so a
+        bad row only fails itself. Returns the payloads that couldn't be written.
+        """
+        rows = []
+        for payload in payloads:
+            event = payload.get('event', {})
+            if not is_trackable_slack_message(event):
+                continue
+            
+            user_id = identity_resolver.resolve('slack', external_id=event.get('user'))
+            if not user_id:
+                logger.warning(f"No user mapping for Slack user ID: {event.get('user')}")
+                continue
+            
+            rows.append((payload, ActivityEvent(user_id=user_id, **self._slack_message_event(event))))
+        
+        if not rows:
+            return []
+        
+        try:
+            self._write_slack_rows([row for _, row in rows])
+            return []
+        except Exception as e:
+            logger.warning(f"Batch insert of {len(rows)} Slack messages failed ({e}), retrying individually")
+        
+        failed = []
+        for payload, row in rows:
+            try:
+                self._write_slack_rows([row])
+            except Exception as e:
+                logger.error(f"Failed to write Slack message {row.source_id} for user {row.user_id}: {e}")
+                failed.append(payload)
+        return failed
+    
+    def _write_slack_rows(self, rows):
+        with transaction.atomic():
+            ActivityEvent.objects.bulk_create(rows, ignore_conflicts=True)
+            record_references(rows)
+            record_workflow(rows)
+    
+    def _slack_message_event(self, event):
+        """Build the ActivityEvent fields for a Slack message event."""
+        # Get message text
+        text = event.get('text', '')
+        channel = event.get('channel', '')
+        
+        return {
+            'event_type': 'slack_message',
+            'title': f"Message in {channel}",
+            'description': text[:200],
+            'metadata': {
+                'channel': channel,
+                'ts': event.get('ts'),
+                'thread_ts': event.get('thread_ts')
+            },
+            'source_system': 'slack',
+            # ts is only unique within a channel
+            'source_id': f"{channel}:{event.get('ts')}" if event.get('ts') else ''
+        }
+    
+    def get_correlated_activities(self, user_id, days=7, fuzzy=False):
+        """Get correlated activities for a user, optionally with similarity-based issue suggestions."""
         try:
             if not self.correlator or self.correlator.user_id != user_id:
                 self.correlator = ActivityCorrelator(user_id=user_id)
             
-            return self.correlator.correlate_activities(days=days)
+            return self.correlator.correlate_activities(days=days, fuzzy=fuzzy)
             
         except Exception as e:
             logger.error(f"Error correlating activities: {e}")
             return {"error": str(e)}
     
-    def get_user_workflow(self, user_id, days=30):
-        """Get workflow patterns for a user."""
+    def get_activity_chains(self, user_id, event_id, max_hops=3, direction='outgoing'):
+        """Get the chains of linked activities leading from (or to) one event."""
         try:
             if not self.correlator or self.correlator.user_id != user_id:
                 self.correlator = ActivityCorrelator(user_id=user_id)
             
+            return self.correlator.trace_links(event_id, max_hops=max_hops, direction=direction)
+            
+        except Exception as e:
+            logger.error(f"Error tracing activity links: {e}")
+            return {"error": str(e)}
+    
+    def get_user_workflow(self, user_id, days=None):
+        """Get workflow patterns for a user.
+        
+        By default they are read from the workflow model kept up to date at
+        ingest, which also predicts the next action. Pass ``days`` to analyse
+        just that window of history instead.
+        """
+        try:
+            if days is None:
+                return get_workflow_model(user_id)
+            
+            if not self.correlator or self.correlator.user_id != user_id:
+                self.correlator = ActivityCorrelator(user_id=user_id)
+            
             return self.correlator.get_user_workflow_pattern(days=days)
             
         except Exception as e:
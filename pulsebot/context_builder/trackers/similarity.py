@@ -0,0 +1,103 @@
+"""MinHash signatures and locality-sensitive hashing for fuzzy text matching.
+
+Used to suggest Jira issues for commits and PRs that don't mention an issue
+key. Each text becomes a set of shingles, each set a short MinHash
+signature, and signatures are bucketed by band so a lookup only compares
+against the few documents that share a bucket instead of all of them.
+Hashing and bucketing are deterministic, so buckets can be stored (see
+``IssueBucket``) and compared across processes.
+"""
+import hashlib
+import random
+import re
+import zlib
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Issue keys, #numbers and links carry no topical signal and are handled exactly elsewhere
+_NOISE_PATTERN = re.compile(r'\b[A-Z][A-Z0-9_]*-\d+\b|#\d+|https?://\S+')
+
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it', 'of',
+    'on', 'or', 'that', 'the', 'this', 'to', 'was', 'when', 'with', 'wip', 'fix', 'fixes', 'fixed',
+    'add', 'adds', 'added', 'update', 'updates', 'updated', 'merge', 'pr', 'pull', 'request',
+))
+
+
+def shingles(text, size=4):
+    """Character ``size``-grams of each significant word, plus the words themselves."""
+    words = [
+        word for word in _TOKEN_PATTERN.findall(_NOISE_PATTERN.sub(' ', text or '').lower())
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+    result = set(words)
+    for word in words:
+        result.update(word[i:i + size] for i in range(len(word) - size + 1))
+    return result
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two shingle sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """Computes ``num_perm``-value MinHash signatures of shingle sets.
+
+    Word shingles and 4-grams repeat heavily across documents, so each
+    shingle's hash values are computed once per hasher and signatures are
+    just column-wise minimums over them.
+    """
+
+    def __init__(self, num_perm=72, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._hashes = {}
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return None
+        return tuple(map(min, zip(*(self._shingle_hashes(shingle) for shingle in shingle_set))))
+
+    def _shingle_hashes(self, shingle):
+        hashes = self._hashes.get(shingle)
+        if hashes is None:
+            value = zlib.crc32(shingle.encode('utf-8'))
+            hashes = self._hashes[shingle] = tuple(((a * value + b) % _PRIME) & _MAX_HASH for a, b in self._params)
+        return hashes
+
+
+class MinHashLSH:
+    """Banded LSH over MinHash signatures.
+
+    With ``bands`` bands of ``rows`` values (signatures need bands x rows
+    values), two documents with Jaccard similarity s share at least one
+    bucket with probability 1 - (1 - s^rows)^bands. The defaults (24 x 3)
+    find pairs at s=0.5 96% of the time and at s=0.4 79%, while unrelated
+    pairs (s=0.1) become candidates 2% of the time.
+    """
+
+    def __init__(self, bands=24, rows=3):
+        self.bands = bands
+        self.rows = rows
+
+    def buckets(self, signature):
+        """The signature's bucket in each band, as signed 64-bit ids unique across bands."""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(
+                    repr((band, signature[band * self.rows:(band + 1) * self.rows])).encode('ascii'),
+                    digest_size=8
+                ).digest(),
+                'big',
+                signed=True
+            )
+            for band in range(self.bands)
+        ]
@@ -0,0 +1,253 @@
+"""Team-wide workflow analytics over many users and a long window.
+
+Event columns are loaded once for the whole team, with event types and
+source systems as small integer codes and times as epoch seconds. With
+NumPy installed the transition matrix, weekday x hour heatmap and
+inter-event latency distribution are computed with vectorized ops over
+those columns; without it the same figures come from plain loops, which
+is also what the NumPy path is checked against.
+"""
+import bisect
+import logging
+import math
+from datetime import timedelta
+from django.db.models import FloatField, Func
+from django.utils import timezone
+from core.models import TeamMember
+from .models import ActivityEvent
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional accelerator
+    np = None
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Same rule as ActivityCorrelator.get_user_workflow_pattern
+TRANSITION_WINDOW_SECONDS = 24 * 3600
+
+# Latency histogram buckets and their (exclusive) upper bounds, in seconds
+LATENCY_BUCKETS = [
+    ('<5m', 5 * 60),
+    ('5-15m', 15 * 60),
+    ('15m-1h', 3600),
+    ('1-4h', 4 * 3600),
+    ('4-24h', 24 * 3600),
+    ('>24h', None),
+]
+LATENCY_EDGES = [bound for _, bound in LATENCY_BUCKETS if bound is not None]
+LATENCY_PERCENTILES = (50, 90, 99)
+
+SECONDS_PER_DAY = 24 * 3600
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+class EpochSeconds(Func):
+    """Seconds since the epoch of a datetime column, computed by the database.
+
+    Building a datetime object per row is most of the cost of loading a
+    large window, and only the number is needed here.
+    """
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Millisecond resolution, which is what SQLite's date functions keep
+        return self.as_sql(compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+def team_workflow_analytics(team_id, days=90, use_numpy=None):
+    """Transition matrix, activity heatmap and latency distribution for a team's last ``days``.
+
+    Transitions and latencies are between consecutive events of the same
+    user; transitions only count within 24 hours, as in the per-user
+    workflow patterns. Hours are UTC. ``use_numpy=False`` forces the
+    pure-Python path.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    user_ids = list(TeamMember.objects.filter(team_id=team_id).values_list('user_id', flat=True))
+    columns = load_event_columns(user_ids, days)
+
+    analyze = _analyze_numpy if use_numpy else _analyze_python
+    result = analyze(columns)
+
+    return {
+        "team_id": team_id,
+        "period_days": days,
+        "member_count": len(user_ids),
+        "activities_count": len(columns['timestamps']),
+        **result
+    }
+
+
+def load_event_columns(user_ids, days):
+    """A window of the users' events as parallel lists, ordered by user and time."""
+    columns = {
+        'event_types': [],
+        'source_systems': [],
+        'users': [],
+        'type_codes': [],
+        'source_codes': [],
+        'timestamps': [],
+    }
+    type_codes = {}
+    source_codes = {}
+
+    for user_id, event_type, source_system, timestamp in ActivityEvent.objects.filter(
+        user_id__in=user_ids,
+        created_at__gte=timezone.now() - timedelta(days=days)
+    ).order_by('user_id', 'created_at', 'id').annotate(
+        timestamp=EpochSeconds('created_at')
+    ).values_list('user_id', 'event_type', 'source_system', 'timestamp').iterator(chunk_size=5000):
+        if event_type not in type_codes:
+            type_codes[event_type] = len(columns['event_types'])
+            columns['event_types'].append(event_type)
+        if source_system not in source_codes:
+            source_codes[source_system] = len(columns['source_systems'])
+            columns['source_systems'].append(source_system)
+
+        columns['users'].append(user_id)
+        columns['type_codes'].append(type_codes[event_type])
+        columns['source_codes'].append(source_codes[source_system])
+        columns['timestamps'].append(timestamp)
+
+    return columns
+
+
+def _analyze_numpy(columns):
+    event_types = columns['event_types']
+    size = len(event_types)
+
+    users = np.asarray(columns['users'], dtype=np.int64)
+    types = np.asarray(columns['type_codes'], dtype=np.int64)
+    sources = np.asarray(columns['source_codes'], dtype=np.int64)
+    timestamps = np.asarray(columns['timestamps'], dtype=np.float64)
+
+    # Consecutive pairs of the same user
+    same_user = users[1:] == users[:-1]
+    gaps = timestamps[1:] - timestamps[:-1]
+    latencies = gaps[same_user]
+
+    within_window = same_user & (gaps <= TRANSITION_WINDOW_SECONDS)
+    transitions = np.bincount(
+        types[:-1][within_window] * size + types[1:][within_window],
+        minlength=size * size
+    ).reshape(size, size)
+
+    seconds = timestamps.astype(np.int64)
+    weekdays = (seconds // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7
+    hours = (seconds % SECONDS_PER_DAY) // 3600
+    heatmap = np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+
+    buckets = np.bincount(np.searchsorted(LATENCY_EDGES, latencies, side='right'), minlength=len(LATENCY_BUCKETS))
+    percentiles = np.percentile(latencies / 3600, LATENCY_PERCENTILES) if len(latencies) else []
+
+    member_ids, member_counts = np.unique(users, return_counts=True)
+
+    return _result(
+        columns,
+        source_counts=np.bincount(sources, minlength=len(columns['source_systems'])).tolist(),
+        transitions=transitions.tolist(),
+        heatmap=heatmap.tolist(),
+        latency_count=int(len(latencies)),
+        buckets=buckets.tolist(),
+        percentiles=[float(p) for p in percentiles],
+        members=list(zip(member_ids.tolist(), member_counts.tolist()))
+    )
+
+
+def _analyze_python(columns):
+    event_types = columns['event_types']
+    users = columns['users']
+    types = columns['type_codes']
+    timestamps = columns['timestamps']
+
+    transitions = [[0] * len(event_types) for _ in event_types]
+    heatmap = [[0] * 24 for _ in WEEKDAYS]
+    buckets = [0] * len(LATENCY_BUCKETS)
+    source_counts = [0] * len(columns['source_systems'])
+    member_counts = {}
+    latencies = []
+
+    for i, timestamp in enumerate(timestamps):
+        if i and users[i] == users[i - 1]:
+            gap = timestamp - timestamps[i - 1]
+            latencies.append(gap / 3600)
+            buckets[bisect.bisect_right(LATENCY_EDGES, gap)] += 1
+            if gap <= TRANSITION_WINDOW_SECONDS:
+                transitions[types[i - 1]][types[i]] += 1
+
+        seconds = int(timestamp)
+        heatmap[(seconds // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7][(seconds % SECONDS_PER_DAY) // 3600] += 1
+        source_counts[columns['source_codes'][i]] += 1
+        member_counts[users[i]] = member_counts.get(users[i], 0) + 1
+
+    latencies.sort()
+
+    return _result(
+        columns,
+        source_counts=source_counts,
+        transitions=transitions,
+        heatmap=heatmap,
+        latency_count=len(latencies),
+        buckets=buckets,
+        percentiles=[_percentile(latencies, q) for q in LATENCY_PERCENTILES] if latencies else [],
+        members=sorted(member_counts.items())
+    )
+
+
+def _percentile(ordered, q):
+    """Linear-interpolation percentile of sorted values, computed as ``numpy.percentile`` does."""
+    position = (len(ordered) - 1) * (q / 100)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    fraction = position - lower
+
+    low, high = ordered[lower], ordered[upper]
+    if fraction >= 0.5:
+        return high - (high - low) * (1 - fraction)
+    return low + (high - low) * fraction
+
+
+def _result(columns, source_counts, transitions, heatmap, latency_count, buckets, percentiles, members):
+    """The response payload, shared by both paths so they can only differ in the numbers."""
+    probabilities = []
+    for row in transitions:
+        total = sum(row)
+        probabilities.append([round(count / total, 3) if total else 0 for count in row])
+
+    return {
+        "active_members": len(members),
+        "source_systems": dict(zip(columns['source_systems'], source_counts)),
+        "transitions": {
+            "event_types": columns['event_types'],
+            "total": sum(sum(row) for row in transitions),
+            "counts": transitions,
+            "probabilities": probabilities
+        },
+        "heatmap": {
+            "weekdays": WEEKDAYS,
+            "hours": list(range(24)),
+            "counts": heatmap
+        },
+        "latency": {
+            "count": latency_count,
+            "percentiles_hours": {f"p{q}": round(p, 2) for q, p in zip(LATENCY_PERCENTILES, percentiles)},
+            "histogram": [
+                {"bucket": label, "count": count}
+                for (label, _), count in zip(LATENCY_BUCKETS, buckets)
+            ]
+        },
+        "members": [
+            {"user_id": user_id, "activities_count": count}
+            for user_id, count in sorted(members, key=lambda member: (-member[1], member[0]))
+        ]
+    }
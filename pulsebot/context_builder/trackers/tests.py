@@ -0,0 +1,327 @@
+import random
+from datetime import timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.credentials import credential_cache
+from core.models import ExternalIdentity, IntegrationCredential
+from .correlation import ActivityCorrelator
+from .identity import IdentityResolver, identity_resolver
+from .links import mentions_pull_request
+from .models import ActivityEvent, IssueBucket, PullRequestState
+from .references import record_references
+from .services import ActivityTrackingService
+from .similarity import MinHashLSH
+from .workflow import get_workflow_model, record_workflow
+
+
+def seed_activity(user, size, days=7, seed=42):
+    """A window of commits, PRs, Jira updates and Slack messages that share issue keys and PR numbers."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    window = days * 24 * 3600 - 60
+
+    keys = [f"PROJ-{i}" for i in range(1, max(size // 10, 2))]
+    pr_numbers = range(1, max(size // 50, 2))
+
+    events = []
+    for i in range(size):
+        key = rng.choice(keys)
+        roll = rng.random()
+        if roll < 0.35:
+            fields = {'event_type': 'commit', 'source_system': 'github', 'title': f"{key} Fix thing {i}"}
+        elif roll < 0.5:
+            fields = {
+                'event_type': rng.choice(['pr_create', 'pr_review', 'pr_merge']),
+                'source_system': 'github',
+                'title': f"{key} Feature {i}",
+                'metadata': {'pr_number': rng.choice(pr_numbers)},
+            }
+        elif roll < 0.75:
+            fields = {
+                'event_type': 'issue_update',
+                'source_system': 'jira',
+                'title': f"Updated issue: {key}",
+                'metadata': {'issue_key': key},
+            }
+        else:
+            fields = {
+                'event_type': 'slack_message',
+                'source_system': 'slack',
+                'title': "Message in C123",
+                'description': rng.choice([
+                    f"Looking at {key} today",
+                    f"PR #{rng.choice(pr_numbers)} is ready for review",
+                    "Lunch?",
+                ]),
+            }
+        events.append(ActivityEvent(
+            user=user,
+            source_id=f"test-{user.id}-{i}",
+            created_at=now - timedelta(seconds=rng.randint(0, window)),
+            **fields
+        ))
+
+    ActivityEvent.objects.bulk_create(events)
+    # Same path as ingest: references, then the links they imply
+    record_references(events)
+    return events
+
+
+# Compare computed results, not cache hits
+@override_settings(CORRELATION_CACHE_TTL=0)
+class CorrelationEngineParityTest(TestCase):
+    """The in-memory engine and the ActivityLink engine give identical correlations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='parity')
+        seed_activity(cls.user, 600)
+
+    def assertEnginesAgree(self, **kwargs):
+        correlator = ActivityCorrelator(user_id=self.user.id)
+        links = correlator.correlate_activities(engine='links', **kwargs)
+        memory = correlator.correlate_activities(engine='memory', **kwargs)
+        self.assertGreater(links['summary']['correlation_count'], 0)
+        self.assertEqual(memory, links)
+
+    def test_engines_agree(self):
+        self.assertEnginesAgree(days=7)
+
+    def test_engines_agree_on_a_narrower_window(self):
+        self.assertEnginesAgree(days=2)
+
+    def test_engines_agree_after_more_events_are_tracked(self):
+        events = [
+            ActivityEvent(user=self.user, event_type='commit', source_system='github',
+                          title="PROJ-3 Follow-up", source_id='test-follow-up-commit'),
+            ActivityEvent(user=self.user, event_type='slack_message', source_system='slack',
+                          title="Message in C123", description="PROJ-3 and PR #1 are done",
+                          source_id='test-follow-up-message'),
+        ]
+        ActivityEvent.objects.bulk_create(events)
+        record_references(events)
+        self.assertEnginesAgree(days=7)
+
+
+@override_settings(CORRELATION_CACHE_TTL=0)
+class CredentialQueryTest(TestCase):
+    """Correlation and workflow analysis only read tracked events, never integration credentials."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='credentials')
+        seed_activity(cls.user, 200)
+        # With credentials present, an eagerly built connector would read them
+        for integration_type in ('github', 'jira'):
+            IntegrationCredential.objects.create(user=cls.user, integration_type=integration_type, access_token='token')
+
+    def credential_queries(self, context):
+        table = IntegrationCredential._meta.db_table
+        return [query['sql'] for query in context.captured_queries if table in query['sql']]
+
+    def test_correlate_activities_reads_no_credentials(self):
+        for engine in ('links', 'memory'):
+            with self.subTest(engine=engine), CaptureQueriesContext(connection) as context:
+                result = ActivityCorrelator(user_id=self.user.id).correlate_activities(days=7, engine=engine)
+            self.assertGreater(result['summary']['correlation_count'], 0)
+            self.assertEqual(self.credential_queries(context), [])
+
+    def test_workflow_pattern_reads_no_credentials(self):
+        with CaptureQueriesContext(connection) as context:
+            result = ActivityCorrelator(user_id=self.user.id).get_user_workflow_pattern(days=30)
+        self.assertNotIn('error', result)
+        self.assertEqual(self.credential_queries(context), [])
+
+    def test_connectors_read_credentials_once_per_request(self):
+        with CaptureQueriesContext(connection) as context, credential_cache():
+            for _ in range(3):
+                correlator = ActivityCorrelator(user_id=self.user.id)
+                correlator.github, correlator.jira
+        self.assertEqual(len(self.credential_queries(context)), 2)
+
+
+class IssueSuggestionTest(TestCase):
+    """Similarity suggestions come from the IssueBucket index maintained at ingest."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='suggestions')
+        cls.outsider = User.objects.create(username='outsider')
+        now = timezone.now()
+
+        issues = [
+            ActivityEvent(user=cls.user, event_type='issue_create', source_system='jira', source_id='PAY-1',
+                          title="Retry failed stripe payment webhooks", description="Webhook deliveries time out",
+                          metadata={'issue_key': 'PAY-1'}, created_at=now - timedelta(days=30)),
+            ActivityEvent(user=cls.user, event_type='issue_create', source_system='jira', source_id='OLD-1',
+                          title="Rotate oauth refresh tokens nightly", description="Tokens expire",
+                          metadata={'issue_key': 'OLD-1'}, created_at=now - timedelta(days=400)),
+            ActivityEvent(user=cls.outsider, event_type='issue_create', source_system='jira', source_id='CSV-1',
+                          title="Export csv report with timezone", description="Dates shift on export",
+                          metadata={'issue_key': 'CSV-1'}, created_at=now - timedelta(days=30)),
+        ]
+        commits = [
+            ActivityEvent(user=cls.user, event_type='commit', source_system='github', source_id=f'suggest-{i}',
+                          title=title, created_at=now - timedelta(days=1))
+            for i, title in enumerate([
+                "Retry stripe payment webhooks that failed",
+                "Rotate oauth refresh tokens",
+                "Export csv report in user timezone",
+            ])
+        ]
+        ActivityEvent.objects.bulk_create(issues + commits)
+        record_references(issues + commits)
+
+    def suggested_keys(self):
+        suggestions = ActivityCorrelator(user_id=self.user.id).suggest_issue_links(days=7)
+        return {suggestion['commit']['title']: [issue['key'] for issue in suggestion['issues']] for suggestion in suggestions}
+
+    def test_suggests_similar_issues_within_history_and_team(self):
+        # OLD-1 is older than history_days, CSV-1 belongs to someone outside the user's teams
+        self.assertEqual(self.suggested_keys(), {"Retry stripe payment webhooks that failed": ['PAY-1']})
+
+    def test_reads_the_index(self):
+        self.assertEqual(IssueBucket.objects.filter(event__source_id='PAY-1').count(), MinHashLSH().bands)
+        IssueBucket.objects.all().delete()
+        self.assertEqual(self.suggested_keys(), {})
+
+
+class SlackBulkWriteTest(TestCase):
+    """A Slack message that can't be written fails on its own, not with the rest of its batch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='slacker')
+        identity_resolver.register(cls.user, 'slack', 'U123')
+
+    def payload(self, ts):
+        return {'event_id': f'Ev{ts}', 'event': {'type': 'message', 'user': 'U123', 'channel': 'C1', 'ts': ts, 'text': "PROJ-1 done"}}
+
+    def test_bad_row_fails_alone(self):
+        payloads = [self.payload(ts) for ts in ('1.0', '2.0', '3.0')]
+
+        def fail_on_poisoned_row(rows):
+            if any(row.source_id == 'C1:2.0' for row in rows):
+                raise ValueError("poisoned row")
+            return record_references(rows)
+
+        with mock.patch('context_builder.trackers.services.record_references', side_effect=fail_on_poisoned_row):
+            failed = ActivityTrackingService().track_slack_messages_bulk(payloads)
+
+        self.assertEqual(failed, [payloads[1]])
+        self.assertEqual(
+            sorted(ActivityEvent.objects.filter(user=self.user).values_list('source_id', flat=True)),
+            ['C1:1.0', 'C1:3.0']
+        )
+
+
+class PullRequestReviewTest(TestCase):
+    """Only reviews by someone other than the author take a PR off the waiting-for-review list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        ActivityTrackingService().track_github_event(cls.payload('pull_request', 'opened'), user_id=cls.author.id)
+
+    @staticmethod
+    def payload(event_type, action, reviewer_id=None):
+        payload = {
+            'event_type': event_type,
+            'action': action,
+            'repository': {'name': 'api', 'full_name': 'acme/api'},
+            'pull_request': {'number': 7, 'title': "Add retries", 'user': {'id': 1, 'login': 'author'},
+                             'created_at': '2026-10-01T09:00:00Z'},
+        }
+        if reviewer_id:
+            payload['review'] = {'id': reviewer_id * 100, 'state': 'commented', 'user': {'id': reviewer_id},
+                                 'submitted_at': '2026-10-02T09:00:00Z'}
+        return payload
+
+    def first_review_at(self):
+        return PullRequestState.objects.get(repository='acme/api', number=7).first_review_at
+
+    def test_author_review_comment_is_ignored(self):
+        self.assertTrue(ActivityTrackingService().track_github_event(self.payload('pull_request_review', 'submitted', reviewer_id=1)))
+        self.assertIsNone(self.first_review_at())
+
+    def test_review_by_someone_else_counts(self):
+        self.assertTrue(ActivityTrackingService().track_github_event(self.payload('pull_request_review', 'submitted', reviewer_id=2)))
+        self.assertIsNotNone(self.first_review_at())
+
+
+class PullRequestMentionTest(SimpleTestCase):
+
+    def test_whole_words_only(self):
+        for text in ("Please approve the project", "print the improved report", "Lunch?", ""):
+            with self.subTest(text=text):
+                self.assertFalse(mentions_pull_request(text))
+
+    def test_pr_mentions(self):
+        for text in ("PR is ready", "see the pull request", "merged #12", "Can someone review my pr?"):
+            with self.subTest(text=text):
+                self.assertTrue(mentions_pull_request(text))
+
+
+class PeakHoursTest(TestCase):
+    """The stored workflow model and the windowed analysis break peak-hour ties the same way."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='peaks')
+        day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=3)
+        # Two events each at 15:00 and 09:00 UTC; 15:00 is seen first
+        times = [day + timedelta(hours=15), day + timedelta(hours=15, minutes=30),
+                 day + timedelta(days=1, hours=9), day + timedelta(days=1, hours=9, minutes=30)]
+        events = [
+            ActivityEvent(user=cls.user, event_type='commit', source_system='github', title="Work",
+                          source_id=f'peak-{i}', created_at=created_at.astimezone(dt_timezone.utc))
+            for i, created_at in enumerate(times)
+        ]
+        ActivityEvent.objects.bulk_create(events)
+        record_workflow(events)
+
+    def peak_hours(self, result):
+        return next(insight['data']['peak_hours'] for insight in result['patterns']['insights'] if insight['type'] == 'peak_hours')
+
+    def test_ties_go_to_the_hour_seen_first(self):
+        windowed = ActivityCorrelator(user_id=self.user.id).get_user_workflow_pattern(days=30)
+        self.assertEqual(self.peak_hours(windowed), [15, 9])
+        self.assertEqual(self.peak_hours(get_workflow_model(self.user.id)), [15, 9])
+
+
+class IdentityResolverTest(TestCase):
+    """Stable external ids win; mutable logins never pick an arbitrary user."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice')
+        cls.bob = User.objects.create(username='bob')
+        cls.carol = User.objects.create(username='carol')
+        ExternalIdentity.objects.create(user=cls.alice, provider='github', external_id='1', login='alice')
+        # Two accounts that went by the same login at different times
+        ExternalIdentity.objects.create(user=cls.bob, provider='github', external_id='2', login='shared')
+        ExternalIdentity.objects.create(user=cls.carol, provider='github', external_id='3', login='shared')
+
+    def setUp(self):
+        cache.clear()
+        self.resolver = IdentityResolver()
+
+    def test_external_id_wins_over_login(self):
+        self.assertEqual(self.resolver.resolve('github', external_id='3', login='alice', username_fallback=True), self.carol.id)
+
+    def test_reused_login_of_another_account_is_not_resolved(self):
+        # Account 9 now goes by alice, a login still recorded for account 1 (and a local username)
+        self.assertIsNone(self.resolver.resolve('github', external_id='9', login='alice', username_fallback=True))
+
+    def test_ambiguous_login_is_not_resolved(self):
+        self.assertIsNone(self.resolver.resolve('github', login='shared', username_fallback=True))
+        self.assertEqual(self.resolver.resolve('github', login='alice'), self.alice.id)
+
+    def test_unclaimed_login_falls_back_to_username(self):
+        self.assertEqual(self.resolver.resolve('github', external_id='9', login='bob', username_fallback=True), self.bob.id)
+        self.assertIsNone(self.resolver.resolve('github', external_id='10', login='bob'))
@@ -0,0 +1,339 @@
+import logging
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import ActivityEvent, WorkflowSequence, WorkflowState, WorkflowTransition
+
+logger = logging.getLogger(__name__)
+
+# Sequences of 2 to 5 event types are counted, so the state keeps the last 4 as context
+SEQUENCE_LENGTHS = range(2, 6)
+CONTEXT_SIZE = SEQUENCE_LENGTHS[-1] - 1
+SEPARATOR = ' -> '
+
+# Same rule as ActivityCorrelator.get_user_workflow_pattern
+TRANSITION_WINDOW_HOURS = 24
+
+# A context seen fewer times than this is too thin to predict from
+MIN_PREDICTION_SUPPORT = 3
+
+# Keep the IN lists below SQLite's bound-variable limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def record_workflow(events):
+    """Fold freshly written events into their users' workflow models.
+
+    Each event costs a constant amount of work whatever the user's history:
+    one transition and at most four sequence counters are incremented. Rows
+    skipped by ``ignore_conflicts`` (webhook redeliveries) are recognised by
+    their stored ``created_at`` and not counted twice.
+    """
+    by_user = defaultdict(list)
+    for event in _inserted(events):
+        by_user[event.user_id].append((event.created_at, event.event_type, event.source_system))
+    if not by_user:
+        return 0
+
+    with transaction.atomic():
+        WorkflowState.objects.bulk_create([WorkflowState(user_id=user_id) for user_id in by_user], ignore_conflicts=True)
+        # Serialises concurrent updates of the same user's counters
+        states = list(WorkflowState.objects.select_for_update().filter(user_id__in=list(by_user)))
+
+        counters = _Counters()
+        for state in states:
+            for created_at, event_type, source_system in sorted(by_user[state.user_id]):
+                _advance(state, created_at, event_type, source_system, counters)
+
+        counters.save()
+        _save_states(states)
+
+    return sum(len(rows) for rows in by_user.values())
+
+
+def rebuild_workflow(user_id):
+    """Recompute a user's workflow model from their whole history, e.g. for events tracked before it existed."""
+    with transaction.atomic():
+        WorkflowTransition.objects.filter(user_id=user_id).delete()
+        WorkflowSequence.objects.filter(user_id=user_id).delete()
+        WorkflowState.objects.filter(user_id=user_id).delete()
+
+        state = WorkflowState(user_id=user_id)
+        counters = _Counters()
+        for created_at, event_type, source_system in ActivityEvent.objects.filter(
+            user_id=user_id
+        ).order_by('created_at', 'id').values_list('created_at', 'event_type', 'source_system').iterator():
+            _advance(state, created_at, event_type, source_system, counters)
+
+        counters.save()
+        state.save()
+
+    return state.event_count
+
+
+def get_workflow_model(user_id, limit=5):
+    """A user's workflow patterns as kept by the model, in the shape of ``get_user_workflow_pattern``.
+
+    Covers everything tracked since the model was (re)built rather than a
+    window, and adds the likely next actions. A handful of indexed reads.
+    """
+    state = WorkflowState.objects.filter(user_id=user_id).first()
+    if not state or not state.event_count:
+        return {
+            "user_id": user_id,
+            "message": "No activities have been tracked for this user yet",
+            "patterns": []
+        }
+
+    transitions = WorkflowTransition.objects.filter(user_id=user_id)
+    result = {
+        "user_id": user_id,
+        "activities_count": state.event_count,
+        "activity_types": state.event_types,
+        "transitions_count": transitions.aggregate(total=Sum('count'))['total'] or 0,
+        "last_activity_at": state.last_event_at,
+        "patterns": []
+    }
+    if not result["transitions_count"]:
+        return result
+
+    # Ties go to the hour seen first, as in ActivityCorrelator.get_user_workflow_pattern
+    first_seen = state.hour_first_seen or [None] * 24
+    peak_hours = sorted(
+        (hour for hour, count in enumerate(state.hour_counts) if count),
+        key=lambda hour: (-state.hour_counts[hour], first_seen[hour] is None, first_seen[hour] or '', hour)
+    )[:3]
+    insights = [
+        {
+            "type": "peak_hours",
+            "description": f"Most active hours: {', '.join([f'{h}:00' for h in peak_hours])}",
+            "data": {
+                "peak_hours": peak_hours,
+                "counts": [state.hour_counts[h] for h in peak_hours]
+            }
+        }
+    ]
+
+    common_sequences = [
+        {"sequence": sequence.sequence, "count": sequence.count}
+        for sequence in WorkflowSequence.objects.filter(user_id=user_id, length=3).order_by('-count', 'id')[:3]
+    ]
+    if common_sequences:
+        insights.append({
+            "type": "common_sequences",
+            "description": "Common activity sequences detected",
+            "data": common_sequences
+        })
+
+    next_actions = predict_next_action(user_id, state=state)
+    if next_actions:
+        insights.append({
+            "type": "next_action",
+            "description": f"Usually followed by: {', '.join(p['event_type'] for p in next_actions)}",
+            "data": next_actions
+        })
+
+    result["patterns"] = {
+        "transitions": [{
+            "count": t.count,
+            "avg_time": t.avg_time,
+            "from_type": t.from_type,
+            "to_type": t.to_type,
+            "from_system": t.from_system,
+            "to_system": t.to_system
+        } for t in transitions.order_by('-count', 'id')[:limit]],
+        "insights": insights
+    }
+    return result
+
+
+def predict_next_action(user_id, limit=3, state=None):
+    """The event types most likely to come next for a user, with their probabilities.
+
+    Uses the longest run of recent activities (up to four) that has been
+    followed by something at least ``MIN_PREDICTION_SUPPORT`` times, backing
+    off to shorter runs, i.e. a variable-order Markov model.
+    """
+    if state is None:
+        state = WorkflowState.objects.filter(user_id=user_id).first()
+    if not state or not state.recent:
+        return []
+
+    types = [event_type for event_type, _ in state.recent]
+    for size in range(len(types), 0, -1):
+        context = SEPARATOR.join(types[-size:])
+        followers = sorted(WorkflowSequence.objects.filter(
+            user_id=user_id,
+            context=context
+        ).values_list('next_type', 'count'), key=lambda row: row[1], reverse=True)
+
+        support = sum(count for _, count in followers)
+        if support >= MIN_PREDICTION_SUPPORT:
+            return [{
+                "event_type": next_type,
+                "probability": round(count / support, 2),
+                "context": context,
+                "support": support
+            } for next_type, count in followers[:limit]]
+
+    return []
+
+
+class _Counters:
+    """Transition and sequence increments gathered in memory, then written in a few queries."""
+
+    def __init__(self):
+        self.transitions = defaultdict(lambda: [0, 0.0])  # count, hours
+        self.sequences = defaultdict(lambda: [0, 0])  # length, count
+
+    def save(self):
+        self._save_transitions()
+        self._save_sequences()
+
+    def _save_transitions(self):
+        if not self.transitions:
+            return
+
+        # A user's matrix is bounded by the event types squared, so read it whole
+        existing = {
+            tuple(key): pk
+            for pk, *key in WorkflowTransition.objects.filter(
+                user_id__in={key[0] for key in self.transitions}
+            ).values_list('id', 'user_id', 'from_type', 'from_system', 'to_type', 'to_system')
+        }
+
+        created = []
+        for key, (count, hours) in self.transitions.items():
+            if key in existing:
+                WorkflowTransition.objects.filter(pk=existing[key]).update(
+                    count=F('count') + count,
+                    total_hours=F('total_hours') + hours
+                )
+            else:
+                user_id, from_type, from_system, to_type, to_system = key
+                created.append(WorkflowTransition(
+                    user_id=user_id,
+                    from_type=from_type,
+                    from_system=from_system,
+                    to_type=to_type,
+                    to_system=to_system,
+                    count=count,
+                    total_hours=hours
+                ))
+
+        WorkflowTransition.objects.bulk_create(created, batch_size=500)
+
+    def _save_sequences(self):
+        if not self.sequences:
+            return
+
+        contexts = defaultdict(set)
+        for user_id, context, _ in self.sequences:
+            contexts[user_id].add(context)
+
+        existing = {}
+        for user_id, user_contexts in contexts.items():
+            user_contexts = sorted(user_contexts)
+            for start in range(0, len(user_contexts), LOOKUP_CHUNK_SIZE):
+                for pk, context, next_type in WorkflowSequence.objects.filter(
+                    user_id=user_id,
+                    context__in=user_contexts[start:start + LOOKUP_CHUNK_SIZE]
+                ).values_list('id', 'context', 'next_type'):
+                    existing[(user_id, context, next_type)] = pk
+
+        # Most counters in a batch go up by the same small amount, so one UPDATE per amount
+        increments = defaultdict(list)
+        created = []
+        for key, (length, count) in self.sequences.items():
+            if key in existing:
+                increments[count].append(existing[key])
+            else:
+                user_id, context, next_type = key
+                created.append(WorkflowSequence(
+                    user_id=user_id,
+                    context=context,
+                    next_type=next_type,
+                    length=length,
+                    count=count
+                ))
+
+        for count, pks in increments.items():
+            for start in range(0, len(pks), LOOKUP_CHUNK_SIZE):
+                WorkflowSequence.objects.filter(pk__in=pks[start:start + LOOKUP_CHUNK_SIZE]).update(count=F('count') + count)
+        WorkflowSequence.objects.bulk_create(created, batch_size=500)
+
+
+def _advance(state, created_at, event_type, source_system, counters):
+    """Count one event against a user's state and move the state past it."""
+    recent = state.recent
+
+    if recent and state.last_event_at:
+        # Events flushed slightly out of order count as immediate
+        hours = max((created_at - state.last_event_at).total_seconds() / 3600, 0)
+        if hours <= TRANSITION_WINDOW_HOURS:
+            from_type, from_system = recent[-1]
+            transition = counters.transitions[(state.user_id, from_type, from_system, event_type, source_system)]
+            transition[0] += 1
+            transition[1] += hours
+
+    types = [recent_type for recent_type, _ in recent]
+    for length in SEQUENCE_LENGTHS:
+        if len(types) < length - 1:
+            break
+        sequence = counters.sequences[(state.user_id, SEPARATOR.join(types[len(types) - length + 1:]), event_type)]
+        sequence[0] = length
+        sequence[1] += 1
+
+    state.recent = (recent + [[event_type, source_system]])[-CONTEXT_SIZE:]
+    state.last_event_at = max(state.last_event_at, created_at) if state.last_event_at else created_at
+    state.event_count += 1
+    if event_type not in state.event_types:
+        state.event_types = state.event_types + [event_type]
+
+    created_at_utc = created_at.astimezone(dt_timezone.utc)
+    hour_counts = state.hour_counts or [0] * 24
+    hour_counts[created_at_utc.hour] += 1
+    state.hour_counts = hour_counts
+
+    # Fixed-width UTC timestamps compare like the datetimes they encode
+    seen = created_at_utc.isoformat(timespec='microseconds')
+    hour_first_seen = state.hour_first_seen or [None] * 24
+    if hour_first_seen[created_at_utc.hour] is None or seen < hour_first_seen[created_at_utc.hour]:
+        hour_first_seen[created_at_utc.hour] = seen
+    state.hour_first_seen = hour_first_seen
+
+
+def _save_states(states):
+    now = timezone.now()
+    for state in states:
+        state.updated_at = now
+    WorkflowState.objects.bulk_update(
+        states, ['recent', 'last_event_at', 'event_count', 'event_types', 'hour_counts', 'hour_first_seen', 'updated_at']
+    )
+
+
+def _inserted(events):
+    """The events that were really written, leaving out those skipped as duplicates."""
+    # Events without a source id never conflict
+    inserted = [event for event in events if not event.source_id]
+
+    by_source = defaultdict(list)
+    for event in events:
+        if event.source_id:
+            by_source[(event.source_system, event.event_type)].append(event)
+
+    for (source_system, event_type), source_events in by_source.items():
+        for start in range(0, len(source_events), LOOKUP_CHUNK_SIZE):
+            chunk = source_events[start:start + LOOKUP_CHUNK_SIZE]
+            # Matches activity_unique_source_event, partial condition included
+            stored = dict(ActivityEvent.objects.filter(
+                source_system=source_system,
+                event_type=event_type,
+                source_id__in={event.source_id for event in chunk}
+            ).exclude(source_id='').values_list('source_id', 'created_at'))
+            # A redelivered duplicate keeps the timestamp of the first delivery
+            inserted.extend(event for event in chunk if stored.get(event.source_id) == event.created_at)
+
+    return inserted
@@ -11,15 +11,23 @@ def api_docs(request):
         },
         "output_generators": {
             "/api/standup/": "GET - Generate a standup report",
+            "/api/standup/team/{team_id}/": "GET - Generate standup reports for a team",
             "/api/followup/": "GET - Get personal followup",
+            "/api/followup/team/{team_id}/": "GET - Get followups for a team",
             "/api/followup/send-email/": "POST - Send followup via email",
             "/api/digest/team/{team_id}/": "GET - Generate team digest",
+            "/api/digest/team/{team_id}/analytics/": "GET - Team workflow analytics (transitions, heatmap, latencies)",
+        },
+        "code_analysis": {
+            "/api/analysis/scan/stream/?repo_url={url}": "GET - Stream a repository scan as NDJSON (per-file results, running summaries)",
         },
         "integrations": {
-            "/api/github/webhook/": "POST - GitHub webhook endpoint",
+            "/api/github/webhook/": "POST - GitHub webhook endpoint (queued, returns 202)",
             "/api/github/auth/": "GET - GitHub OAuth callback",
-            "/api/jira/webhook/": "POST - Jira webhook endpoint",
+            "/api/jira/webhook/": "POST - Jira webhook endpoint (queued, returns 202)",
             "/api/jira/auth/": "GET - Jira OAuth callback",
+            "/api/slack/events/": "POST - Slack Events API endpoint",
+            "/api/slack/events/stats/": "GET - Slack message buffer metrics",
         }
     }
     
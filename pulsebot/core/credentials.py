@@ -0,0 +1,48 @@
+"""Integration credential lookups, cached for the length of a request.
+
+GitHub and Jira connectors get built several times while serving one
+request (per user, per correlator, per generator), and each used to read
+its IntegrationCredential again. Inside ``credential_cache()``, which
+CredentialCacheMiddleware opens around every request, each credential is
+read at most once and a missing one is remembered as missing.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .models import IntegrationCredential
+
+_request_cache = ContextVar('integration_credentials', default=None)
+
+
+@contextmanager
+def credential_cache():
+    """Cache credential lookups until the block exits; nested blocks share the outer cache."""
+    if _request_cache.get() is not None:
+        yield
+        return
+
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def get_integration_credential(user_id, team_id, integration_type):
+    """The user's (and team's) IntegrationCredential for an integration, or None."""
+    cache = _request_cache.get()
+    key = (user_id, team_id, integration_type)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    try:
+        credential = IntegrationCredential.objects.get(
+            user_id=user_id,
+            team_id=team_id,
+            integration_type=integration_type
+        )
+    except IntegrationCredential.DoesNotExist:
+        credential = None
+
+    if cache is not None:
+        cache[key] = credential
+    return credential
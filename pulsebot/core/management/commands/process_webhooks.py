@@ -0,0 +1,89 @@
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from context_builder.trackers.models import activity_event_buffer
+from core.webhook_queue import claim_deliveries, process_deliveries, purge_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Drain the webhook delivery queue in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help="Deliveries processed in parallel (keep at 1 on SQLite)")
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help="Attempts before a delivery is moved to the dead-letter state")
+        parser.add_argument('--backoff-base', type=int, default=30,
+                            help="Seconds before the first retry; doubles on each attempt")
+        parser.add_argument('--backoff-max', type=int, default=3600)
+        parser.add_argument('--lock-timeout', type=int, default=300,
+                            help="Seconds after which a delivery left in processing is requeued")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--retention-days', type=int, default=7,
+                            help="Succeeded deliveries (and their delivery ids) are kept this long")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit")
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        processed = failed = 0
+        last_purge = None
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            while not self._stopping:
+                if last_purge is None or time.monotonic() - last_purge > 3600:
+                    purged = purge_deliveries(options['retention_days'])
+                    if purged:
+                        logger.info(f"Purged {purged} processed webhook deliveries")
+                    last_purge = time.monotonic()
+
+                deliveries = claim_deliveries(options['batch_size'], options['lock_timeout'])
+
+                if not deliveries:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # With write-behind enabled, the batch's events go out in one INSERT before
+                # any delivery is marked succeeded
+                results = process_deliveries(
+                    deliveries,
+                    max_attempts=options['max_attempts'],
+                    backoff_base=options['backoff_base'],
+                    backoff_max=options['backoff_max'],
+                    buffer=activity_event_buffer,
+                    map_func=lambda run, batch: executor.map(lambda delivery: self._run(run, delivery, options), batch)
+                )
+                for succeeded in results:
+                    processed += 1
+                    failed += 0 if succeeded else 1
+
+        self.stdout.write(f"Processed {processed} deliveries ({failed} failed)")
+        stats = activity_event_buffer.stats()
+        if stats['flushes']:
+            self.stdout.write(
+                f"Activity events: {stats['flushed']} written in {stats['flushes']} batches "
+                f"(avg {stats['avg_batch_size']:.1f}, max flush {stats['max_flush_ms']:.1f}ms, {stats['failed']} failed, "
+                f"{stats['returned']} returned to the queue, {stats['dropped']} dropped)"
+            )
+
+    def _run(self, run, delivery, options):
+        close_old_connections()
+        try:
+            return run(delivery)
+        finally:
+            if options['concurrency'] > 1:
+                connections.close_all()
+
+    def _stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self._stopping = True
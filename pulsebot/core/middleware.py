@@ -0,0 +1,12 @@
+from .credentials import credential_cache
+
+
+class CredentialCacheMiddleware:
+    """Scopes the integration credential cache to a single request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with credential_cache():
+            return self.get_response(request)
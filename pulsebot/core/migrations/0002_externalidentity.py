@@ -0,0 +1,65 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# extra_data keys written by GitHubService / JiraService.complete_oauth
+CREDENTIAL_IDENTITY_KEYS = {
+    'github': ('github_id', 'github_username'),
+    'jira': ('account_id', 'account_name'),
+}
+
+
+def backfill_identities(apps, schema_editor):
+    """Create identities for credentials stored before the mapping existed."""
+    IntegrationCredential = apps.get_model('core', 'IntegrationCredential')
+    ExternalIdentity = apps.get_model('core', 'ExternalIdentity')
+
+    for cred in IntegrationCredential.objects.filter(integration_type__in=CREDENTIAL_IDENTITY_KEYS).iterator():
+        id_key, login_key = CREDENTIAL_IDENTITY_KEYS[cred.integration_type]
+        external_id = (cred.extra_data or {}).get(id_key)
+        if not external_id:
+            continue
+        ExternalIdentity.objects.update_or_create(
+            provider=cred.integration_type,
+            external_id=str(external_id),
+            defaults={'user_id': cred.user_id, 'login': cred.extra_data.get(login_key) or ''}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExternalIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('github', 'GitHub'), ('jira', 'Jira'), ('slack', 'Slack')], max_length=20)),
+                ('external_id', models.CharField(max_length=255)),
+                ('login', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='external_identities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'external identities',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='externalidentity',
+            index=models.Index(fields=['provider', 'login'], name='identity_provider_login_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='externalidentity',
+            unique_together={('provider', 'external_id')},
+        ),
+        migrations.RunPython(backfill_identities, migrations.RunPython.noop),
+    ]
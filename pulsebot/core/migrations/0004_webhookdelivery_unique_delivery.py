@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_webhookdelivery'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='webhookdelivery',
+            constraint=models.UniqueConstraint(condition=models.Q(('delivery_id', ''), _negated=True), fields=('source', 'delivery_id'), name='webhook_unique_delivery'),
+        ),
+    ]
@@ -61,4 +61,66 @@ class IntegrationCredential(models.Model):
     
     def __str__(self):
         team_name = self.team.name if self.team else "Personal"
-        return f"{self.integration_type} - {self.user.username} - {team_name}"
\ No newline at end of file
+        return f"{self.integration_type} - {self.user.username} - {team_name}"
+
+class ExternalIdentity(models.Model):
+    """Maps an account in an external system (GitHub, Jira, Slack) to a local user."""
+    PROVIDERS = IntegrationCredential.INTEGRATION_TYPES
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='external_identities')
+    provider = models.CharField(max_length=20, choices=PROVIDERS)
+    external_id = models.CharField(max_length=255)  # Stable id: GitHub user id, Jira accountId, Slack user id
+    login = models.CharField(max_length=255, blank=True)  # Mutable handle: GitHub login, Jira name
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('provider', 'external_id')
+        indexes = [
+            models.Index(fields=['provider', 'login'], name='identity_provider_login_idx'),
+        ]
+        verbose_name_plural = 'external identities'
+    
+    def __str__(self):
+        return f"{self.provider}:{self.login or self.external_id} -> {self.user.username}"
+
+
+class WebhookDelivery(models.Model):
+    """A raw webhook delivery queued for asynchronous processing."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Dead Letter'),
+    )
+    
+    source = models.CharField(max_length=20, choices=IntegrationCredential.INTEGRATION_TYPES)
+    event_type = models.CharField(max_length=100, blank=True)  # X-GitHub-Event etc.
+    delivery_id = models.CharField(max_length=255, blank=True)  # X-GitHub-Delivery etc.
+    body = models.TextField()  # Raw request body, decoded by the worker
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Worker claims: pending deliveries that are due, oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_status_due_idx'),
+        ]
+        constraints = [
+            # Redeliveries reuse the provider's delivery id
+            models.UniqueConstraint(
+                fields=['source', 'delivery_id'],
+                condition=~models.Q(delivery_id=''),
+                name='webhook_unique_delivery',
+            ),
+        ]
+        verbose_name_plural = 'webhook deliveries'
+    
+    def __str__(self):
+        return f"{self.source}:{self.event_type} #{self.id} ({self.status})"
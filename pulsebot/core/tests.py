@@ -0,0 +1,93 @@
+import hashlib
+import hmac
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from context_builder.trackers.models import ActivityEvent, ActivityTracker, activity_event_buffer
+from .models import WebhookDelivery
+from .webhook_queue import WEBHOOK_HANDLERS, process_delivery, verify_hub_signature
+
+
+def track_buffered_event(payload, event_type):
+    """Webhook handler that, like the real ones with write-behind on, only hands its event to the buffer."""
+    user = User.objects.get(username=payload['user'])
+    return ActivityTracker(write_behind=True).track_event(
+        user.id, 'commit', "Buffered commit", source_system='github', source_id=payload['id'], ignore_conflicts=True
+    )
+
+
+def fail_flush(rows):
+    raise RuntimeError("database unavailable")
+
+
+# The handlers' events are flushed by the worker, not the buffer's background thread
+@mock.patch.object(activity_event_buffer, 'flush_interval', 60)
+@mock.patch.dict(WEBHOOK_HANDLERS, {'buffered': 'core.tests.track_buffered_event'})
+class WriteBehindDeliveryTest(TestCase):
+    """A delivery whose events went to the write-behind buffer only succeeds once they are written."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='buffered')
+
+    def process(self, source_id):
+        delivery = WebhookDelivery.objects.create(
+            source='buffered',
+            event_type='push',
+            body=f'{{"user": "buffered", "id": "{source_id}"}}',
+            status='processing'
+        )
+        process_delivery(delivery, max_attempts=2, buffer=activity_event_buffer)
+        delivery.refresh_from_db()
+        return delivery
+
+    def test_succeeds_once_events_are_written(self):
+        delivery = self.process('written')
+
+        self.assertEqual(delivery.status, 'succeeded')
+        self.assertTrue(ActivityEvent.objects.filter(source_id='written').exists())
+
+    def test_failed_flush_is_retried_then_dead_lettered(self):
+        with mock.patch.object(activity_event_buffer, 'flush_func', fail_flush):
+            delivery = self.process('unwritten')
+            self.assertEqual(delivery.status, 'pending')
+            self.assertEqual(delivery.last_error, "1 of its activity events couldn't be written")
+
+            delivery.status = 'processing'
+            delivery.save()
+            process_delivery(delivery, max_attempts=2, buffer=activity_event_buffer)
+            delivery.refresh_from_db()
+            self.assertEqual(delivery.status, 'dead')
+
+        self.assertFalse(ActivityEvent.objects.filter(source_id='unwritten').exists())
+        # Handed back to the queue, not retried in memory
+        self.assertEqual(activity_event_buffer.stats()['pending'], 0)
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET='s3cret', JIRA_WEBHOOK_SECRET='s3cret')
+class HubSignatureTest(TestCase):
+    """GitHub and Jira webhooks are signed the same way and checked by the same helper."""
+
+    body = b'{"webhookEvent": "jira:issue_created"}'
+
+    def sign(self, body, secret='s3cret'):
+        return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+    def test_verify_hub_signature(self):
+        self.assertTrue(verify_hub_signature(self.body, self.sign(self.body), 's3cret'))
+        self.assertFalse(verify_hub_signature(self.body, self.sign(self.body, 'other'), 's3cret'))
+        self.assertFalse(verify_hub_signature(self.body, self.sign(self.body)[len('sha256='):], 's3cret'))
+        self.assertFalse(verify_hub_signature(self.body, None, 's3cret'))
+
+    def test_webhooks_reject_bad_signatures(self):
+        for view, header, extra in (
+            ('github_webhook', 'HTTP_X_HUB_SIGNATURE_256', {'HTTP_X_GITHUB_EVENT': 'push'}),
+            ('jira_webhook', 'HTTP_X_HUB_SIGNATURE', {}),
+        ):
+            with self.subTest(view=view):
+                post = lambda signature: self.client.post(
+                    reverse(view), self.body, content_type='application/json', **{header: signature}, **extra
+                )
+                self.assertEqual(post(self.sign(self.body, 'other')).status_code, 401)
+                self.assertEqual(post(self.sign(self.body)).status_code, 202)
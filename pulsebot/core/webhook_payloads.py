@@ -0,0 +1,163 @@
+"""Typed decoding of queued webhook bodies.
+
+Webhook payloads are large (GitHub push payloads embed full repository and
+user objects), but the services and trackers only read a handful of fields.
+With msgspec installed, bodies are decoded straight into the TypedDicts
+below, which skips materializing everything else while still producing the
+plain dicts the rest of the code expects. Without it, or if a payload
+doesn't match the schema, the full body is decoded with the json module.
+"""
+import json
+import logging
+from typing import Any, List, Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional accelerator
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubAccount(TypedDict, total=False):
+    id: Optional[int]
+    login: Optional[str]
+
+
+class GitHubRepository(TypedDict, total=False):
+    name: Optional[str]
+    full_name: Optional[str]
+
+
+class GitHubCommit(TypedDict, total=False):
+    id: Optional[str]
+    message: Optional[str]
+
+
+class GitHubPullRequest(TypedDict, total=False):
+    number: Optional[int]
+    title: Optional[str]
+    body: Optional[str]
+    merged: Optional[bool]
+    user: Optional[GitHubAccount]
+    created_at: Optional[str]
+    closed_at: Optional[str]
+
+
+class GitHubIssue(TypedDict, total=False):
+    number: Optional[int]
+    title: Optional[str]
+    body: Optional[str]
+
+
+class GitHubNode(TypedDict, total=False):
+    id: Optional[int]
+
+
+class GitHubReview(TypedDict, total=False):
+    id: Optional[int]
+    body: Optional[str]
+    state: Optional[str]
+    user: Optional[GitHubAccount]
+    submitted_at: Optional[str]
+
+
+class GitHubPayload(TypedDict, total=False):
+    action: Optional[str]
+    sender: Optional[GitHubAccount]
+    repository: Optional[GitHubRepository]
+    commits: Optional[List[GitHubCommit]]
+    pull_request: Optional[GitHubPullRequest]
+    issue: Optional[GitHubIssue]
+    review: Optional[GitHubReview]
+    comment: Optional[GitHubNode]
+    requested_reviewer: Optional[GitHubAccount]
+
+
+class JiraAccount(TypedDict, total=False):
+    accountId: Optional[str]
+    name: Optional[str]
+
+
+class JiraProject(TypedDict, total=False):
+    key: Optional[str]
+
+
+class JiraIssueFields(TypedDict, total=False):
+    summary: Optional[str]
+    description: Any  # Plain text on Server, ADF document on Cloud
+    project: Optional[JiraProject]
+
+
+class JiraIssue(TypedDict, total=False):
+    key: Optional[str]
+    fields: Optional[JiraIssueFields]
+
+
+# Functional form because 'from' is a keyword; from/to hold ids (e.g. status ids),
+# fromString/toString the display values
+JiraChangelogItem = TypedDict('JiraChangelogItem', {
+    'field': Optional[str],
+    'from': Any,
+    'to': Any,
+    'fromString': Optional[str],
+    'toString': Optional[str],
+}, total=False)
+
+
+class JiraChangelog(TypedDict, total=False):
+    id: Any
+    items: Optional[List[JiraChangelogItem]]
+
+
+class JiraComment(TypedDict, total=False):
+    id: Optional[str]
+    body: Any
+
+
+class JiraPayload(TypedDict, total=False):
+    webhookEvent: Optional[str]
+    timestamp: Optional[int]
+    user: Optional[JiraAccount]
+    issue: Optional[JiraIssue]
+    changelog: Optional[JiraChangelog]
+    comment: Optional[JiraComment]
+    project: Optional[dict]
+    sprint: Optional[dict]
+
+
+PAYLOAD_TYPES = {
+    'github': GitHubPayload,
+    'jira': JiraPayload,
+}
+
+_decoders = {}
+
+
+def decode_payload(source, body):
+    """Decode a webhook body, keeping only the fields declared for ``source``."""
+    payload_type = PAYLOAD_TYPES.get(source)
+    if msgspec is None or payload_type is None:
+        return json.loads(body)
+
+    decoder = _decoders.get(source)
+    if decoder is None:
+        decoder = _decoders[source] = msgspec.json.Decoder(payload_type)
+
+    try:
+        return _drop_nulls(decoder.decode(body))
+    except msgspec.ValidationError as e:
+        # Valid JSON with an unexpected shape: fall back to the full payload
+        logger.warning(f"{source} payload didn't match the typed schema ({e}), decoding in full")
+        return json.loads(body)
+    except msgspec.DecodeError as e:
+        raise json.JSONDecodeError(str(e), body if isinstance(body, str) else '', 0)
+
+
+def _drop_nulls(value):
+    """Remove null members so ``payload.get(key, {})`` behaves as with json.loads of a sparse body."""
+    if isinstance(value, dict):
+        return {key: _drop_nulls(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [_drop_nulls(item) for item in value]
+    return value
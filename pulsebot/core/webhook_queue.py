@@ -0,0 +1,247 @@
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import WebhookDelivery
+from .webhook_payloads import decode_payload
+
+logger = logging.getLogger(__name__)
+
+# Callables taking (payload, event_type) and returning True when the delivery was handled
+WEBHOOK_HANDLERS = {
+    'github': 'integrations.github.services.handle_webhook_delivery',
+    'jira': 'integrations.jira.services.handle_webhook_delivery',
+}
+
+
+class RecentDeliveries:
+    """Bounded record of recently queued delivery ids.
+
+    Checked before a body is touched, so redeliveries cost a dict lookup
+    (or one cache get) instead of a parse and an INSERT. The in-process map
+    holds the last ``maxsize`` ids; the shared cache covers other workers for
+    ``ttl`` seconds; the unique (source, delivery_id) constraint on
+    WebhookDelivery is the durable backstop.
+    """
+
+    def __init__(self, maxsize=10000, ttl=86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, source, delivery_id):
+        if not delivery_id:
+            return False
+
+        key = self._key(source, delivery_id)
+        with self._lock:
+            if key in self._local:
+                return True
+
+        if cache.get(key):
+            self._remember(key)
+            return True
+        return False
+
+    def add(self, source, delivery_id):
+        if not delivery_id:
+            return
+
+        key = self._key(source, delivery_id)
+        cache.set(key, 1, self.ttl)
+        self._remember(key)
+
+    def _remember(self, key):
+        with self._lock:
+            self._local[key] = True
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def _key(self, source, delivery_id):
+        return f"pulsebot:webhook:{source}:{delivery_id}"
+
+
+recent_deliveries = RecentDeliveries()
+
+
+def verify_hub_signature(payload, signature, secret):
+    """Check an ``X-Hub-Signature``-style header: ``sha256=`` and the HMAC-SHA256 hex digest of the raw body.
+
+    GitHub and Jira both sign webhooks this way.
+    """
+    if not signature or not signature.startswith('sha256='):
+        return False
+
+    digest = hmac.new(
+        secret.encode('utf-8'),
+        payload,
+        hashlib.sha256
+    ).hexdigest()
+
+    return hmac.compare_digest(signature[7:], digest)
+
+
+def enqueue_delivery(source, body, event_type='', delivery_id=''):
+    """Durably store a raw webhook body for the worker. One INSERT, no parsing.
+
+    Returns None when the delivery id was already queued (a redelivery).
+    """
+    if recent_deliveries.seen(source, delivery_id):
+        return None
+
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+
+    try:
+        with transaction.atomic():
+            delivery = WebhookDelivery.objects.create(
+                source=source,
+                body=body,
+                event_type=event_type or '',
+                delivery_id=delivery_id or ''
+            )
+    except IntegrityError:
+        if not delivery_id:
+            raise
+        recent_deliveries.add(source, delivery_id)
+        return None
+
+    # Only remember the id once it's stored, so a failed enqueue can be retried
+    recent_deliveries.add(source, delivery_id)
+    return delivery
+
+
+def purge_deliveries(retention_days=7):
+    """Delete succeeded deliveries older than ``retention_days``; dead letters are kept."""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = WebhookDelivery.objects.filter(status='succeeded', processed_at__lt=cutoff).delete()
+    return deleted
+
+
+def claim_deliveries(batch_size=50, lock_timeout=300):
+    """Claim up to ``batch_size`` due deliveries for this worker.
+
+    Claiming stamps a random token on rows that are still pending, so two
+    workers racing for the same rows each only process what they stamped.
+    Deliveries stuck in processing longer than ``lock_timeout`` seconds (a
+    crashed worker) are put back in the queue first.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+
+    WebhookDelivery.objects.filter(
+        status='processing',
+        locked_at__lt=now - timedelta(seconds=lock_timeout)
+    ).update(status='pending', locked_by='', locked_at=None)
+
+    with transaction.atomic():
+        due_ids = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        WebhookDelivery.objects.filter(id__in=due_ids, status='pending').update(
+            status='processing',
+            locked_by=token,
+            locked_at=now
+        )
+
+    return list(WebhookDelivery.objects.filter(locked_by=token, status='processing').order_by('id'))
+
+
+def process_deliveries(deliveries, max_attempts=5, backoff_base=30, backoff_max=3600, buffer=None, map_func=map):
+    """Run the handlers for claimed deliveries, then record each outcome.
+
+    With a write-behind ``buffer`` the activity events the handlers hand to
+    it are flushed before any outcome is recorded, and a delivery only
+    succeeds once all of its events were written. One whose events failed
+    goes through the usual retry and dead-letter path, and a crash before the
+    flush leaves it in processing for the lock timeout to requeue.
+
+    ``map_func`` runs the handlers, e.g. a thread pool's ``map``. Returns
+    whether each delivery succeeded.
+    """
+    results = list(map_func(lambda delivery: _run_handler(delivery, max_attempts, buffer), deliveries))
+    if buffer is not None:
+        buffer.flush()
+
+    outcomes = []
+    for delivery, (error, writes) in zip(deliveries, results):
+        if not error and writes is not None and (writes.failed or writes.pending):
+            error = f"{writes.failed + writes.pending} of its activity events couldn't be written"
+        try:
+            outcomes.append(_record_outcome(delivery, error, max_attempts, backoff_base, backoff_max))
+        except Exception as e:
+            # Recording the outcome failed; the lock timeout will requeue it
+            logger.error(f"Error recording the outcome of webhook delivery {delivery.id}: {e}")
+            outcomes.append(False)
+    return outcomes
+
+
+def process_delivery(delivery, max_attempts=5, backoff_base=30, backoff_max=3600, buffer=None):
+    """Run the handler for one claimed delivery and record the outcome; see ``process_deliveries``."""
+    return process_deliveries([delivery], max_attempts, backoff_base, backoff_max, buffer)[0]
+
+
+def _run_handler(delivery, max_attempts, buffer):
+    """Returns the handler's error ('' on success) and what it left in ``buffer``."""
+    delivery.attempts += 1
+    writes = None
+
+    try:
+        handler = import_string(WEBHOOK_HANDLERS[delivery.source])
+        payload = decode_payload(delivery.source, delivery.body)
+        if buffer is None:
+            handled = handler(payload, delivery.event_type)
+        else:
+            with buffer.tracking() as writes:
+                handled = handler(payload, delivery.event_type)
+        return ('' if handled else 'Handler reported failure'), writes
+    except json.JSONDecodeError as e:
+        # A body that doesn't parse now never will
+        delivery.attempts = max(delivery.attempts, max_attempts)
+        return f"Invalid JSON: {e}", writes
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", writes
+
+
+def _record_outcome(delivery, error, max_attempts, backoff_base, backoff_max):
+    """Save a delivery's outcome.
+
+    Failures are retried with exponential backoff; after ``max_attempts`` the
+    delivery is moved to the dead-letter state with its last error kept.
+    """
+    now = timezone.now()
+    if not error:
+        delivery.status = 'succeeded'
+        delivery.processed_at = now
+        delivery.last_error = ''
+    elif delivery.attempts >= max_attempts:
+        logger.error(f"Webhook delivery {delivery.id} moved to dead letter after {delivery.attempts} attempts: {error}")
+        delivery.status = 'dead'
+        delivery.processed_at = now
+        delivery.last_error = error
+    else:
+        delay = min(backoff_max, backoff_base * 2 ** (delivery.attempts - 1))
+        logger.warning(f"Webhook delivery {delivery.id} failed (attempt {delivery.attempts}), retrying in {delay}s: {error}")
+        delivery.status = 'pending'
+        delivery.next_attempt_at = now + timedelta(seconds=delay)
+        delivery.last_error = error
+
+    delivery.locked_by = ''
+    delivery.locked_at = None
+    delivery.save(update_fields=[
+        'status', 'attempts', 'next_attempt_at', 'locked_by', 'locked_at', 'last_error', 'processed_at'
+    ])
+    return delivery.status == 'succeeded'
@@ -2,7 +2,7 @@ import logging
 import requests
 from datetime import datetime, timedelta
 from django.conf import settings
-from core.models import IntegrationCredential
+from core.credentials import get_integration_credential
 
 logger = logging.getLogger(__name__)
 
@@ -18,22 +18,17 @@ class GitHubConnector:
         if not self.user_id:
             return None
             
-        try:
-            cred = IntegrationCredential.objects.get(
-                user_id=self.user_id,
-                team_id=self.team_id,
-                integration_type='github'
-            )
-            
-            # Check if token needs refresh
-            if cred.expires_at and cred.expires_at <= datetime.now():
-                # Implement token refresh logic here
-                pass
-                
-            return cred.access_token
-        except IntegrationCredential.DoesNotExist:
+        cred = get_integration_credential(self.user_id, self.team_id, 'github')
+        if not cred:
             logger.warning(f"No GitHub credentials for user {self.user_id}")
             return None
+        
+        # Check if token needs refresh
+        if cred.expires_at and cred.expires_at <= datetime.now():
+            # Implement token refresh logic here
+            pass
+            
+        return cred.access_token
     
     def _make_request(self, method, endpoint, data=None, params=None):
         """Make a request to the GitHub API."""
@@ -4,9 +4,26 @@ import json
 from django.contrib.auth.models import User
 from django.conf import settings
 from core.models import IntegrationCredential, Team
+from context_builder.trackers.identity import identity_resolver
+from context_builder.trackers.services import ActivityTrackingService
 
 logger = logging.getLogger(__name__)
 
+def handle_webhook_delivery(payload, event_type):
+    """Process a queued GitHub webhook delivery and track its activity."""
+    # Add the event type to the payload for processing
+    payload['event_type'] = event_type
+    
+    if not GitHubService().process_webhook_event(payload):
+        logger.error(f"Failed to process GitHub webhook event: {event_type}")
+        return False
+    
+    # Track activity from the webhook event; a failed write fails the delivery so it is retried
+    if not ActivityTrackingService().track_github_event(payload):
+        logger.error(f"Failed to track GitHub webhook event: {event_type}")
+        return False
+    return True
+
 class GitHubService:
     def __init__(self):
         self.api_url = "https://api.github.com"
@@ -131,7 +148,7 @@ class GitHubService:
             github_user = user_response.json()
             
             # Store the token in the database
-            IntegrationCredential.objects.update_or_create(
+            credential, _ = IntegrationCredential.objects.update_or_create(
                 user=user,
                 integration_type='github',
                 defaults={
@@ -144,6 +161,9 @@ class GitHubService:
                 }
             )
             
+            # Map the GitHub account to this user so webhook senders resolve by id
+            identity_resolver.register_credential(credential)
+            
             return {'success': True}
             
         except Exception as e:
@@ -1,29 +1,28 @@
-import json
 import logging
-import hmac
-import hashlib
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from .services import GitHubService
-from context_builder.trackers.services import ActivityTrackingService
+from core.webhook_queue import enqueue_delivery, verify_hub_signature
 
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
 def github_webhook(request):
-    """Handle incoming webhook events from GitHub."""
+    """Handle incoming webhook events from GitHub.
+    
+    The signature is checked on the raw bytes and the delivery id against
+    recently queued ones before anything is parsed; new deliveries are queued
+    and acknowledged with 202 for the process_webhooks worker.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
-    # Parse the request body
     try:
-        payload = json.loads(request.body)
-        
         # Verify webhook signature if secret is configured
         if hasattr(settings, 'GITHUB_WEBHOOK_SECRET') and settings.GITHUB_WEBHOOK_SECRET:
             signature = request.headers.get('X-Hub-Signature-256')
-            if not verify_signature(request.body, signature, settings.GITHUB_WEBHOOK_SECRET):
+            if not verify_hub_signature(request.body, signature, settings.GITHUB_WEBHOOK_SECRET):
                 return HttpResponse("Invalid signature", status=401)
         
         # Get the event type from headers
@@ -31,42 +30,26 @@ def github_webhook(request):
         if not event_type:
             return JsonResponse({'error': 'No event type provided'}, status=400)
         
-        # Add the event type to the payload for processing
-        payload['event_type'] = event_type
+        # Queue the raw delivery for the worker; redeliveries are dropped before parsing
+        delivery = enqueue_delivery(
+            'github',
+            request.body,
+            event_type=event_type,
+            delivery_id=request.headers.get('X-GitHub-Delivery', '')
+        )
         
-        # Process the webhook event
-        service = GitHubService()
-        activity_tracker = ActivityTrackingService()
+        if delivery is None:
+            return JsonResponse({'success': True, 'duplicate': True})
         
-        # Process event
-        if service.process_webhook_event(payload):
-            # Track activity from the webhook event
-            activity_tracker.track_github_event(payload)
-            return JsonResponse({'success': True})
-        else:
-            logger.error(f"Failed to process GitHub webhook event: {event_type}")
-            return JsonResponse({'error': 'Event processing failed'}, status=500)
+        return JsonResponse({'success': True, 'delivery': delivery.id}, status=202)
             
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in GitHub webhook")
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except UnicodeDecodeError:
+        logger.error("Invalid encoding in GitHub webhook")
+        return JsonResponse({'error': 'Invalid payload encoding'}, status=400)
     except Exception as e:
-        logger.error(f"Error processing GitHub webhook: {e}")
+        logger.error(f"Error queuing GitHub webhook: {e}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
-def verify_signature(payload, signature, secret):
-    """Verify the webhook signature from GitHub."""
-    if not signature or not signature.startswith('sha256='):
-        return False
-        
-    digest = hmac.new(
-        secret.encode('utf-8'),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return hmac.compare_digest(signature[7:], digest)
-
 @csrf_exempt
 def github_auth(request):
     """Handle GitHub OAuth flow."""
@@ -80,4 +63,4 @@ def github_auth(request):
     if result.get('success'):
         return HttpResponse("GitHub authentication successful! You can close this window.")
     else:
-        return HttpResponse(f"Error during authentication: {result.get('error')}", status=400)
\ No newline at end of file
+        return HttpResponse(f"Error during authentication: {result.get('error')}", status=400)
@@ -3,7 +3,7 @@ import requests
 import base64
 from datetime import datetime
 from django.conf import settings
-from core.models import IntegrationCredential
+from core.credentials import get_integration_credential
 
 logger = logging.getLogger(__name__)
 
@@ -20,23 +20,19 @@ class JiraConnector:
             self.domain = None
             return
             
-        try:
-            cred = IntegrationCredential.objects.get(
-                user_id=self.user_id,
-                team_id=self.team_id,
-                integration_type='jira'
-            )
-            
-            self.token = cred.access_token
-            # Domain should be stored in extra_data
-            self.domain = cred.extra_data.get('domain')
-            
-            if not self.domain:
-                logger.error("Jira domain not found in credentials")
-        except IntegrationCredential.DoesNotExist:
+        cred = get_integration_credential(self.user_id, self.team_id, 'jira')
+        if not cred:
             logger.warning(f"No Jira credentials for user {self.user_id}")
             self.token = None
             self.domain = None
+            return
+        
+        self.token = cred.access_token
+        # Domain should be stored in extra_data
+        self.domain = cred.extra_data.get('domain')
+        
+        if not self.domain:
+            logger.error("Jira domain not found in credentials")
     
     def _make_request(self, method, endpoint, data=None, params=None):
         """Make a request to the Jira API."""
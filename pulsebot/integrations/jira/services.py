@@ -1,13 +1,27 @@
 import logging
 import requests
 import base64
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.contrib.auth.models import User
 from django.conf import settings
 from core.models import IntegrationCredential, Team
+from context_builder.trackers.identity import identity_resolver
+from context_builder.trackers.services import ActivityTrackingService
 
 logger = logging.getLogger(__name__)
 
+def handle_webhook_delivery(payload, event_type=''):
+    """Process a queued Jira webhook delivery and track its activity."""
+    if not JiraService().process_webhook_event(payload):
+        logger.error("Failed to process Jira webhook event")
+        return False
+    
+    # Track activity from Jira; events we don't track aren't a delivery failure, failed writes are
+    if not ActivityTrackingService().track_jira_event(payload):
+        logger.error("Failed to track Jira webhook event")
+        return False
+    return True
+
 class JiraService:
     def __init__(self):
         self.base_url = "https://api.atlassian.com/oauth/token"
@@ -117,11 +131,22 @@ class JiraService:
             cloud_id = resources[0]['id']
             site_name = resources[0]['name']
             
+            # Get the Atlassian account so webhook users can be mapped to this user
+            me_response = requests.get(
+                f"{self.api_url}/me",
+                headers={
+                    'Authorization': f'Bearer {access_token}',
+                    'Accept': 'application/json'
+                }
+            )
+            
+            jira_user = me_response.json() if me_response.status_code == 200 else {}
+            
             # Calculate expiration time
-            expires_at = datetime.now() + datetime.timedelta(seconds=expires_in)
+            expires_at = datetime.now() + timedelta(seconds=expires_in)
             
             # Store the tokens in the database
-            IntegrationCredential.objects.update_or_create(
+            credential, _ = IntegrationCredential.objects.update_or_create(
                 user=user,
                 integration_type='jira',
                 defaults={
@@ -131,11 +156,15 @@ class JiraService:
                     'extra_data': {
                         'cloud_id': cloud_id,
                         'site_name': site_name,
-                        'domain': site_name.lower().replace(' ', '-')
+                        'domain': site_name.lower().replace(' ', '-'),
+                        'account_id': jira_user.get('account_id'),
+                        'account_name': jira_user.get('name')
                     }
                 }
             )
             
+            identity_resolver.register_credential(credential)
+            
             return {'success': True}
             
         except Exception as e:
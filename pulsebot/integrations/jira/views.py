@@ -1,49 +1,49 @@
-import json
 import logging
-import hmac
-import hashlib
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from .services import JiraService
-from context_builder.trackers.services import ActivityTrackingService
+from core.webhook_queue import enqueue_delivery, verify_hub_signature
 
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
 def jira_webhook(request):
-    """Handle incoming webhook events from Jira."""
+    """Handle incoming webhook events from Jira.
+    
+    The signature is checked on the raw bytes and the delivery id against
+    recently queued ones before anything is parsed; new deliveries are queued
+    and acknowledged with 202 for the process_webhooks worker.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
-    # Parse the request body
     try:
-        payload = json.loads(request.body)
-        
-        # Verify webhook if secret is configured (Jira uses JWT for this in production)
-        # This is simplified for the example
+        # Verify webhook signature if secret is configured (Jira sends X-Hub-Signature
+        # for webhooks registered with a secret)
         if hasattr(settings, 'JIRA_WEBHOOK_SECRET') and settings.JIRA_WEBHOOK_SECRET:
-            # In a real system, you'd verify using Jira's authentication method
-            pass
+            signature = request.headers.get('X-Hub-Signature')
+            if not verify_hub_signature(request.body, signature, settings.JIRA_WEBHOOK_SECRET):
+                return HttpResponse("Invalid signature", status=401)
+        
+        # Queue the raw delivery for the worker; Jira carries the event type in the body.
+        # Redeliveries are dropped before parsing.
+        delivery = enqueue_delivery(
+            'jira',
+            request.body,
+            delivery_id=request.headers.get('X-Atlassian-Webhook-Identifier', '')
+        )
         
-        # Process the webhook event
-        service = JiraService()
-        activity_tracker = ActivityTrackingService()
+        if delivery is None:
+            return JsonResponse({'success': True, 'duplicate': True})
         
-        if service.process_webhook_event(payload):
-            # Track activity from Jira
-            # You'd need to adapt the activity tracker to handle Jira events
-            # activity_tracker.track_jira_event(payload)
-            return JsonResponse({'success': True})
-        else:
-            logger.error(f"Failed to process Jira webhook event")
-            return JsonResponse({'error': 'Event processing failed'}, status=500)
+        return JsonResponse({'success': True, 'delivery': delivery.id}, status=202)
             
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in Jira webhook")
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except UnicodeDecodeError:
+        logger.error("Invalid encoding in Jira webhook")
+        return JsonResponse({'error': 'Invalid payload encoding'}, status=400)
     except Exception as e:
-        logger.error(f"Error processing Jira webhook: {e}")
+        logger.error(f"Error queuing Jira webhook: {e}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
 @csrf_exempt
@@ -59,4 +59,4 @@ def jira_auth(request):
     if result.get('success'):
         return HttpResponse("Jira authentication successful! You can close this window.")
     else:
-        return HttpResponse(f"Error during authentication: {result.get('error')}", status=400)
\ No newline at end of file
+        return HttpResponse(f"Error during authentication: {result.get('error')}", status=400)
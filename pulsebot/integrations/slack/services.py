@@ -0,0 +1,42 @@
+import logging
+from django.conf import settings
+from context_builder.trackers.buffer import WriteBehindBuffer
+from context_builder.trackers.services import ActivityTrackingService, is_trackable_slack_message
+from core.webhook_queue import recent_deliveries
+
+logger = logging.getLogger(__name__)
+
+def _flush_slack_messages(payloads):
+    failed = ActivityTrackingService().track_slack_messages_bulk(payloads)
+    # Only events that made it to the database count as seen, so Slack's retries of
+    # anything lost before this point are accepted again (at-least-once; the
+    # channel:ts source id keeps a message that arrives twice to one row)
+    failed_ids = {id(payload) for payload in failed}
+    for payload in payloads:
+        if id(payload) not in failed_ids:
+            recent_deliveries.add('slack', payload.get('event_id', ''))
+    # Only the messages that failed are retried by the buffer
+    return failed
+
+# Slack message volume is far above GitHub's, so messages are written behind the
+# request in batches of SLACK_BUFFER_MAX_BATCH or every SLACK_BUFFER_FLUSH_MS
+slack_message_buffer = WriteBehindBuffer(
+    _flush_slack_messages,
+    name='slack-messages',
+    max_batch=getattr(settings, 'SLACK_BUFFER_MAX_BATCH', 500),
+    flush_interval=getattr(settings, 'SLACK_BUFFER_FLUSH_MS', 200) / 1000,
+    max_pending=getattr(settings, 'SLACK_BUFFER_MAX_PENDING', 20000)
+)
+
+class SlackService:
+    def process_event_callback(self, payload):
+        """Handle an Events API event_callback. Returns False if it couldn't be accepted."""
+        event = payload.get('event', {})
+        
+        if event.get('type') == 'message':
+            if not is_trackable_slack_message(event):
+                return True
+            return slack_message_buffer.offer(payload)
+        
+        logger.info(f"Unhandled Slack event type: {event.get('type')}")
+        return True
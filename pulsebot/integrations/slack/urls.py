@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('events/', views.slack_events, name='slack_events'),
+    path('events/stats/', views.slack_buffer_stats, name='slack_buffer_stats'),
+]
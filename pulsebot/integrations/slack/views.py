@@ -0,0 +1,92 @@
+import json
+import logging
+import hmac
+import hashlib
+import time
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from .services import SlackService, slack_message_buffer
+from core.webhook_queue import recent_deliveries
+
+logger = logging.getLogger(__name__)
+
+@csrf_exempt
+def slack_events(request):
+    """Handle the Slack Events API.
+    
+    Answers URL verification challenges, acknowledges Slack's retries of events
+    we already wrote, and hands messages to a write-behind buffer so the
+    request never waits on the database.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    try:
+        # Verify request signature if signing secret is configured
+        if hasattr(settings, 'SLACK_SIGNING_SECRET') and settings.SLACK_SIGNING_SECRET:
+            if not verify_signature(
+                request.body,
+                request.headers.get('X-Slack-Request-Timestamp'),
+                request.headers.get('X-Slack-Signature'),
+                settings.SLACK_SIGNING_SECRET
+            ):
+                return HttpResponse("Invalid signature", status=401)
+        
+        payload = json.loads(request.body)
+        
+        if payload.get('type') == 'url_verification':
+            return JsonResponse({'challenge': payload.get('challenge')})
+        
+        if payload.get('type') != 'event_callback':
+            return JsonResponse({'success': True})
+        
+        # Slack retries events it thinks timed out (X-Slack-Retry-Num); ones we
+        # already wrote are acknowledged without being buffered again. Events are
+        # marked seen when their buffered batch is flushed, not here
+        event_id = payload.get('event_id', '')
+        if recent_deliveries.seen('slack', event_id):
+            return JsonResponse({'success': True, 'duplicate': True})
+        
+        if not SlackService().process_event_callback(payload):
+            # Buffer is full: shed load and let Slack retry later
+            logger.warning(f"Slack message buffer full, rejecting event {event_id} "
+                           f"(retry {request.headers.get('X-Slack-Retry-Num', 0)})")
+            return JsonResponse({'error': 'Busy'}, status=503)
+        
+        return JsonResponse({'success': True})
+        
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in Slack event")
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error processing Slack event: {e}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+def verify_signature(payload, timestamp, signature, secret, tolerance=300):
+    """Verify the request signature from Slack."""
+    if not timestamp or not signature or not signature.startswith('v0='):
+        return False
+    
+    try:
+        # Reject stale timestamps to prevent replays
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except ValueError:
+        return False
+    
+    digest = hmac.new(
+        secret.encode('utf-8'),
+        b'v0:' + timestamp.encode('utf-8') + b':' + payload,
+        hashlib.sha256
+    ).hexdigest()
+    
+    return hmac.compare_digest(signature[3:], digest)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slack_buffer_stats(request):
+    """Backpressure metrics for the Slack message buffer."""
+    return JsonResponse(slack_message_buffer.stats())
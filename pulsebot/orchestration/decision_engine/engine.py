@@ -5,6 +5,20 @@ from orchestration.memory.personality import MemoryPersonalityController
 
 logger = logging.getLogger(__name__)
 
+# Nudges for the action a user's workflow model says usually comes next
+WORKFLOW_NUDGES = {
+    'commit': "Looks like a good moment to commit your latest changes.",
+    'pr_create': "This is usually when you open a pull request - is your branch ready for review?",
+    'pr_review': "You usually review pull requests around now - is anything waiting on you?",
+    'pr_merge': "Is one of your approved pull requests ready to merge?",
+    'issue_update': "Have you updated the Jira issue you're working on?",
+    'issue_close': "Is the issue you've been working on ready to close?",
+    'standup': "Consider sharing your progress with the team.",
+}
+
+# How likely the predicted action must be before it replaces a generic nudge
+WORKFLOW_NUDGE_MIN_PROBABILITY = 0.5
+
 class ActionType(Enum):
     DIRECT_RESPONSE = "direct_response"
     ASK_CLARIFICATION = "ask_clarification"
@@ -44,9 +58,26 @@ class DecisionEngine:
         else:
             # Default to direct response with occasional nudges
             if random.random() < 0.2:  # 20% chance of nudge
-                return ActionType.NUDGE, random.choice(self.nudges)
+                return ActionType.NUDGE, self._workflow_nudge(user_id) or random.choice(self.nudges)
             return ActionType.DIRECT_RESPONSE, None
     
+    def _workflow_nudge(self, user_id):
+        """A nudge towards the user's likely next action, if their workflow makes it clear."""
+        if not user_id:
+            return None
+        
+        try:
+            from context_builder.trackers.workflow import predict_next_action
+            
+            predictions = predict_next_action(user_id, limit=1)
+        except Exception as e:
+            logger.warning(f"Could not predict next action for user {user_id}: {e}")
+            return None
+        
+        if predictions and predictions[0]['probability'] >= WORKFLOW_NUDGE_MIN_PROBABILITY:
+            return WORKFLOW_NUDGES.get(predictions[0]['event_type'])
+        return None
+    
     def process_action(self, action_type, action_data, prompt, user_id=None):
         """Process the decided action."""
         if action_type == ActionType.DIRECT_RESPONSE:
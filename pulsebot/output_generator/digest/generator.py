@@ -16,7 +16,7 @@ class DigestGenerator:
         
         try:
             team = Team.objects.get(id=team_id)
-            members = TeamMember.objects.filter(team=team)
+            members = list(TeamMember.objects.filter(team=team).select_related('user'))
             
             # Get the date range
             end_date = timezone.now()
@@ -33,6 +33,9 @@ class DigestGenerator:
                 'blockers': []
             }
             
+            # Blockers for the whole team in one pass
+            team_blockers = self.activity_tracker.detect_blockers_for_users([m.user_id for m in members])
+            
             # Process each team member
             for member in members:
                 user_activities = ActivityEvent.objects.filter(
@@ -47,7 +50,7 @@ class DigestGenerator:
                     'pr_count': user_activities.filter(event_type__startswith='pr_').count(),
                     'commit_count': user_activities.filter(event_type='commit').count(),
                     'issue_count': user_activities.filter(event_type__startswith='issue_').count(),
-                    'blockers': self.activity_tracker.detect_blockers(member.user.id)
+                    'blockers': team_blockers[member.user_id]
                 }
                 
                 digest['member_summaries'].append(user_summary)
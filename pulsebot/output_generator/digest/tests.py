@@ -0,0 +1,33 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from core.models import Team, TeamMember
+
+
+@override_settings(TEAM_ANALYTICS_MAX_DAYS=365)
+@mock.patch('output_generator.digest.views.team_workflow_analytics', return_value={})
+class TeamAnalyticsDaysTest(TestCase):
+    """The analytics window is validated and bounded before the team's events are loaded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='lead')
+        cls.team = Team.objects.create(name="Platform")
+        TeamMember.objects.create(user=cls.user, team=cls.team)
+
+    def get(self, days):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(f'/api/digest/team/{self.team.id}/analytics/', {'days': days})
+
+    def test_rejects_non_numeric_days(self, analytics):
+        response = self.get('abc')
+        self.assertEqual(response.status_code, 400)
+        analytics.assert_not_called()
+
+    def test_clamps_days(self, analytics):
+        for days, expected in (('100000', 365), ('0', 1), ('-5', 1), ('30', 30)):
+            with self.subTest(days=days):
+                self.assertEqual(self.get(days).status_code, 200)
+                analytics.assert_called_with(self.team.id, expected)
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('team/<int:team_id>/', views.generate_team_digest, name='generate_team_digest'),
+    path('team/<int:team_id>/analytics/', views.get_team_analytics, name='get_team_analytics'),
 ]
\ No newline at end of file
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from .generator import DigestGenerator
 from core.models import Team, TeamMember
+from context_builder.trackers.team_analytics import team_workflow_analytics
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -25,4 +27,32 @@ def generate_team_digest(request, team_id):
     return JsonResponse({
         'content': digest_content,
         'success': True
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_team_analytics(request, team_id):
+    """API endpoint for team-wide workflow analytics (transitions, activity heatmap, latencies)."""
+    try:
+        days = int(request.query_params.get('days', 90))
+    except (TypeError, ValueError):
+        return JsonResponse({
+            'success': False,
+            'error': 'days must be a whole number'
+        }, status=400)
+    # Every member's window is loaded, so keep it bounded
+    days = min(max(days, 1), getattr(settings, 'TEAM_ANALYTICS_MAX_DAYS', 365))
+    
+    # Check if user has access to this team
+    try:
+        TeamMember.objects.get(user=request.user, team_id=team_id)
+    except TeamMember.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'You do not have access to this team'
+        }, status=403)
+    
+    return JsonResponse({
+        'analytics': team_workflow_analytics(team_id, days),
+        'success': True
     })
\ No newline at end of file
@@ -13,7 +13,15 @@ class FollowUpGenerator:
     def __init__(self):
         self.activity_tracker = ActivityTracker()
         
-    def generate_individual_followup(self, user_id, days_back=3, days_forward=3):
+    def generate_followups(self, user_ids, days_back=3, days_forward=3):
+        """Generate follow-up summaries for several users, keyed by user id"""
+        blockers = self.activity_tracker.detect_blockers_for_users(user_ids)
+        return {
+            user_id: self.generate_individual_followup(user_id, days_back, days_forward, blockers=blockers[user_id])
+            for user_id in user_ids
+        }
+    
+    def generate_individual_followup(self, user_id, days_back=3, days_forward=3, blockers=None):
         """Generate personalized follow-up summary for a user"""
         try:
             user = User.objects.get(id=user_id)
@@ -30,8 +38,9 @@ class FollowUpGenerator:
                 created_at__lte=datetime.combine(today, datetime.max.time())
             ).order_by('-created_at')
             
-            # Get potential blockers
-            blockers = self.activity_tracker.detect_blockers(user_id)
+            # Get potential blockers, unless the batch caller already did
+            if blockers is None:
+                blockers = self.activity_tracker.detect_blockers(user_id)
             
             # Find pending commitments (extracted from PR comments, issues, etc.)
             pending_commitments = self._extract_commitments(user_id)
@@ -5,4 +5,5 @@ urlpatterns = [
     path('', views.get_personal_followup, name='personal_followup'),
     path('send-email/', views.send_followup_email, name='send_followup_email'),
     path('send-slack/', views.send_followup_slack, name='send_followup_slack'),
+    path('team/<int:team_id>/', views.get_team_followups, name='get_team_followups'),
 ]
\ No newline at end of file
@@ -2,6 +2,7 @@ from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from .generator import FollowUpGenerator
+from core.models import TeamMember
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -38,4 +39,32 @@ def send_followup_slack(request):
     generator = FollowUpGenerator()
     result = generator.send_followup_slack(request.user.id)
     
-    return JsonResponse(result)
\ No newline at end of file
+    return JsonResponse(result)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_team_followups(request, team_id):
+    """API endpoint to get follow-up summaries for every member of a team."""
+    days_back = int(request.query_params.get('days_back', 3))
+    days_forward = int(request.query_params.get('days_forward', 3))
+    
+    # Check if user has access to this team
+    try:
+        TeamMember.objects.get(user=request.user, team_id=team_id)
+    except TeamMember.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'You do not have access to this team'
+        }, status=403)
+    
+    members = TeamMember.objects.filter(team_id=team_id).select_related('user')
+    usernames = {member.user_id: member.user.username for member in members}
+    user_ids = list(usernames)
+    
+    generator = FollowUpGenerator()
+    contents = generator.generate_followups(user_ids, days_back=days_back, days_forward=days_forward)
+    
+    return JsonResponse({
+        'content': {usernames[user_id]: content for user_id, content in contents.items()},
+        'success': True
+    })
\ No newline at end of file
@@ -10,7 +10,12 @@ class StandupGenerator:
     def __init__(self):
         self.activity_tracker = ActivityTracker()
     
-    def generate_standup(self, user_id):
+    def generate_standups(self, user_ids):
+        """Generate standup summaries for several users, keyed by user id."""
+        blockers = self.activity_tracker.detect_blockers_for_users(user_ids)
+        return {user_id: self.generate_standup(user_id, blockers=blockers[user_id]) for user_id in user_ids}
+    
+    def generate_standup(self, user_id, blockers=None):
         """Generate a standup summary for a user."""
         try:
             user = User.objects.get(id=user_id)
@@ -37,8 +42,9 @@ class StandupGenerator:
                 created_at__gte=today_start
             ).order_by('created_at')
             
-            # Detect blockers
-            blockers = self.activity_tracker.detect_blockers(user_id)
+            # Detect blockers, unless the batch caller already did
+            if blockers is None:
+                blockers = self.activity_tracker.detect_blockers(user_id)
             
             # Generate summary
             standup = {
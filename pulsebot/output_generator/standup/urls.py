@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.generate_standup, name='generate_standup'),
+    path('team/<int:team_id>/', views.generate_team_standups, name='generate_team_standups'),
 ]
\ No newline at end of file
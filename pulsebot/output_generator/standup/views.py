@@ -2,6 +2,7 @@ from django.http import JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from .generator import StandupGenerator
+from core.models import TeamMember
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -13,4 +14,29 @@ def generate_standup(request):
     return JsonResponse({
         'content': standup_content,
         'success': True
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def generate_team_standups(request, team_id):
+    """API endpoint to generate standup reports for every member of a team."""
+    # Check if user has access to this team
+    try:
+        TeamMember.objects.get(user=request.user, team_id=team_id)
+    except TeamMember.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'You do not have access to this team'
+        }, status=403)
+    
+    members = TeamMember.objects.filter(team_id=team_id).select_related('user')
+    usernames = {member.user_id: member.user.username for member in members}
+    user_ids = list(usernames)
+    
+    generator = StandupGenerator()
+    contents = generator.generate_standups(user_ids)
+    
+    return JsonResponse({
+        'content': {usernames[user_id]: content for user_id, content in contents.items()},
+        'success': True
     })
\ No newline at end of file
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,6 +37,30 @@ load_dotenv()
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro')
 
+# Activity tracking: buffer events in-process and write them in batches
+ACTIVITY_WRITE_BEHIND = os.environ.get('ACTIVITY_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+ACTIVITY_WRITE_BEHIND_MAX_LATENCY_MS = int(os.environ.get('ACTIVITY_WRITE_BEHIND_MAX_LATENCY_MS', 100))
+ACTIVITY_WRITE_BEHIND_MAX_BATCH = int(os.environ.get('ACTIVITY_WRITE_BEHIND_MAX_BATCH', 1000))
+
+# Correlation and workflow results are cached until the user's next tracked event
+CORRELATION_CACHE_TTL = int(os.environ.get('CORRELATION_CACHE_TTL', 300))
+CORRELATION_CACHE_MAX_ENTRIES = int(os.environ.get('CORRELATION_CACHE_MAX_ENTRIES', 1000))
+# Results with more correlations than this aren't worth holding in memory
+CORRELATION_CACHE_MAX_ITEMS = int(os.environ.get('CORRELATION_CACHE_MAX_ITEMS', 5000))
+
+# Longest window the team analytics endpoint accepts; longer requests are clamped
+TEAM_ANALYTICS_MAX_DAYS = int(os.environ.get('TEAM_ANALYTICS_MAX_DAYS', 365))
+
+# Repository scans analyze files across this many processes (1 scans serially)
+CODE_ANALYSIS_WORKERS = int(os.environ.get('CODE_ANALYSIS_WORKERS', os.cpu_count() or 1))
+# Seconds a single file may take before the scan skips it
+CODE_ANALYSIS_FILE_TIMEOUT = int(os.environ.get('CODE_ANALYSIS_FILE_TIMEOUT', 30))
+# File analyses kept by content hash so unchanged files aren't re-analyzed (0 disables the cache)
+CODE_ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('CODE_ANALYSIS_CACHE_MAX_ENTRIES', 200000))
+# Bare mirrors of analyzed repositories, fetched incrementally; least recently used are evicted past the budget
+CODE_ANALYSIS_MIRROR_DIR = os.environ.get('CODE_ANALYSIS_MIRROR_DIR', os.path.join(tempfile.gettempdir(), 'pulsebot-mirrors'))
+CODE_ANALYSIS_MIRROR_MAX_MB = int(os.environ.get('CODE_ANALYSIS_MIRROR_MAX_MB', 10240))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -51,6 +76,7 @@ INSTALLED_APPS = [
     'orchestration.decision_engine',
     'integrations.github',
     'integrations.jira',
+    'integrations.slack',
     'context_builder.trackers',
     'context_builder.analyzers',
     'rest_framework',
@@ -73,6 +99,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CredentialCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -111,6 +138,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Kept apart from the default cache so large results can't evict identity lookups
+    'correlation': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'correlation',
+        'TIMEOUT': CORRELATION_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': CORRELATION_CACHE_MAX_ENTRIES},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -21,8 +21,10 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/github/', include('integrations.github.urls')),
     path('api/jira/', include('integrations.jira.urls')),
+    path('api/slack/', include('integrations.slack.urls')),
     path('api/followup/', include('output_generator.followup.urls')),
     path('api/standup/', include('output_generator.standup.urls')),
     path('api/digest/', include('output_generator.digest.urls')),
+    path('api/analysis/', include('context_builder.analyzers.urls')),
     path('api/prompt/', include('orchestration.prompt_manager.urls')),
 ]